@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Room, Booking
+from .models import Room, Booking, BookingSeries
 
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
@@ -9,6 +9,13 @@ class RoomAdmin(admin.ModelAdmin):
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
-    list_display = ("room", "user", "start_at", "end_at", "title")
+    list_display = ("room", "user", "start_at", "end_at", "title", "series")
     list_filter = ("room",)
+    list_select_related = ("room", "user", "series")
+    search_fields = ("room__name", "user__username", "title")
+
+@admin.register(BookingSeries)
+class BookingSeriesAdmin(admin.ModelAdmin):
+    list_display = ("room", "user", "frequency", "interval", "start_at", "until", "count", "title")
+    list_filter = ("room", "frequency")
     search_fields = ("room__name", "user__username", "title")
@@ -1,7 +1,8 @@
 from django import forms
 from django.utils import timezone
-from datetime import datetime, time
-from .models import RoomSize, RoomCategory,Booking,Room
+from datetime import date, datetime, time, timedelta
+from .models import RoomSize, RoomCategory,Booking,Room, Frequency
+from .recurrence import MAX_OCCURRENCES
 
 class BookingSearchForm(forms.Form):
     date = forms.DateField(required=False, widget=forms.DateInput(attrs={"type": "date"}))
@@ -10,6 +11,8 @@ class BookingSearchForm(forms.Form):
     all_day = forms.BooleanField(required=False)  # NEW
     size = forms.ChoiceField(required=False, choices=[("", "Any")] + list(RoomSize.choices))
     room_category = forms.ChoiceField(required=False, choices=[("", "Any")] + list(RoomCategory.choices))
+    capacity = forms.IntegerField(required=False, min_value=1)
+    location = forms.CharField(required=False, max_length=120)
 
     def clean(self):
         data = super().clean()
@@ -46,10 +49,54 @@ class BookingSearchForm(forms.Form):
         # If only date (no all_day, no times), do not set start_dt/end_dt → no availability filter
         return data
 
+class NextSlotSearchForm(forms.Form):
+    DURATION_CHOICES = [
+        (15, "15 min"), (30, "30 min"), (45, "45 min"), (60, "1 hour"),
+        (90, "1.5 hours"), (120, "2 hours"), (180, "3 hours"), (240, "4 hours"),
+    ]
+
+    duration = forms.TypedChoiceField(
+        choices=DURATION_CHOICES, coerce=int, initial=60, widget=forms.Select(attrs={"class": "form-select"})
+    )
+    capacity = forms.IntegerField(required=False, min_value=1)
+    size = forms.ChoiceField(
+        required=False, choices=[("", "Any")] + list(RoomSize.choices), widget=forms.Select(attrs={"class": "form-select"})
+    )
+    room_category = forms.ChoiceField(
+        required=False, choices=[("", "Any")] + list(RoomCategory.choices), widget=forms.Select(attrs={"class": "form-select"})
+    )
+    date = forms.DateField(required=False, widget=forms.DateInput(attrs={"type": "date"}))  # search from; default now
+    days = forms.IntegerField(required=False, min_value=1, max_value=14, initial=5)
+    opens = forms.TimeField(required=False, initial=time(8, 0), widget=forms.TimeInput(attrs={"type": "time"}))
+    closes = forms.TimeField(required=False, initial=time(18, 0), widget=forms.TimeInput(attrs={"type": "time"}))
+
+    def clean(self):
+        data = super().clean()
+        opens = data.get("opens") or self.fields["opens"].initial
+        closes = data.get("closes") or self.fields["closes"].initial
+        if closes <= opens:
+            raise forms.ValidationError("The latest end time must be after the earliest start time.")
+        duration = data.get("duration")
+        if duration and datetime.combine(date.min, opens) + timedelta(minutes=duration) > datetime.combine(date.min, closes):
+            raise forms.ValidationError("The duration does not fit between the earliest start and latest end times.")
+
+        now = timezone.now()
+        d = data.get("date")
+        start_at = timezone.make_aware(datetime.combine(d, time(0, 0))) if d else now
+        data["start_at"] = max(start_at, now)
+        data["opens"], data["closes"] = opens, closes
+        data["days"] = data.get("days") or self.fields["days"].initial
+        return data
+
 class BookingCreateForm(forms.ModelForm):
     date = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
     start_time = forms.TimeField(widget=forms.TimeInput(attrs={"type": "time"}))
     end_time = forms.TimeField(widget=forms.TimeInput(attrs={"type": "time"}))
+    # Recurrence (optional): every `interval` days/weeks/months until a date or for `count` occurrences
+    repeat = forms.ChoiceField(required=False, choices=[("", "Does not repeat")] + list(Frequency.choices))
+    interval = forms.IntegerField(required=False, min_value=1, max_value=12)
+    until = forms.DateField(required=False, widget=forms.DateInput(attrs={"type": "date"}))
+    count = forms.IntegerField(required=False, min_value=1, max_value=MAX_OCCURRENCES)
 
     class Meta:
         model = Booking
@@ -77,6 +124,14 @@ class BookingCreateForm(forms.ModelForm):
             raise forms.ValidationError("End time must be after start time.")
         data["start_dt"] = start_dt
         data["end_dt"] = end_dt
+
+        if data.get("repeat"):
+            until = data.get("until")
+            if not until and not data.get("count"):
+                raise forms.ValidationError("Give an end date or a number of occurrences for a repeating booking.")
+            if until and until < d:
+                raise forms.ValidationError("The repeat end date must not be before the first booking.")
+            data["interval"] = data.get("interval") or 1
         return data
 
     def save(self, user, commit=True):
@@ -0,0 +1,107 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from booking import occupancy, search
+from booking.models import Booking, Room, RoomCategory, RoomSize
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the first page of the room search over a large booking history: "
+        "exclude() across the reverse FK, NOT EXISTS, and the occupancy bitmaps. "
+        "Runs inside a transaction that is rolled back; nothing is kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=200)
+        parser.add_argument("--bookings", type=int, default=1_000_000, help="Historical bookings spread over the rooms")
+        parser.add_argument("--windows", type=int, default=20, help="Search windows per timed run")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per strategy")
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.order_by("pk").first()
+        if user is None:
+            raise CommandError("Create at least one user first.")
+        try:
+            with transaction.atomic():
+                self._run(user, options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, user, options):
+        rooms = Room.objects.bulk_create(
+            [
+                Room(
+                    name=f"bench-{i:05d}", size=RoomSize.choices[i % 3][0], category=RoomCategory.MEETING,
+                    capacity=2 + i % 20, location=f"Floor {i % 5}",
+                )
+                for i in range(options["rooms"])
+            ]
+        )
+        now = timezone.now().replace(minute=0, second=0, microsecond=0)
+        started = time.perf_counter()
+        self._add_history(rooms, user, options["bookings"], now)
+        rows = occupancy.rebuild()
+        self.stdout.write(
+            f"{connection.vendor}: {len(rooms)} rooms, {options['bookings']} bookings, {rows} bitmaps "
+            f"(setup {time.perf_counter() - started:.1f}s)"
+        )
+
+        rng = random.Random(0)
+        windows = []
+        for _ in range(options["windows"]):
+            # Mostly in the busy history, some in the empty future
+            start = now + timedelta(minutes=15 * rng.randrange(-24 * 4 * 60, 24 * 4 * 7))
+            windows.append((start, start + timedelta(minutes=rng.choice((30, 60, 120)))))
+        candidates = search.matching_rooms().filter(name__startswith="bench-", capacity__gte=4)
+
+        strategies = {
+            "NOT EXISTS": lambda s, e: search.free_between(candidates, s, e),
+            "bitmaps": lambda s, e: occupancy.available(candidates, s, e),
+            # The previous filter; the two conditions need not hold for the same booking
+            "exclude() join": lambda s, e: candidates.exclude(bookings__start_at__lt=e, bookings__end_at__gt=s),
+        }
+        reference = None
+        self.stdout.write(f"{'strategy':>16}  {'first page (ms)':>15}  {'wrong pages':>11}")
+        for label, strategy in strategies.items():
+            answers = [[room.pk for room in search.page(strategy(s, e))[0]] for s, e in windows]
+            reference = reference or answers
+            wrong = sum(1 for got, expected in zip(answers, reference) if got != expected)
+            elapsed = self._time(lambda: [search.page(strategy(s, e)) for s, e in windows], options["repeat"])
+            self.stdout.write(f"{label:>16}  {elapsed / len(windows):>15.2f}  {wrong:>11}")
+
+    def _add_history(self, rooms, user, total, now):
+        """Back-to-back bookings with gaps, per room, going back from ``now``."""
+        rng = random.Random(1)
+        per_room = max(1, total // len(rooms))
+        batch = []
+        for room in rooms:
+            end = now
+            for _ in range(per_room):
+                end -= timedelta(minutes=15 * rng.randrange(0, 4))
+                start = end - timedelta(minutes=15 * rng.randrange(2, 9))
+                batch.append(Booking(room=room, user=user, title="bench", start_at=start, end_at=end))
+                end = start
+                if len(batch) == 5000:
+                    Booking.objects.bulk_create(batch)
+                    batch = []
+        Booking.objects.bulk_create(batch)
+
+    @staticmethod
+    def _time(fn, repeat):
+        fn()  # warm-up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) * 1000 / repeat
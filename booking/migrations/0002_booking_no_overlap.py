@@ -0,0 +1,91 @@
+import logging
+import os
+
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+
+logger = logging.getLogger(__name__)
+
+PG_FORWARD = [
+    # btree_gist provides the GiST "=" operator class for room_id
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    ALTER TABLE booking_booking ADD CONSTRAINT booking_no_overlap
+    EXCLUDE USING gist (room_id WITH =, tstzrange(start_at, end_at, '[)') WITH &&)
+    """,
+]
+PG_REVERSE = [
+    "ALTER TABLE booking_booking DROP CONSTRAINT IF EXISTS booking_no_overlap",
+]
+
+
+def _overlaps(Booking):
+    """``{room_id: [booking, ...]}`` (by id) for rooms holding overlapping bookings."""
+    earlier = Booking.objects.filter(
+        room=OuterRef("room"), start_at__lt=OuterRef("end_at"), end_at__gt=OuterRef("start_at"), pk__lt=OuterRef("pk"),
+    )
+    rooms = Booking.objects.filter(Exists(earlier)).values("room_id").distinct()
+    by_room = {}
+    for booking in Booking.objects.filter(room_id__in=rooms).order_by("room_id", "pk"):
+        by_room.setdefault(booking.room_id, []).append(booking)
+    return by_room
+
+
+def _losers(bookings):
+    """Keep bookings in creation (id) order unless they overlap one already kept; return the rest."""
+    kept, dropped = [], []
+    for booking in bookings:
+        if any(booking.start_at < k.end_at and booking.end_at > k.start_at for k in kept):
+            dropped.append(booking)
+        else:
+            kept.append(booking)
+    return dropped
+
+
+def resolve_overlaps(apps, schema_editor):
+    """
+    The constraint cannot be added while overlaps stored by the old
+    check-then-insert race remain. List them and stop, or with
+    BOOKING_RESOLVE_OVERLAPS=1 delete the later-created booking of each conflict.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Booking = apps.get_model("booking", "Booking")
+    dropped = [b for bookings in _overlaps(Booking).values() for b in _losers(bookings)]
+    if not dropped:
+        return
+    lines = [f"  booking {b.pk}: room {b.room_id}, {b.start_at:%Y-%m-%d %H:%M}-{b.end_at:%H:%M}, user {b.user_id}" for b in dropped]
+    if os.environ.get("BOOKING_RESOLVE_OVERLAPS") != "1":
+        raise RuntimeError(
+            f"{len(dropped)} booking(s) overlap an earlier booking of the same room:\n" + "\n".join(lines[:50])
+            + "\nResolve them by hand, or re-run with BOOKING_RESOLVE_OVERLAPS=1 to delete these bookings."
+        )
+    Booking.objects.filter(pk__in=[b.pk for b in dropped]).delete()
+    logger.warning("Deleted %d overlapping booking(s):\n%s", len(dropped), "\n".join(lines))
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+    """
+    Database-enforced booking overlap prevention on PostgreSQL (exclusion
+    constraint with its GiST index). Other backends serialize saves per room
+    in Booking.save().
+    """
+
+    dependencies = [
+        ("booking", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(resolve_overlaps, migrations.RunPython.noop),
+        migrations.RunPython(
+            _run({"postgresql": PG_FORWARD}),
+            _run({"postgresql": PG_REVERSE}),
+        ),
+    ]
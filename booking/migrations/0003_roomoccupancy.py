@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0002_booking_no_overlap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('slots', models.BinaryField(max_length=12)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='booking.room')),
+            ],
+            options={
+                'verbose_name_plural': 'room occupancy',
+                'constraints': [models.UniqueConstraint(fields=('day', 'room'), name='room_occupancy_day_room_uniq')],
+            },
+        ),
+    ]
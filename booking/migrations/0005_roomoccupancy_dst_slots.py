@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_bookingseries'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='roomoccupancy',
+            name='slots',
+            field=models.BinaryField(max_length=13),
+        ),
+    ]
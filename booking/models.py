@@ -1,8 +1,12 @@
 from django.conf import settings
-from django.db import models, transaction
+from django.db import IntegrityError, models, router, transaction
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+# PostgreSQL exclusion constraint added by migration 0002 (room_id =, tstzrange &&)
+OVERLAP_CONSTRAINT = "booking_no_overlap"
+OVERLAP_MESSAGE = "This time range overlaps an existing booking."
+
 class RoomSize(models.TextChoices):
     SMALL = "small", "Small (1–4)"
     MEDIUM = "medium", "Medium (4–8)"
@@ -33,9 +37,40 @@ class Room(models.Model):
     def __str__(self):
         return self.name
 
+class Frequency(models.TextChoices):
+    DAILY = "daily", "Daily"
+    WEEKLY = "weekly", "Weekly"
+    MONTHLY = "monthly", "Monthly"
+
+class BookingSeries(models.Model):
+    """
+    A recurrence rule (every ``interval`` days/weeks/months from the first
+    occurrence, until a date or for ``count`` occurrences). Its occurrences are
+    ordinary bookings linked through ``Booking.series``; see booking.recurrence.
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="booking_series")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="booking_series")
+    title = models.CharField(max_length=140, blank=True)
+    frequency = models.CharField(max_length=10, choices=Frequency.choices)
+    interval = models.PositiveSmallIntegerField(default=1)
+    # First occurrence
+    start_at = models.DateTimeField()
+    end_at = models.DateTimeField()
+    until = models.DateField(null=True, blank=True)
+    count = models.PositiveSmallIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-start_at"]
+        verbose_name_plural = "booking series"
+
+    def __str__(self):
+        return f"{self.room} {self.get_frequency_display().lower()} from {self.start_at:%Y-%m-%d %H:%M}"
+
 class Booking(models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="bookings")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="room_bookings")
+    series = models.ForeignKey(BookingSeries, on_delete=models.CASCADE, null=True, blank=True, related_name="bookings")
     title = models.CharField(max_length=140, blank=True)
     start_at = models.DateTimeField()
     end_at = models.DateTimeField()
@@ -51,22 +86,91 @@ class Booking(models.Model):
             models.CheckConstraint(check=models.Q(end_at__gt=models.F("start_at")), name="booking_end_after_start"),
         ]
 
-    def clean(self):
-        if not self.start_at or not self.end_at:
-            return
-        if self.end_at <= self.start_at:
-            raise ValidationError("End time must be after start time.")
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Interval as loaded, so occupancy can clear the old days after a move (booking.signals)
+        instance._loaded_span = (instance.__dict__.get("room_id"), instance.__dict__.get("start_at"), instance.__dict__.get("end_at"))
+        return instance
+
+    def overlapping(self):
+        """Other bookings of the same room that intersect this one (half-open intervals)."""
         # Overlap: A.start < B.end AND A.end > B.start
-        overlapping = (
-            Booking.objects.filter(room=self.room)
+        return (
+            Booking.objects.filter(room_id=self.room_id)
             .filter(start_at__lt=self.end_at, end_at__gt=self.start_at)
             .exclude(pk=self.pk)
-            .exists()
         )
-        if overlapping:
-            raise ValidationError("This time range overlaps an existing booking.")
+
+    def _check_times(self):
+        if self.start_at and self.end_at and self.end_at <= self.start_at:
+            raise ValidationError("End time must be after start time.")
+
+    def clean(self):
+        # Friendly early error for admin/model forms; save() does not rely on it
+        if not self.start_at or not self.end_at:
+            return
+        self._check_times()
+        if self.overlapping().exists():
+            raise ValidationError(OVERLAP_MESSAGE, code="overlap")
+
+    def _lock_room(self, using):
+        # An UPDATE takes the row lock (the database write lock on SQLite) until commit
+        Room.objects.using(using).filter(pk=self.room_id).update(name=models.F("name"))
 
     def save(self, *args, **kwargs):
-        with transaction.atomic():
-            self.full_clean()
-            return super().save(*args, **kwargs)
+        """
+        Overlaps are rejected by the database, not by a check-then-insert:
+        on PostgreSQL the ``booking_no_overlap`` exclusion constraint fails the
+        INSERT/UPDATE; elsewhere the overlap check runs under the room lock.
+        Either way a conflict raises ValidationError(code="overlap").
+
+        The room row is write-locked first on every backend: saves for one
+        room, and the occupancy bitmaps they rewrite (booking.signals), run one
+        at a time, always taking the room lock before any booking row.
+        """
+        # No full_clean(): FKs, NOT NULL and the end-after-start check are database constraints too
+        self._check_times()
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            self._lock_room(using)
+            if transaction.get_connection(using).vendor != "postgresql":
+                if self.overlapping().using(using).exists():
+                    raise ValidationError(OVERLAP_MESSAGE, code="overlap")
+            try:
+                # Savepoint: a constraint violation must not poison the caller's transaction
+                with transaction.atomic(using=using):
+                    return super().save(*args, **kwargs)
+            except IntegrityError as exc:
+                if OVERLAP_CONSTRAINT in str(exc):
+                    raise ValidationError(OVERLAP_MESSAGE, code="overlap") from exc
+                raise
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            # Same lock order as save(): room first, then the booking row
+            self._lock_room(using)
+            return super().delete(using=using, keep_parents=keep_parents)
+
+class RoomOccupancy(models.Model):
+    """
+    Busy 15-minute slots of one room on one local day: bit ``i`` of ``slots``
+    is set when any booking intersects the ``i``-th 15 minutes elapsed since
+    local midnight (92 / 100 slots on DST-transition days).
+    Maintained by booking.occupancy on every booking write; days without
+    bookings have no row.
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="occupancy")
+    day = models.DateField()
+    # Up to 100 bits, big-endian
+    slots = models.BinaryField(max_length=13)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["day", "room"], name="room_occupancy_day_room_uniq"),
+        ]
+        verbose_name_plural = "room occupancy"
+
+    def __str__(self):
+        return f"{self.room} {self.day}"
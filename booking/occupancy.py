@@ -0,0 +1,175 @@
+"""
+Per-room, per-day occupancy bitmaps (``RoomOccupancy``).
+
+Each local day is cut into 15-minute slots counted from its (aware) midnight
+in elapsed time: 96 on most days, 92 / 100 on DST-transition days; a bit is
+set when any booking intersects that slot. Bitmaps are recomputed from the room's bookings for
+the affected days on every booking create, move and delete (booking.signals),
+so "which rooms are free between A and B" reads a handful of small rows
+instead of joining the whole booking history:
+
+- no bit set in the slots the window touches: free;
+- a bit set in a slot lying entirely inside the window: busy;
+- otherwise the only conflicts are in a partially covered first/last slot
+  (unaligned times), and just those rooms get a correlated ``NOT EXISTS``
+  on their bookings, in the same query as the rest of the search.
+
+``rebuild()`` (``rebuild_room_occupancy`` command) recomputes every bitmap;
+``--verify`` cross-checks ``available()`` against the interval query.
+"""
+import datetime
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .models import Booking, Room, RoomOccupancy
+
+SLOT_MINUTES = 15
+# A 25-hour day (DST fall-back) has 100 slots
+MAX_SLOTS = 25 * 60 // SLOT_MINUTES
+NBYTES = math.ceil(MAX_SLOTS / 8)
+
+
+def encode(bits):
+    return bits.to_bytes(NBYTES, "big")
+
+
+def decode(value):
+    return int.from_bytes(bytes(value), "big")
+
+
+def day_bounds(day):
+    """Aware ``[start, end)`` of a local day."""
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min))
+
+
+def days_spanned(start_at, end_at):
+    """Local days that ``[start_at, end_at)`` intersects."""
+    day = timezone.localdate(start_at)
+    last = timezone.localdate(end_at - datetime.timedelta(microseconds=1))
+    while day <= last:
+        yield day
+        day += datetime.timedelta(days=1)
+
+
+def _minutes(dt, day):
+    """
+    Minutes elapsed from the start of local ``day`` to ``dt``, clipped to the
+    day. Elapsed, not wall-clock: on a DST day the repeated (or skipped) hour
+    gets its own slots instead of folding onto the previous one.
+    """
+    start, end = (bound.astimezone(datetime.timezone.utc) for bound in day_bounds(day))
+    # In UTC: aware datetimes sharing a tzinfo subtract as wall-clock times
+    dt = min(max(dt.astimezone(datetime.timezone.utc), start), end)
+    return (dt - start).total_seconds() / 60
+
+
+def _mask(first, last):
+    return ((1 << (last - first)) - 1) << first if last > first else 0
+
+
+def touched_mask(start_at, end_at, day):
+    """Slots of ``day`` that ``[start_at, end_at)`` intersects."""
+    start, end = _minutes(start_at, day), _minutes(end_at, day)
+    return _mask(math.floor(start / SLOT_MINUTES), math.ceil(end / SLOT_MINUTES))
+
+
+def inner_mask(start_at, end_at, day):
+    """Slots of ``day`` lying entirely inside ``[start_at, end_at)``."""
+    start, end = _minutes(start_at, day), _minutes(end_at, day)
+    return _mask(math.ceil(start / SLOT_MINUTES), math.floor(end / SLOT_MINUTES))
+
+
+@transaction.atomic
+def refresh(room_id, days):
+    """
+    Recompute the bitmaps of ``room_id`` for ``days`` from its bookings.
+    The room row is write-locked first, so concurrent bookings of one room
+    rewrite its bitmaps one after the other, each reading the other's booking
+    once committed, instead of racing on the delete + insert.
+    """
+    days = sorted(set(days))
+    if not days:
+        return
+    Room.objects.filter(pk=room_id).update(name=F("name"))
+    range_start, range_end = day_bounds(days[0])[0], day_bounds(days[-1])[1]
+    intervals = list(
+        Booking.objects.filter(room_id=room_id, start_at__lt=range_end, end_at__gt=range_start).values_list(
+            "start_at", "end_at"
+        )
+    )
+    bitmaps = _bitmaps((room_id, start_at, end_at) for start_at, end_at in intervals)
+    RoomOccupancy.objects.filter(room_id=room_id, day__in=days).delete()
+    RoomOccupancy.objects.bulk_create(
+        [RoomOccupancy(room_id=room_id, day=day, slots=encode(bitmaps[(room_id, day)])) for day in days if bitmaps.get((room_id, day))]
+    )
+
+
+def refresh_bookings(spans):
+    """Refresh every room-day touched by ``spans`` (``(room_id, start_at, end_at)`` tuples)."""
+    by_room = defaultdict(set)
+    for room_id, start_at, end_at in spans:
+        if room_id and start_at and end_at and end_at > start_at:
+            by_room[room_id].update(days_spanned(start_at, end_at))
+    # Room order: two moves between the same rooms lock them in the same order
+    for room_id, days in sorted(by_room.items()):
+        refresh(room_id, days)
+
+
+def _bitmaps(bookings):
+    """``{(room_id, day): bits}`` for an iterable of ``(room_id, start_at, end_at)``."""
+    bitmaps = defaultdict(int)
+    for room_id, start_at, end_at in bookings:
+        for day in days_spanned(start_at, end_at):
+            bitmaps[(room_id, day)] |= touched_mask(start_at, end_at, day)
+    return bitmaps
+
+
+@transaction.atomic
+def rebuild(batch_size=5000):
+    """Recompute every bitmap from the bookings. Returns the number of rows written."""
+    RoomOccupancy.objects.all().delete()
+    bitmaps = _bitmaps(
+        Booking.objects.order_by().values_list("room_id", "start_at", "end_at").iterator(chunk_size=batch_size)
+    )
+    RoomOccupancy.objects.bulk_create(
+        [RoomOccupancy(room_id=room_id, day=day, slots=encode(bits)) for (room_id, day), bits in bitmaps.items() if bits],
+        batch_size=batch_size,
+    )
+    return len(bitmaps)
+
+
+def conflicting_bookings(start_at, end_at):
+    """Bookings of ``OuterRef("pk")`` intersecting ``[start_at, end_at)``, for ``Exists()`` on a room queryset."""
+    return Booking.objects.filter(room=OuterRef("pk"), start_at__lt=end_at, end_at__gt=start_at)
+
+
+def _scan(rooms, start_at, end_at):
+    """``(busy, unsure)`` room IDs from the bitmaps of the days ``[start_at, end_at)`` spans."""
+    days = list(days_spanned(start_at, end_at))
+    masks = {day: (touched_mask(start_at, end_at, day), inner_mask(start_at, end_at, day)) for day in days}
+    busy, unsure = set(), set()
+    for room_id, day, slots in RoomOccupancy.objects.filter(day__in=days, room__in=rooms).values_list(
+        "room_id", "day", "slots"
+    ):
+        touched, inner = masks[day]
+        bits = decode(slots)
+        if bits & inner:
+            busy.add(room_id)
+        elif bits & touched:
+            unsure.add(room_id)
+    return busy, unsure - busy
+
+
+def available(rooms, start_at, end_at):
+    """The ``rooms`` queryset narrowed to rooms free for the whole of ``[start_at, end_at)``."""
+    busy, unsure = _scan(rooms, start_at, end_at)
+    rooms = rooms.exclude(pk__in=busy)
+    if unsure:
+        # Conflicts only in a partially covered edge slot: NOT EXISTS decides, for those rooms only
+        rooms = rooms.exclude(Q(pk__in=unsure) & Exists(conflicting_bookings(start_at, end_at)))
+    return rooms
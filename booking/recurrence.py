@@ -0,0 +1,135 @@
+"""
+Recurring bookings.
+
+``occurrences()`` expands a rule into ``(start_at, end_at)`` pairs on local
+wall-clock time (a weekly 09:00 meeting stays at 09:00 across DST changes;
+monthly rules skip months without that day, e.g. the 31st).
+
+``book_series()`` checks the whole series with one range query over the
+room's bookings, sorted by start, and a single sweep against the sorted
+occurrences (bookings of a room never overlap, so each occurrence only has to
+be compared with the first booking ending after it starts). The free
+occurrences are inserted with one ``bulk_create``, and every occurrence is
+reported as booked or with the booking it collides with.
+"""
+import calendar
+import datetime
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from . import occupancy
+from .models import OVERLAP_CONSTRAINT, Booking, BookingSeries, Frequency, Room
+
+# Upper bound for rules given only an end date
+MAX_OCCURRENCES = 366
+# Retries when a concurrent single booking wins the race on PostgreSQL
+MAX_ATTEMPTS = 3
+SERIES_OVERLAP_MESSAGE = "Other bookings kept taking occurrences of this series; please try again."
+
+
+def _nth_date(first, frequency, n):
+    """Date of the ``n``-th step from ``first``, or None when that month has no such day."""
+    if frequency == Frequency.DAILY:
+        return first + datetime.timedelta(days=n)
+    if frequency == Frequency.WEEKLY:
+        return first + datetime.timedelta(weeks=n)
+    years, month = divmod(first.month - 1 + n, 12)
+    year = first.year + years
+    if first.day > calendar.monthrange(year, month + 1)[1]:
+        return None
+    return first.replace(year=year, month=month + 1)
+
+
+def occurrences(start_at, end_at, frequency, interval=1, until=None, count=None):
+    """``[(start_at, end_at), ...]`` for the rule, in order, at most ``MAX_OCCURRENCES``."""
+    local = timezone.localtime(start_at)
+    duration = end_at - start_at
+    limit = min(count or MAX_OCCURRENCES, MAX_OCCURRENCES)
+    result = []
+    step = 0
+    while len(result) < limit:
+        day = _nth_date(local.date(), frequency, step * interval)
+        step += 1
+        if day is None:
+            continue
+        if until and day > until:
+            break
+        start = timezone.make_aware(datetime.datetime.combine(day, local.time()))
+        result.append((start, start + duration))
+    return result
+
+
+def sweep_conflicts(slots, bookings):
+    """
+    For each of the sorted ``slots`` the booking it overlaps, or None.
+    ``bookings`` must be sorted by start and non-overlapping (one room).
+    """
+    conflicts = []
+    i = 0
+    for start_at, end_at in slots:
+        while i < len(bookings) and bookings[i].end_at <= start_at:
+            i += 1
+        hit = bookings[i] if i < len(bookings) and bookings[i].start_at < end_at else None
+        conflicts.append(hit)
+    return conflicts
+
+
+def _book(series, slots):
+    bookings = list(
+        Booking.objects.filter(room_id=series.room_id, start_at__lt=slots[-1][1], end_at__gt=slots[0][0])
+        .order_by("start_at")
+        .only("id", "start_at", "end_at", "title")
+    )
+    conflicts = sweep_conflicts(slots, bookings)
+    created = Booking.objects.bulk_create(
+        [
+            Booking(room_id=series.room_id, user_id=series.user_id, series=series, title=series.title, start_at=start, end_at=end)
+            for (start, end), conflict in zip(slots, conflicts)
+            if conflict is None
+        ]
+    )
+    by_start = {booking.start_at: booking for booking in created}
+    return [
+        {"start_at": start, "end_at": end, "booking": by_start.get(start), "conflict": conflict}
+        for (start, end), conflict in zip(slots, conflicts)
+    ]
+
+
+def book_series(room, user, title, start_at, end_at, frequency, interval=1, until=None, count=None):
+    """
+    Create the series and every occurrence that is free. Returns
+    ``(series, report)``; ``report`` has one dict per occurrence with
+    ``start_at``, ``end_at``, ``booking`` (None if not booked) and
+    ``conflict`` (the colliding booking, or None). ``series`` is None when
+    no occurrence was free. Raises ValidationError(code="overlap") when
+    concurrent bookings win the race ``MAX_ATTEMPTS`` times in a row.
+    """
+    slots = occurrences(start_at, end_at, frequency, interval, until, count)
+    if not slots:
+        return None, []
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                # Serializes series for the room, and single saves on backends without the constraint
+                Room.objects.filter(pk=room.pk).update(name=models.F("name"))
+                series = BookingSeries.objects.create(
+                    room=room, user=user, title=title, frequency=frequency, interval=interval,
+                    start_at=start_at, end_at=end_at, until=until, count=count,
+                )
+                report = _book(series, slots)
+                booked = [row["booking"] for row in report if row["booking"]]
+                if not booked:
+                    transaction.set_rollback(True)
+                    return None, report
+                # bulk_create skips post_save: refresh the occupancy bitmaps in one go
+                occupancy.refresh_bookings((room.pk, b.start_at, b.end_at) for b in booked)
+                return series, report
+        except IntegrityError as exc:
+            # A single booking slipped in between the sweep and the insert (PostgreSQL constraint)
+            if OVERLAP_CONSTRAINT not in str(exc):
+                raise
+            if attempt == MAX_ATTEMPTS - 1:
+                # Kept losing: report it like a single booking's overlap
+                raise ValidationError(SERIES_OVERLAP_MESSAGE, code="overlap") from exc
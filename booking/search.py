@@ -0,0 +1,58 @@
+"""
+Room search.
+
+Availability comes from the occupancy bitmaps (``occupancy.available``):
+rooms busy in a fully covered slot are excluded by ID, and only rooms whose
+conflicts fall in a partially covered edge slot get a correlated ``NOT EXISTS``
+on their bookings (``start_at < end AND end_at > start``), answered from the
+``(room, start_at)`` / ``(room, end_at)`` indexes. Unlike ``exclude(bookings__...)``
+there is no join over the booking history, no DISTINCT, and both conditions
+apply to the same booking. ``free_between`` is the plain ``NOT EXISTS`` filter,
+the reference ``rebuild_room_occupancy --verify`` checks the bitmaps against.
+
+Results are keyset-paginated on the (unique) room name: a page is the first
+``PAGE_SIZE`` rooms after the cursor, so there is no ``COUNT(*)`` and no
+``OFFSET`` however many rooms match.
+"""
+from django.db.models import Exists
+
+from . import occupancy
+from .models import Room
+
+PAGE_SIZE = 25
+
+
+def free_between(rooms, start_at, end_at):
+    """The ``rooms`` queryset narrowed to rooms with no booking intersecting ``[start_at, end_at)``."""
+    return rooms.filter(~Exists(occupancy.conflicting_bookings(start_at, end_at)))
+
+
+def matching_rooms(size="", category="", capacity=None, location="", start_at=None, end_at=None):
+    """Rooms matching the search filters; empty values do not filter."""
+    qs = Room.objects.all()
+    if size:
+        qs = qs.filter(size=size)
+    if category:
+        qs = qs.filter(category=category)
+    if capacity:
+        qs = qs.filter(capacity__gte=capacity)
+    if location:
+        qs = qs.filter(location__icontains=location)
+    if start_at and end_at and start_at < end_at:
+        qs = occupancy.available(qs, start_at, end_at)
+    return qs
+
+
+def page(rooms, after="", page_size=PAGE_SIZE):
+    """
+    Return ``(items, next_cursor)`` for the rooms named after ``after``.
+    ``next_cursor`` is None on the last page.
+    """
+    qs = rooms.order_by("name")
+    if after:
+        qs = qs.filter(name__gt=after)
+    items = list(qs[: page_size + 1])
+    if len(items) > page_size:
+        items = items[:page_size]
+        return items, items[-1].name
+    return items, None
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import occupancy
+from .models import Booking
+
+
+@receiver(post_save, sender=Booking, dispatch_uid="booking_occupancy_saved")
+def booking_saved(sender, instance, **kwargs):
+    span = (instance.room_id, instance.start_at, instance.end_at)
+    spans = [span]
+    loaded = getattr(instance, "_loaded_span", None)
+    if loaded and loaded != span:
+        # Moved to other times or another room: the old days lose the booking
+        spans.append(loaded)
+    occupancy.refresh_bookings(spans)
+    instance._loaded_span = span
+
+
+@receiver(post_delete, sender=Booking, dispatch_uid="booking_occupancy_deleted")
+def booking_deleted(sender, instance, **kwargs):
+    occupancy.refresh_bookings([(instance.room_id, instance.start_at, instance.end_at)])
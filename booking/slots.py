@@ -0,0 +1,100 @@
+"""
+"Next available slot" search.
+
+Bookings of every matching room inside the search horizon are read in one
+range query, ordered by room and start, and each room's list is swept once
+per day's opening hours: the gaps between consecutive bookings (and before
+the first / after the last) that fit the requested duration are the free
+slots. Nothing is probed window by window.
+"""
+import datetime
+from itertools import groupby
+
+from django.utils import timezone
+
+from .models import Booking
+
+SLOTS_PER_ROOM = 3
+# Slots start on this grid, e.g. 10:00 / 10:15 rather than 10:07
+GRID_MINUTES = 15
+
+
+def _round_up(dt):
+    grid = datetime.timedelta(minutes=GRID_MINUTES)
+    midnight = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight + -((midnight - dt) // grid) * grid
+
+
+def _windows(start_at, days, opens, closes):
+    """Aware opening-hours windows ``[open, close)`` for ``days`` local days from ``start_at``."""
+    first = timezone.localdate(start_at)
+    for offset in range(days):
+        day = first + datetime.timedelta(days=offset)
+        begin = timezone.make_aware(datetime.datetime.combine(day, opens))
+        end = timezone.make_aware(datetime.datetime.combine(day, closes))
+        begin = max(begin, _round_up(timezone.localtime(start_at)))
+        if end > begin:
+            yield begin, end
+
+
+def _gaps(bookings, begin, end):
+    """Free ``[start, end)`` gaps of one window, given bookings sorted by start that intersect it."""
+    cursor = begin
+    for start_at, end_at in bookings:
+        if start_at > cursor:
+            yield cursor, min(start_at, end)
+        cursor = max(cursor, _round_up(timezone.localtime(end_at)))
+        if cursor >= end:
+            return
+    if end > cursor:
+        yield cursor, end
+
+
+def sweep(bookings, windows, duration, limit=SLOTS_PER_ROOM):
+    """
+    The earliest ``limit`` slots of ``duration`` (one per free gap) inside
+    ``windows``, for one room's ``bookings`` as ``(start_at, end_at)`` sorted by start.
+    """
+    slots = []
+    i = 0
+    for begin, end in windows:
+        # Windows are in order: bookings ending before this one are done with
+        while i < len(bookings) and bookings[i][1] <= begin:
+            i += 1
+        j = i
+        while j < len(bookings) and bookings[j][0] < end:
+            j += 1
+        for gap_start, gap_end in _gaps(bookings[i:j], begin, end):
+            if gap_end - gap_start >= duration:
+                slots.append((gap_start, gap_start + duration))
+                if len(slots) >= limit:
+                    return slots
+    return slots
+
+
+def next_free_slots(rooms, start_at, days, duration, opens, closes, limit=SLOTS_PER_ROOM):
+    """
+    ``[(room, [(start, end), ...]), ...]`` for the rooms in ``rooms`` (a queryset)
+    with at least one free slot, earliest first. ``days`` local days from
+    ``start_at`` are searched between ``opens`` and ``closes`` (times of day).
+    """
+    rooms = list(rooms)
+    windows = list(_windows(start_at, days, opens, closes))
+    if not rooms or not windows:
+        return []
+    horizon_start, horizon_end = windows[0][0], windows[-1][1]
+    bookings = (
+        Booking.objects.filter(room__in=rooms, start_at__lt=horizon_end, end_at__gt=horizon_start)
+        .order_by("room_id", "start_at")
+        .values_list("room_id", "start_at", "end_at")
+    )
+    by_room = {
+        room_id: [(start, end) for _, start, end in rows] for room_id, rows in groupby(bookings, key=lambda row: row[0])
+    }
+    results = []
+    for room in rooms:
+        slots = sweep(by_room.get(room.pk, []), windows, duration, limit)
+        if slots:
+            results.append((room, slots))
+    results.sort(key=lambda item: (item[1][0][0], item[0].name))
+    return results
@@ -1,3 +1,302 @@
-from django.test import TestCase
+import datetime
+import random
+import threading
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from . import occupancy, recurrence, search, slots
+from .models import OVERLAP_CONSTRAINT, Booking, Frequency, Room, RoomCategory, RoomOccupancy, RoomSize
+
+
+@skipUnless(connection.vendor == "postgresql", "The exclusion constraint exists on PostgreSQL only")
+class ConcurrentBookingTests(TransactionTestCase):
+    THREADS = 8
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("booker", password="x")
+        self.room = Room.objects.create(name="Concurrency", size=RoomSize.SMALL, category=RoomCategory.MEETING)
+        self.start = (timezone.now() + timedelta(days=30)).replace(minute=0, second=0, microsecond=0)
+
+    def _race(self, spans):
+        """Save one booking per span from its own thread, all released at once."""
+        barrier = threading.Barrier(len(spans))
+        outcomes = []
+
+        def worker(start, end):
+            try:
+                barrier.wait()
+                Booking(room=self.room, user=self.user, title="race", start_at=start, end_at=end).save()
+                outcomes.append("booked")
+            except ValidationError as exc:
+                outcomes.append(exc.code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=span) for span in spans]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_only_one_of_many_overlapping_bookings_is_stored(self):
+        spans = [(self.start + timedelta(minutes=5 * i), self.start + timedelta(minutes=60 + 5 * i)) for i in range(self.THREADS)]
+        outcomes = self._race(spans)
+        self.assertEqual(outcomes.count("booked"), 1)
+        self.assertEqual(outcomes.count("overlap"), self.THREADS - 1)
+        self.assertEqual(self.room.bookings.count(), 1)
+
+    def test_adjacent_bookings_all_succeed(self):
+        spans = [(self.start + timedelta(hours=i), self.start + timedelta(hours=i + 1)) for i in range(self.THREADS)]
+        self.assertEqual(self._race(spans), ["booked"] * self.THREADS)
+        self.assertEqual(self.room.bookings.count(), self.THREADS)
+
+
+class OccupancyTests(TestCase):
+    """The bitmaps must answer exactly what the interval (NOT EXISTS) query answers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("booker", password="x")
+        cls.rooms = [
+            Room.objects.create(name=f"Room {i}", size=RoomSize.SMALL, category=RoomCategory.MEETING) for i in range(6)
+        ]
+        cls.first = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        rng = random.Random(22)
+        for room in cls.rooms:
+            cursor = cls.first + timedelta(minutes=rng.randrange(0, 120))
+            for _ in range(40):
+                # Unaligned starts and lengths, some crossing midnight
+                start = cursor + timedelta(minutes=rng.randrange(0, 180))
+                end = start + timedelta(minutes=rng.randrange(5, 300))
+                Booking.objects.create(room=room, user=cls.user, title="seed", start_at=start, end_at=end)
+                cursor = end
+
+    def _bitmaps(self, rooms=None):
+        rows = RoomOccupancy.objects.filter(room__in=rooms) if rooms is not None else RoomOccupancy.objects.all()
+        return sorted(rows.values_list("room_id", "day", "slots"), key=lambda row: row[:2])
+
+    def _assert_matches_interval_query(self, samples=300, rooms=None, first=None, days=8):
+        rng = random.Random(samples)
+        rooms = rooms if rooms is not None else Room.objects.all()
+        first = first or self.first
+        for _ in range(samples):
+            start = first + timedelta(minutes=rng.randrange(0, days * 24 * 60))
+            end = start + timedelta(minutes=rng.randrange(1, 10 * 60))
+            self.assertEqual(
+                set(occupancy.available(rooms, start, end).values_list("pk", flat=True)),
+                set(search.free_between(rooms, start, end).values_list("pk", flat=True)),
+                f"window {start:%Y-%m-%d %H:%M} - {end:%Y-%m-%d %H:%M}",
+            )
+
+    def test_available_matches_the_interval_query(self):
+        self._assert_matches_interval_query()
+
+    def test_incremental_maintenance_matches_a_rebuild(self):
+        rng = random.Random(7)
+        bookings = list(Booking.objects.order_by("pk"))
+        for booking in rng.sample(bookings, 30):
+            booking.delete()
+        for booking in rng.sample([b for b in bookings if b.pk], 30):
+            # Move to another room and time; skip moves that would overlap
+            booking.room = rng.choice(self.rooms)
+            booking.start_at += timedelta(days=rng.randrange(1, 3), minutes=rng.randrange(-90, 90))
+            booking.end_at = booking.start_at + timedelta(minutes=rng.randrange(5, 120))
+            try:
+                booking.save()
+            except ValidationError:
+                pass
+        maintained = self._bitmaps()
+        occupancy.rebuild()
+        self.assertEqual(maintained, self._bitmaps())
+        self._assert_matches_interval_query(samples=100)
+
+    def test_dst_transition_days(self):
+        utc = datetime.timezone.utc
+        with timezone.override("Europe/Berlin"):
+            room = Room.objects.create(name="DST", size=RoomSize.SMALL, category=RoomCategory.MEETING)
+            # 02:30 CEST - 02:15 CET on the fall-back day: 45 minutes that run backwards on the wall clock
+            start, end = datetime.datetime(2030, 10, 27, 0, 30, tzinfo=utc), datetime.datetime(2030, 10, 27, 1, 15, tzinfo=utc)
+            Booking.objects.create(room=room, user=self.user, title="fold", start_at=start, end_at=end)
+            rooms = Room.objects.filter(pk=room.pk)
+            self.assertFalse(occupancy.available(rooms, start, end).exists())
+            self.assertFalse(occupancy.available(rooms, start + timedelta(minutes=15), end - timedelta(minutes=15)).exists())
+            self.assertTrue(occupancy.available(rooms, end, end + timedelta(hours=1)).exists())
+
+            rng = random.Random(27)
+            dst_rooms = [room] + [
+                Room.objects.create(name=f"DST {i}", size=RoomSize.SMALL, category=RoomCategory.MEETING) for i in range(4)
+            ]
+            for first in (datetime.date(2030, 3, 30), datetime.date(2030, 10, 26)):
+                for dst_room in dst_rooms:
+                    # Arithmetic in UTC: wall-clock arithmetic would skip or repeat the DST hour
+                    cursor = _at(first, 20).astimezone(utc) + timedelta(minutes=rng.randrange(0, 60))
+                    for _ in range(12):
+                        begin = cursor + timedelta(minutes=rng.randrange(0, 60))
+                        cursor = begin + timedelta(minutes=rng.randrange(5, 150))
+                        if not dst_room.bookings.filter(start_at__lt=cursor, end_at__gt=begin).exists():
+                            Booking.objects.create(room=dst_room, user=self.user, title="seed", start_at=begin, end_at=cursor)
+                rooms = Room.objects.filter(pk__in=[r.pk for r in dst_rooms])
+                self._assert_matches_interval_query(samples=200, rooms=rooms, first=_at(first, 18), days=1)
+            # The seeded rooms' bitmaps were built in the default time zone; compare these only
+            maintained = self._bitmaps(rooms)
+            occupancy.rebuild()
+            self.assertEqual(maintained, self._bitmaps(rooms))
+
+
+class RoomSearchTests(TestCase):
+    def test_rooms_booked_across_a_dst_change_are_not_offered(self):
+        user = get_user_model().objects.create_user("booker", password="x")
+        utc = datetime.timezone.utc
+        with timezone.override("Europe/Berlin"):
+            booked = Room.objects.create(name="Booked", size=RoomSize.SMALL, category=RoomCategory.MEETING)
+            free = Room.objects.create(name="Free", size=RoomSize.SMALL, category=RoomCategory.MEETING)
+            # The repeated hour of the fall-back day, and the hour after the skipped one in spring
+            for start in (datetime.datetime(2030, 10, 27, 0, 30, tzinfo=utc), datetime.datetime(2030, 3, 31, 1, 0, tzinfo=utc)):
+                end = start + timedelta(minutes=45)
+                Booking.objects.create(room=booked, user=user, start_at=start, end_at=end)
+                for window in ((start, end), (start + timedelta(minutes=20), end), (start - timedelta(hours=1), start + timedelta(minutes=1))):
+                    self.assertEqual(list(search.matching_rooms(start_at=window[0], end_at=window[1])), [free])
+                self.assertEqual(list(search.matching_rooms(start_at=end, end_at=end + timedelta(hours=1))), [booked, free])
+
+
+def _at(day, hour, minute=0):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time(hour, minute)))
+
+
+class SlotSweepTests(TestCase):
+    day = datetime.date(2030, 3, 4)
+
+    def test_gaps_between_bookings_round_up_to_the_grid(self):
+        windows = [(_at(self.day, 9), _at(self.day, 17))]
+        bookings = [(_at(self.day, 10), _at(self.day, 11)), (_at(self.day, 11, 30), _at(self.day, 12, 10))]
+        self.assertEqual(
+            slots.sweep(bookings, windows, timedelta(minutes=30)),
+            [
+                (_at(self.day, 9), _at(self.day, 9, 30)),
+                (_at(self.day, 11), _at(self.day, 11, 30)),
+                (_at(self.day, 12, 15), _at(self.day, 12, 45)),
+            ],
+        )
+
+    def test_gaps_shorter_than_the_duration_are_skipped(self):
+        windows = [(_at(self.day, 9), _at(self.day, 12))]
+        bookings = [(_at(self.day, 9), _at(self.day, 10)), (_at(self.day, 10, 45), _at(self.day, 11, 30))]
+        self.assertEqual(slots.sweep(bookings, windows, timedelta(hours=1)), [])
+
+    def test_booked_out_day_moves_to_the_next_window(self):
+        next_day = self.day + timedelta(days=1)
+        windows = [(_at(self.day, 9), _at(self.day, 17)), (_at(next_day, 9), _at(next_day, 17))]
+        # Spans the first window and the start of the second
+        bookings = [(_at(self.day, 8), _at(next_day, 9, 50))]
+        self.assertEqual(
+            slots.sweep(bookings, windows, timedelta(hours=2), limit=1),
+            [(_at(next_day, 10), _at(next_day, 12))],
+        )
+
+    def test_limit_and_one_slot_per_gap(self):
+        windows = [(_at(self.day, 8), _at(self.day, 18))]
+        self.assertEqual(slots.sweep([], windows, timedelta(minutes=15), limit=3), [(_at(self.day, 8), _at(self.day, 8, 15))])
+
+    def test_next_free_slots_matches_a_brute_force_search(self):
+        user = get_user_model().objects.create_user("booker", password="x")
+        rooms = [Room.objects.create(name=f"Room {i}", size=RoomSize.SMALL, category=RoomCategory.MEETING) for i in range(4)]
+        start = _at(timezone.localdate() + timedelta(days=1), 0)
+        rng = random.Random(23)
+        for room in rooms:
+            cursor = start + timedelta(hours=8)
+            for _ in range(12):
+                begin = cursor + timedelta(minutes=rng.randrange(0, 120))
+                cursor = begin + timedelta(minutes=rng.randrange(10, 150))
+                Booking.objects.create(room=room, user=user, start_at=begin, end_at=cursor)
+        duration = timedelta(minutes=45)
+        opens, closes = datetime.time(8), datetime.time(18)
+        found = dict(slots.next_free_slots(Room.objects.order_by("name"), start, 3, duration, opens, closes, limit=1))
+        for room in rooms:
+            expected = None
+            for offset in range(3):
+                day = timezone.localdate(start) + timedelta(days=offset)
+                candidate, close = _at(day, opens.hour), _at(day, closes.hour)
+                while expected is None and candidate + duration <= close:
+                    if not room.bookings.filter(start_at__lt=candidate + duration, end_at__gt=candidate).exists():
+                        expected = candidate
+                    candidate += timedelta(minutes=slots.GRID_MINUTES)
+            self.assertEqual(found.get(room, [(None, None)])[0][0], expected, room.name)
+
+
+class RecurrenceTests(TestCase):
+    def test_monthly_rule_skips_months_without_the_day(self):
+        with timezone.override("Europe/Berlin"):
+            start = _at(datetime.date(2030, 1, 31), 9)
+            dates = [s.date() for s, _ in recurrence.occurrences(start, start + timedelta(hours=1), Frequency.MONTHLY, count=4)]
+        self.assertEqual(
+            dates,
+            [datetime.date(2030, 1, 31), datetime.date(2030, 3, 31), datetime.date(2030, 5, 31), datetime.date(2030, 7, 31)],
+        )
+
+    def test_weekly_rule_keeps_wall_clock_time_across_dst(self):
+        with timezone.override("Europe/Berlin"):
+            # Clocks go forward on 2030-03-31 and back on 2030-10-27
+            for first in (datetime.date(2030, 3, 24), datetime.date(2030, 10, 20)):
+                start = _at(first, 9)
+                spans = recurrence.occurrences(start, start + timedelta(minutes=90), Frequency.WEEKLY, count=2)
+                self.assertEqual([timezone.localtime(s).time() for s, _ in spans], [datetime.time(9)] * 2)
+                self.assertEqual([e - s for s, e in spans], [timedelta(minutes=90)] * 2)
+                # ...so the absolute gap is a week plus or minus the DST hour
+                utc = [s.astimezone(datetime.timezone.utc) for s, _ in spans]
+                self.assertEqual(abs(utc[1] - utc[0] - timedelta(weeks=1)), timedelta(hours=1))
+
+    def test_until_interval_and_cap(self):
+        start = _at(datetime.date(2030, 1, 1), 9)
+        spans = recurrence.occurrences(start, start + timedelta(hours=1), Frequency.DAILY, interval=3, until=datetime.date(2030, 1, 10))
+        self.assertEqual([s.day for s, _ in spans], [1, 4, 7, 10])
+        spans = recurrence.occurrences(start, start + timedelta(hours=1), Frequency.DAILY, count=10_000)
+        self.assertEqual(len(spans), recurrence.MAX_OCCURRENCES)
+
+    def test_sweep_conflicts_reports_the_colliding_booking(self):
+        day = datetime.date(2030, 1, 7)
+        existing = [
+            Booking(pk=1, start_at=_at(day, 8), end_at=_at(day, 9)),
+            Booking(pk=2, start_at=_at(day + timedelta(days=1), 9, 30), end_at=_at(day + timedelta(days=1), 10)),
+            Booking(pk=3, start_at=_at(day + timedelta(days=3), 10), end_at=_at(day + timedelta(days=3), 11)),
+        ]
+        spans = [(_at(day + timedelta(days=n), 9), _at(day + timedelta(days=n), 10)) for n in range(4)]
+        conflicts = recurrence.sweep_conflicts(spans, existing)
+        # Touching (ends at 9:00 / starts at 10:00) is not an overlap
+        self.assertEqual([c.pk if c else None for c in conflicts], [None, 2, None, None])
+
+    def test_book_series_books_free_occurrences_and_reports_the_rest(self):
+        user = get_user_model().objects.create_user("booker", password="x")
+        room = Room.objects.create(name="Series", size=RoomSize.SMALL, category=RoomCategory.MEETING)
+        start = _at(timezone.localdate() + timedelta(days=1), 9)
+        taken = Booking.objects.create(room=room, user=user, start_at=start + timedelta(days=2, minutes=30), end_at=start + timedelta(days=2, hours=2))
+        series, report = recurrence.book_series(room, user, "Stand-up", start, start + timedelta(hours=1), Frequency.DAILY, count=5)
+        self.assertEqual([row["conflict"] for row in report], [None, None, taken, None, None])
+        self.assertEqual(series.bookings.count(), 4)
+        maintained = sorted(RoomOccupancy.objects.values_list("room_id", "day", "slots"), key=lambda row: row[:2])
+        occupancy.rebuild()
+        self.assertEqual(maintained, sorted(RoomOccupancy.objects.values_list("room_id", "day", "slots"), key=lambda row: row[:2]))
+
+    def test_losing_every_retry_is_a_form_error(self):
+        user = get_user_model().objects.create_user("booker", password="x")
+        room = Room.objects.create(name="Series", size=RoomSize.SMALL, category=RoomCategory.MEETING)
+        day = timezone.localdate() + timedelta(days=1)
+        lost = IntegrityError(f'conflicting key value violates exclusion constraint "{OVERLAP_CONSTRAINT}"')
+        self.client.force_login(user)
+        with mock.patch.object(recurrence, "_book", side_effect=lost) as book:
+            response = self.client.post(
+                reverse("booking_room_create", args=[room.pk]),
+                {"date": day, "start_time": "09:00", "end_time": "10:00", "title": "Stand-up",
+                 "repeat": Frequency.DAILY, "interval": 1, "count": 3},
+            )
+        self.assertEqual(book.call_count, recurrence.MAX_ATTEMPTS)
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context["form"], None, [recurrence.SERIES_OVERLAP_MESSAGE])
+        self.assertFalse(room.bookings.exists())
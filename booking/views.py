@@ -2,10 +2,12 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.core.exceptions import ValidationError
 from .models import Room, RoomSize, RoomCategory
-from .forms import BookingSearchForm, BookingCreateForm
+from .forms import BookingSearchForm, BookingCreateForm, NextSlotSearchForm
+from . import recurrence, search, slots
 from django.utils import timezone
-from datetime import date as date_cls  
+from datetime import date as date_cls, timedelta
 
 
 @login_required
@@ -17,6 +19,7 @@ def booking_list(request, category):
     category = (category or "rooms").lower()
 
     results = []
+    next_cursor = None
     size_options = []
     room_category_options = []
 
@@ -25,20 +28,16 @@ def booking_list(request, category):
         valid = form.is_valid()
         data = form.cleaned_data if valid else {}
 
-        qs = Room.objects.all()
-        size = data.get("size") or ""
-        room_cat = data.get("room_category") or ""
-        if size:
-            qs = qs.filter(size=size)
-        if room_cat:
-            qs = qs.filter(category=room_cat)
-
-        start_dt = data.get("start_dt")
-        end_dt = data.get("end_dt")
-        if start_dt and end_dt and start_dt < end_dt:
-            qs = qs.exclude(bookings__start_at__lt=end_dt, bookings__end_at__gt=start_dt)
-
-        results = list(qs.order_by("name")[:50])
+        # Availability from the occupancy bitmaps (NOT EXISTS for edge slots); pages are keyset on the room name
+        qs = search.matching_rooms(
+            size=data.get("size") or "",
+            category=data.get("room_category") or "",
+            capacity=data.get("capacity"),
+            location=data.get("location") or "",
+            start_at=data.get("start_dt"),
+            end_at=data.get("end_dt"),
+        )
+        results, next_cursor = search.page(qs, request.GET.get("after", ""))
         size_options = list(RoomSize.choices)
         room_category_options = list(RoomCategory.choices)
     else:
@@ -63,7 +62,7 @@ def booking_list(request, category):
         return redirect(f"{request.path}?{params.urlencode()}")
         
 
-    return render(request, "booking/booking_list.html", {
+    context = {
         "active": "res",
         "category": category,
         "form": form,
@@ -72,15 +71,75 @@ def booking_list(request, category):
         "end_time": request.GET.get("end_time", ""),
         "size": request.GET.get("size", ""),
         "room_category": request.GET.get("room_category", ""),
+        "capacity": request.GET.get("capacity", ""),
+        "location": request.GET.get("location", ""),
         "size_options": size_options,
         "room_category_options": room_category_options,
         "results": results,
+        "next_cursor": next_cursor,
+        "search_query": _search_query(request.GET),
+    }
+    if request.headers.get("HX-Request") == "true" and "after" in request.GET:
+        return render(request, "booking/_room_results.html", context)
+    return render(request, "booking/booking_list.html", context)
+
+def _search_query(params):
+    """The current search as a query string, without the page cursor."""
+    params = params.copy()
+    params.pop("after", None)
+    return params.urlencode()
+
+@login_required
+def booking_next_slot(request):
+    """Earliest free slots per room for a duration, capacity and room filters."""
+    form = NextSlotSearchForm(request.GET or None)
+    results = None
+    if form.is_valid():
+        data = form.cleaned_data
+        qs = Room.objects.all()
+        if data.get("capacity"):
+            qs = qs.filter(capacity__gte=data["capacity"])
+        if data.get("size"):
+            qs = qs.filter(size=data["size"])
+        if data.get("room_category"):
+            qs = qs.filter(category=data["room_category"])
+        results = slots.next_free_slots(
+            qs.order_by("name"),
+            start_at=data["start_at"],
+            days=data["days"],
+            duration=timedelta(minutes=data["duration"]),
+            opens=data["opens"],
+            closes=data["closes"],
+        )
+
+    return render(request, "booking/next_slot.html", {
+        "active": "res",
+        "category": "rooms",
+        "form": form,
+        "results": results,
+    })
+
+def _book_series(request, room, form):
+    """Book every free occurrence of a repeating booking and show what happened to each one."""
+    data = form.cleaned_data
+    try:
+        series, report = recurrence.book_series(
+            room, request.user, data.get("title", ""), data["start_dt"], data["end_dt"],
+            frequency=data["repeat"], interval=data["interval"], until=data.get("until"), count=data.get("count"),
+        )
+        if series is None:
+            raise ValidationError("Every occurrence of this series overlaps an existing booking.")
+    except ValidationError as exc:
+        # Nothing booked: every occurrence is taken, or concurrent bookings kept winning the race
+        form.add_error(None, exc)
+        return render(request, "booking/room_book.html", {"active": "res", "category": "rooms", "room": room, "form": form})
+    booked = sum(1 for row in report if row["booking"])
+    messages.success(request, f"Booked {booked} of {len(report)} occurrences.")
+    return render(request, "booking/series_report.html", {
+        "active": "res", "category": "rooms", "room": room, "series": series, "report": report,
     })
 
 @login_required
-def booking_room_create(request, room_id):
-    room = get_object_or_404(Room, pk=room_id)
-    
 def booking_room_create(request, room_id):
     room = get_object_or_404(Room, pk=room_id)
 
@@ -93,13 +152,16 @@ def booking_room_create(request, room_id):
     }
     if request.method == "POST":
         form = BookingCreateForm(request.POST, room=room)
+        if form.is_valid() and form.cleaned_data.get("repeat"):
+            return _book_series(request, room, form)
         if form.is_valid():
             try:
                 form.save(user=request.user)
                 messages.success(request, "Room booked successfully.")
                 return redirect("booking_rooms")
-            except Exception as exc:
-                messages.error(request, str(exc))
+            except ValidationError as exc:
+                # Overlaps are rejected by the database at save time (see Booking.save)
+                form.add_error(None, exc)
     else:
         form = BookingCreateForm(initial=initial, room=room)
 
@@ -1,10 +1,23 @@
-from django.contrib import admin
-from .models import Announcement, AnnouncementStatus, AnnouncementRead
+from django.contrib import admin, messages
+from django.db.models import Q
+from django.utils import timezone
+from .models import Announcement, AnnouncementAttachment, AnnouncementStatus, AnnouncementRead, AnnouncementReadDaily, DigestProgress
+from . import events, inbox, publishing, search
+from .forms import AnnouncementAdminForm
 from core.models import Role
 
 
+class AnnouncementAttachmentInline(admin.TabularInline):
+	model = AnnouncementAttachment
+	extra = 0
+	fields = ("file", "original_name", "content_type", "size", "thumbnail_status", "created_at")
+	readonly_fields = ("size", "thumbnail_status", "created_at")
+
+
 @admin.register(Announcement)
 class AnnouncementAdmin(admin.ModelAdmin):
+	form = AnnouncementAdminForm
+	inlines = (AnnouncementAttachmentInline,)
 	list_display = (
 		"title",
 		"status",
@@ -12,6 +25,7 @@ class AnnouncementAdmin(admin.ModelAdmin):
 		"publish_at",
 		"expire_at",
 		"author",
+		"read_total",
 		"created_at",
 	)
 	list_filter = ("status", "pinned", "publish_at", "expire_at", "departments")
@@ -21,26 +35,36 @@ class AnnouncementAdmin(admin.ModelAdmin):
 
 	actions = ("make_published", "make_archived")
 
+	def get_search_results(self, request, queryset, search_term):
+		# Same full-text engine as the site search; an exact slug still finds its row
+		search_term = search_term.strip()
+		if not search_term:
+			return queryset, False
+		matches = search.search(queryset, search_term).values("pk")
+		return queryset.filter(Q(pk__in=matches) | Q(slug=search_term)), False
+
 	@admin.action(description="Publish selected announcements")
 	def make_published(self, request, queryset):
-		for obj in queryset:
-			# Ensure author exists (needed for role checks)
-			if obj.author is None:
-				obj.author = request.user
-				obj.save(update_fields=["author"])
-			# Only allow GM or MANAGER to publish
-			if getattr(request.user, "role", None) not in (Role.GM, Role.MANAGER):
-				# skip publishing for unauthorized users
-				continue
-			try:
-				obj.publish()
-			except Exception:
-				# Silently skip invalid ones in bulk action; admins can open the object for details
-				continue
+		# Only allow GM or MANAGER to publish
+		if getattr(request.user, "role", None) not in (Role.GM, Role.MANAGER):
+			self.message_user(request, "Only GMs and managers can publish announcements.", messages.ERROR)
+			return
+		published, skipped, failures = publishing.bulk_publish(queryset, acting_user=request.user)
+		if published:
+			self.message_user(request, f"Published {len(published)} announcement(s).", messages.SUCCESS)
+		if skipped:
+			self.message_user(request, f"Skipped {len(skipped)} already published announcement(s).", messages.INFO)
+		for _, title, message in failures:
+			self.message_user(request, f"Not published “{title}”: {message}", messages.WARNING)
 
 	@admin.action(description="Archive selected announcements")
 	def make_archived(self, request, queryset):
-		queryset.update(status=AnnouncementStatus.ARCHIVED)
+		ids = list(queryset.values_list("id", flat=True))
+		# update() skips auto_now; bump updated_at so cached list fragments re-render
+		queryset.update(status=AnnouncementStatus.ARCHIVED, live=False, updated_at=timezone.now())
+		# update() skips post_save, so drop the inbox rows and notify live clients explicitly
+		inbox.sync_announcements(ids)
+		events.announcements_withdrawn(ids)
 
 
 @admin.register(AnnouncementRead)
@@ -48,5 +72,32 @@ class AnnouncementReadAdmin(admin.ModelAdmin):
 	list_display = ("announcement", "user", "read_at")
 	list_select_related = ("announcement", "user")
 	search_fields = ("announcement__title", "user__username", "user__first_name", "user__last_name")
-	date_hierarchy = "read_at"
+	# No date_hierarchy here: its per-period counts scan the whole receipts table.
+	# Drill down by day in the rollup admin below instead.
+
+
+@admin.register(AnnouncementReadDaily)
+class AnnouncementReadDailyAdmin(admin.ModelAdmin):
+	list_display = ("day", "announcement", "department", "reads")
+	list_select_related = ("announcement", "department")
+	list_filter = ("department",)
+	search_fields = ("announcement__title",)
+	date_hierarchy = "day"
+
+	def has_add_permission(self, request):
+		# Maintained by comms.rollups; rebuild with the rebuild_read_rollups command
+		return False
+
+	def has_change_permission(self, request, obj=None):
+		return False
+
+
+
+@admin.register(DigestProgress)
+class DigestProgressAdmin(admin.ModelAdmin):
+	list_display = ("day", "sent", "last_user_id", "started_at", "finished_at")
+	readonly_fields = ("day", "sent", "last_user_id", "started_at", "updated_at", "finished_at")
 
+	def has_add_permission(self, request):
+		# Written by the send_announcement_digest command
+		return False
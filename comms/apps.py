@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _repair_search_index(sender, using, **kwargs):
+    from .search import ensure_sqlite_triggers
+
+    ensure_sqlite_triggers(using)
 
 
 class CommsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'comms'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # SQLite table rebuilds during migrate drop the full-text search triggers
+        post_migrate.connect(_repair_search_index, sender=self, dispatch_uid="comms_repair_search_index")
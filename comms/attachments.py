@@ -0,0 +1,254 @@
+"""
+Announcement attachments: streamed uploads, precomputed previews, range downloads.
+
+Uploads go through ``HashingUploadHandler``: Django's temporary-file handler
+writes each chunk straight to disk while the handler updates a SHA-256 and
+enforces ``COMMS_ATTACHMENT_MAX_SIZE``, so the file is never held in memory.
+The temporary file is then *moved* into storage by ``FileField.save``.
+
+Image thumbnails and previews are generated once, by the
+``process_attachment_thumbnails`` worker (``process_pending()``), never in a
+request. Pillow's ``draft()`` lets JPEGs decode at a reduced scale.
+
+``serve()`` streams a stored file with ``ETag`` (the SHA-256) and
+``Last-Modified`` validators, ``If-None-Match`` / ``If-Modified-Since``
+handling and single ``Range: bytes=`` requests (206 / 416, honouring
+``If-Range``), reading ``CHUNK_SIZE`` bytes at a time.
+"""
+import hashlib
+import io
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+from .models import AnnouncementAttachment, ThumbnailStatus
+
+CHUNK_SIZE = 64 * 1024
+MAX_SIZE = getattr(settings, "COMMS_ATTACHMENT_MAX_SIZE", 25 * 1024 * 1024)
+THUMBNAIL_SIZE = (320, 320)
+PREVIEW_SIZE = (1280, 1280)
+# Served inline; anything else (HTML, SVG, ...) is forced to download
+INLINE_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp", "application/pdf")
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Temporary-file upload handler that hashes and size-checks chunks as they arrive."""
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or MAX_SIZE
+        self.too_large = False
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.too_large = True
+            self.file.close()
+            # The rest of the body is read and discarded so the view can still answer 413
+            raise StopUpload(connection_reset=False)
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        upload.sha256 = self.sha256.hexdigest()
+        return upload
+
+
+def declared_too_large(request, max_size=None):
+    """
+    Whether the declared ``Content-Length`` is clearly over the limit. The
+    body includes multipart overhead, so only ``CHUNK_SIZE`` past it counts;
+    anything closer is caught by the handler while streaming.
+    """
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return False
+    return length > (max_size or MAX_SIZE) + CHUNK_SIZE
+
+
+def _content_type(name, declared=""):
+    guessed = mimetypes.guess_type(name)[0]
+    return (guessed or declared or "application/octet-stream")[:100]
+
+
+def _initial_status(content_type):
+    return ThumbnailStatus.PENDING if content_type.startswith("image/") else ThumbnailStatus.NONE
+
+
+def create_from_upload(announcement, upload, user=None):
+    """Store an uploaded file (from ``HashingUploadHandler``) as an attachment."""
+    name = os.path.basename(upload.name)[:255]
+    content_type = _content_type(name, upload.content_type)
+    attachment = AnnouncementAttachment(
+        announcement=announcement,
+        original_name=name,
+        content_type=content_type,
+        size=upload.size,
+        sha256=getattr(upload, "sha256", ""),
+        thumbnail_status=_initial_status(content_type),
+        uploaded_by=user,
+    )
+    # Temporary uploads are moved into place, not copied
+    attachment.file.save(name, upload, save=False)
+    attachment.save()
+    return attachment
+
+
+def fill_metadata(attachment):
+    """Size, SHA-256, content type and thumbnail status for files saved outside ``create_from_upload``."""
+    digest, size = hashlib.sha256(), 0
+    for chunk in attachment.file.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+    attachment.sha256, attachment.size = digest.hexdigest(), size
+    attachment.original_name = attachment.original_name or os.path.basename(attachment.file.name)[:255]
+    attachment.content_type = attachment.content_type or _content_type(attachment.original_name)
+    attachment.thumbnail_status = _initial_status(attachment.content_type)
+
+
+# --- Thumbnails / previews (background worker) ---
+
+def _jpeg(image, size):
+    copy = image.copy()
+    copy.thumbnail(size)
+    buf = io.BytesIO()
+    copy.save(buf, "JPEG", quality=85, optimize=True)
+    return ContentFile(buf.getvalue())
+
+
+def generate_previews(attachment):
+    """Write the preview and thumbnail JPEGs for an image attachment."""
+    from PIL import Image, ImageOps
+
+    with attachment.file.open("rb") as fh, Image.open(fh) as image:
+        # JPEG only: decode at the smallest scale that still covers PREVIEW_SIZE
+        image.draft("RGB", PREVIEW_SIZE)
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail(PREVIEW_SIZE)
+    stem = os.path.splitext(os.path.basename(attachment.file.name))[0]
+    attachment.preview.save(f"{stem}-preview.jpg", _jpeg(image, PREVIEW_SIZE), save=False)
+    attachment.thumbnail.save(f"{stem}-thumb.jpg", _jpeg(image, THUMBNAIL_SIZE), save=False)
+
+
+def process_pending(limit=50):
+    """Generate previews for up to ``limit`` pending attachments. Returns ``(done, failed)``."""
+    done = failed = 0
+    for pk in list(
+        AnnouncementAttachment.objects.filter(thumbnail_status=ThumbnailStatus.PENDING)
+        .order_by("id")
+        .values_list("id", flat=True)[:limit]
+    ):
+        with transaction.atomic():
+            # Several workers may run; each row is claimed by one of them
+            attachment = (
+                AnnouncementAttachment.objects.select_for_update(skip_locked=True)
+                .filter(pk=pk, thumbnail_status=ThumbnailStatus.PENDING)
+                .first()
+            )
+            if attachment is None:
+                continue
+            try:
+                generate_previews(attachment)
+                attachment.thumbnail_status = ThumbnailStatus.READY
+                done += 1
+            except Exception:
+                attachment.thumbnail_status = ThumbnailStatus.FAILED
+                failed += 1
+            attachment.save(update_fields=["thumbnail", "preview", "thumbnail_status"])
+    return done, failed
+
+
+# --- Downloads ---
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` (inclusive) for a single ``bytes=`` range, or None to
+    send the whole file (absent, malformed or multi-range headers). Raises
+    ValueError when the range cannot be satisfied.
+    """
+    match = _RANGE.match((header or "").strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("unsatisfiable range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    value = request.headers.get("If-Range")
+    if not value:
+        return True
+    if value.startswith(('"', "W/")):
+        # Only a strong comparison counts for ranges
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def _read_range(fh, start, length):
+    try:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        fh.close()
+
+
+def serve(request, field, *, etag, last_modified, content_type, filename):
+    """Stream ``field`` (a FieldFile) with conditional and Range request support."""
+    etag = quote_etag(etag)
+    last_modified = int(last_modified.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        size = field.size
+        inline = content_type in INLINE_TYPES
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size) if _if_range_matches(request, etag, last_modified) else None
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+        else:
+            fh = field.storage.open(field.name, "rb")
+            if byte_range is None:
+                response = FileResponse(fh, content_type=content_type, as_attachment=not inline, filename=filename)
+                response.block_size = CHUNK_SIZE
+            else:
+                start, end = byte_range
+                response = StreamingHttpResponse(_read_range(fh, start, end - start + 1), status=206, content_type=content_type)
+                response["Content-Range"] = f"bytes {start}-{end}/{size}"
+                response["Content-Length"] = str(end - start + 1)
+                response["Content-Disposition"] = content_disposition_header(not inline, filename)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, max_age=3600)
+    return response
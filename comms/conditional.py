@@ -0,0 +1,115 @@
+"""
+Conditional GET (ETag / Last-Modified) for the announcement pages.
+
+Validators are built from cheap version stamps instead of the rendered page:
+
+- the visible set: ``Max(updated_at)``, ``Count`` and ``Sum(read_total)``
+  in one aggregate (the count catches rows leaving the set; the sum catches
+  read counters, which change via ``update()`` without touching
+  ``updated_at``);
+- the user's latest receipt (``Max(id)`` / ``Max(read_at)`` over an indexed FK);
+- the user's membership version (comms.membership) and pending write-behind reads.
+
+Django's ``condition()`` evaluates them before the view body runs, so a
+matching ``If-None-Match`` is answered with 304 without building querysets or
+rendering templates. Responses are marked ``private, no-cache`` so browsers
+always revalidate.
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from core.models import Role
+
+from . import membership, receipts
+from .models import Announcement, AnnouncementRead
+
+_STAMPS_ATTR = "_comms_conditional_stamps"
+
+
+def _list_scope(user):
+    """Every announcement the list page may show to ``user`` (all sections)."""
+    role = getattr(user, "role", None)
+    visible = Announcement.objects.published().visible_to(user)
+    if role == Role.GM:
+        return Announcement.objects.filter(Q(author=user) | Q(live=True))
+    if role == Role.MANAGER:
+        return Announcement.objects.filter(Q(author=user) | Q(pk__in=visible.values("pk")))
+    return visible
+
+
+def _user_stamps(user):
+    latest = AnnouncementRead.objects.filter(user=user).aggregate(id=Max("id"), at=Max("read_at"))
+    pending = ",".join(str(pk) for pk in sorted(receipts.pending_read_ids(user)))
+    return [user.pk, membership.membership_version(user.pk), latest["id"], pending], latest["at"]
+
+
+def _etag(parts):
+    return hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _skip(request):
+    # Queued flash messages are rendered by the page; never answer 304 over them
+    return not request.user.is_authenticated or len(get_messages(request)) > 0
+
+
+def list_stamps(request):
+    """``(etag, last_modified)`` for the list page, computed once per request."""
+    if not hasattr(request, _STAMPS_ATTR):
+        stamps = (None, None)
+        if not _skip(request):
+            agg = _list_scope(request.user).order_by().aggregate(
+                updated=Max("updated_at"), n=Count("id"), reads=Sum("read_total")
+            )
+            user_parts, last_read = _user_stamps(request.user)
+            parts = ["list", request.get_full_path(), request.headers.get("HX-Request"), agg["updated"], agg["n"], agg["reads"]]
+            stamps = (_etag(parts + user_parts), max(filter(None, [agg["updated"], last_read]), default=None))
+        setattr(request, _STAMPS_ATTR, stamps)
+    return getattr(request, _STAMPS_ATTR)
+
+
+def detail_stamps(request, slug):
+    """``(etag, last_modified)`` for one announcement; None when it doesn't exist (the view 404s)."""
+    if not hasattr(request, _STAMPS_ATTR):
+        stamps = (None, None)
+        row = Announcement.objects.filter(slug=slug).values("updated_at", "read_total", "publish_at", "expire_at").first()
+        if row is not None and not _skip(request):
+            user_parts, last_read = _user_stamps(request.user)
+            # The schedule window is also checked at read time, not only by the scheduler
+            now = timezone.now()
+            in_window = (row["publish_at"] is None or row["publish_at"] <= now) and (
+                row["expire_at"] is None or row["expire_at"] > now
+            )
+            parts = ["detail", slug, row["updated_at"], row["read_total"], in_window]
+            stamps = (_etag(parts + user_parts), max(filter(None, [row["updated_at"], last_read]), default=None))
+        setattr(request, _STAMPS_ATTR, stamps)
+    return getattr(request, _STAMPS_ATTR)
+
+
+def conditional_page(stamps):
+    """Serve 304s based on ``stamps(request, *args, **kwargs) -> (etag, last_modified)``."""
+
+    def decorator(view):
+        @condition(
+            etag_func=lambda request, *args, **kwargs: stamps(request, *args, **kwargs)[0],
+            last_modified_func=lambda request, *args, **kwargs: stamps(request, *args, **kwargs)[1],
+        )
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            return view(request, *args, **kwargs)
+
+        @wraps(view)
+        def outer(request, *args, **kwargs):
+            response = wrapped(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ("HX-Request",))
+            return response
+
+        return outer
+
+    return decorator
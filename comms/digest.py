@@ -0,0 +1,138 @@
+"""
+Daily e-mail digest of unread announcements.
+
+Visibility is computed per *department-membership signature* (the set of
+departments a user belongs to through FK, membership or management), not per
+user: the live announcements and their targets are loaded once per run, and
+each signature's visible set is derived from them once. Per batch of
+recipients there are two more queries - memberships (``rollups.departments_by_user``)
+and the batch's receipts for live announcements. Users whose unread sets are
+identical share one rendered digest.
+
+Messages go out through a single backend connection opened for the whole
+run, ``send_messages()`` per batch. ``DigestProgress`` records the last user
+of every sent batch; re-running the command for the same day resumes there.
+A batch interrupted mid-send may be delivered twice, never skipped.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from . import rollups
+from .models import Announcement, AnnouncementRead, DigestProgress
+
+BATCH_SIZE = 100
+MAX_ITEMS = 20
+
+
+class DigestBuilder:
+    """Live announcements, per-signature visible sets and rendered digests for one run."""
+
+    def __init__(self, base_url=""):
+        self.base_url = base_url.rstrip("/")
+        self.announcements = {
+            a.pk: a for a in Announcement.objects.active().defer("content", "content_html")
+        }
+        self.targets = {pk: set() for pk in self.announcements}
+        for announcement_id, department_id in (
+            Announcement.departments.through.objects.filter(announcement_id__in=self.targets)
+            .values_list("announcement_id", "department_id")
+        ):
+            self.targets[announcement_id].add(department_id)
+        self._visible = {}
+        self._rendered = {}
+
+    def visible(self, signature):
+        """Live announcement IDs visible to members of exactly ``signature`` (a frozenset of department IDs)."""
+        if signature not in self._visible:
+            self._visible[signature] = frozenset(
+                pk for pk, departments in self.targets.items() if not departments or departments & signature
+            )
+        return self._visible[signature]
+
+    def unread(self, users):
+        """``(user, unread_ids)`` for each user in ``users`` with something unread."""
+        if not self.announcements:
+            return
+        user_ids = [user.pk for user in users]
+        departments = rollups.departments_by_user(user_ids)
+        read = {}
+        for user_id, announcement_id in AnnouncementRead.objects.filter(
+            user_id__in=user_ids, announcement__live=True
+        ).values_list("user_id", "announcement_id"):
+            read.setdefault(user_id, set()).add(announcement_id)
+        for user in users:
+            unread = self.visible(frozenset(departments.get(user.pk, ()))) - read.get(user.pk, set())
+            if unread:
+                yield user, unread
+
+    def render(self, announcement_ids):
+        """``(subject, text, html)`` for a set of unread announcements, rendered once per distinct set."""
+        key = frozenset(announcement_ids)
+        if key not in self._rendered:
+            items = sorted(
+                (self.announcements[pk] for pk in key),
+                key=lambda a: (not a.pinned, -(a.publish_at or a.created_at).timestamp(), a.pk),
+            )
+            context = {
+                "items": [(a, self.base_url + reverse("announcement_detail", args=[a.slug])) for a in items[:MAX_ITEMS]],
+                "more": max(0, len(items) - MAX_ITEMS),
+                "total": len(items),
+                "list_url": self.base_url + reverse("announcement_list"),
+            }
+            subject = f"{len(items)} unread announcement{'s' if len(items) != 1 else ''}"
+            self._rendered[key] = (
+                subject,
+                render_to_string("comms/email/digest.txt", context),
+                render_to_string("comms/email/digest.html", context),
+            )
+        return self._rendered[key]
+
+    def message(self, user, announcement_ids, connection):
+        subject, text, html = self.render(announcement_ids)
+        message = EmailMultiAlternatives(subject, text, settings.DEFAULT_FROM_EMAIL, [user.email], connection=connection)
+        message.attach_alternative(html, "text/html")
+        return message
+
+
+def recipients(after_user_id=0):
+    User = get_user_model()
+    return (
+        User.objects.filter(is_active=True, pk__gt=after_user_id)
+        .exclude(email="")
+        .order_by("pk")
+        .only("pk", "email")
+    )
+
+
+def send_digests(day=None, batch_size=BATCH_SIZE, base_url="", restart=False):
+    """
+    Send (or resume) the digest for ``day`` (default: today). Returns the
+    ``DigestProgress`` row; ``finished_at`` is set once every recipient was handled.
+    """
+    day = day or timezone.localdate()
+    progress, _ = DigestProgress.objects.get_or_create(day=day)
+    if restart:
+        progress.last_user_id, progress.sent, progress.finished_at = 0, 0, None
+        progress.save()
+    if progress.finished_at:
+        return progress
+
+    builder = DigestBuilder(base_url)
+    with get_connection() as connection:
+        while True:
+            users = list(recipients(progress.last_user_id)[:batch_size])
+            if not users:
+                break
+            messages = [builder.message(user, unread, connection) for user, unread in builder.unread(users)]
+            if messages:
+                connection.send_messages(messages)
+            progress.last_user_id = users[-1].pk
+            progress.sent += len(messages)
+            progress.save(update_fields=["last_user_id", "sent", "updated_at"])
+    progress.finished_at = timezone.now()
+    progress.save(update_fields=["finished_at", "updated_at"])
+    return progress
@@ -0,0 +1,172 @@
+"""
+Announcement events for Server-Sent Events clients.
+
+Publishing code (signals, the scheduler, admin actions) calls
+``announcement_changed()`` / ``announcements_withdrawn()``; the event is
+handed to the configured broker once the transaction commits. The SSE view
+(``views.announcement_events``) subscribes to the broker and forwards the
+events each client's departments can see.
+
+Brokers (``COMMS_EVENTS_BACKEND``):
+
+- ``comms.events.InProcessBroker`` (default): subscribers of this process only.
+- ``comms.events.CacheBroker``: events go through the shared cache as a
+  numbered log that one poller per worker reads, so several ASGI workers see
+  each other's events. Use a cache shared by the workers (``CACHE_URL``).
+
+The stream is off unless ``COMMS_EVENTS_ENABLED`` is set. The scheduler runs
+in its own process, so with events enabled it requires a ``shared`` broker.
+"""
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import Announcement, AnnouncementStatus
+
+QUEUE_SIZE = 100
+
+PUBLISHED = "published"
+WITHDRAWN = "withdrawn"
+
+
+def _offer(queue, event):
+    """Deliver without blocking the publisher; a slow client loses its oldest event."""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+class InProcessBroker:
+    """Fan events out to the asyncio queues of this process's subscribers."""
+
+    # Whether events published in another process (e.g. the scheduler) reach subscribers here
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def publish(self, event):
+        self._dispatch(event)
+
+    def _dispatch(self, event):
+        # Publishers run in sync threads; each queue belongs to its subscriber's loop
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_offer, queue, event)
+
+    @asynccontextmanager
+    async def subscription(self):
+        """``async with broker.subscription() as queue:`` yields events until the block exits."""
+        entry = (asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                self._subscribers.discard(entry)
+
+
+class CacheBroker(InProcessBroker):
+    """Share events between workers through the cache: ``seq`` counter + one key per event."""
+
+    shared = True
+    SEQ_KEY = "comms:events:seq"
+    EVENT_TIMEOUT = 60
+
+    def __init__(self):
+        super().__init__()
+        self.poll_seconds = getattr(settings, "COMMS_EVENTS_POLL_SECONDS", 1.0)
+        self._pollers = {}
+
+    def _event_key(self, seq):
+        return f"comms:events:{seq}"
+
+    def publish(self, event):
+        cache.add(self.SEQ_KEY, 0, None)
+        seq = cache.incr(self.SEQ_KEY)
+        cache.set(self._event_key(seq), event, self.EVENT_TIMEOUT)
+
+    async def _poll(self):
+        last = await cache.aget(self.SEQ_KEY) or 0
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            latest = await cache.aget(self.SEQ_KEY) or 0
+            if latest <= last:
+                continue
+            keys = [self._event_key(seq) for seq in range(last + 1, latest + 1)]
+            found = await cache.aget_many(keys)
+            for key in keys:
+                # Events that already expired from the cache are skipped
+                if key in found:
+                    self._dispatch(found[key])
+            last = latest
+
+    @asynccontextmanager
+    async def subscription(self):
+        loop = asyncio.get_running_loop()
+        poller = self._pollers.get(loop)
+        if poller is None or poller.done():
+            self._pollers[loop] = loop.create_task(self._poll())
+        async with super().subscription() as queue:
+            yield queue
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(getattr(settings, "COMMS_EVENTS_BACKEND", "comms.events.InProcessBroker"))()
+    return _broker
+
+
+def _publish_on_commit(event):
+    transaction.on_commit(lambda: get_broker().publish(event))
+
+
+def announcement_event(announcement, retargeted=False):
+    return {
+        "type": PUBLISHED,
+        "id": announcement.pk,
+        "slug": announcement.slug,
+        "title": announcement.title,
+        "pinned": announcement.pinned,
+        "publish_at": announcement.publish_at.isoformat() if announcement.publish_at else None,
+        # Empty list: global announcement
+        "department_ids": list(announcement.departments.values_list("id", flat=True)),
+        "retargeted": retargeted,
+    }
+
+
+def announcement_changed(announcement, retargeted=False):
+    """Broadcast the current state of one announcement (live => published, otherwise withdrawn)."""
+    if announcement.live:
+        _publish_on_commit(announcement_event(announcement, retargeted=retargeted))
+    elif announcement.status != AnnouncementStatus.DRAFT:
+        announcements_withdrawn([announcement.pk])
+
+
+def announcements_went_live(announcement_ids):
+    for announcement in Announcement.objects.filter(pk__in=list(announcement_ids)):
+        _publish_on_commit(announcement_event(announcement))
+
+
+def announcements_withdrawn(announcement_ids):
+    for pk in announcement_ids:
+        _publish_on_commit({"type": WITHDRAWN, "id": pk})
+
+
+def is_visible(event, department_ids):
+    """Whether a ``published`` event targets any of the given departments (or everyone)."""
+    targets = event.get("department_ids") or []
+    return not targets or bool(set(targets) & set(department_ids))
@@ -0,0 +1,121 @@
+"""
+Streaming export of read receipts (who read which announcement, and when).
+
+Rows are read with ``QuerySet.iterator(chunk_size=...)`` - a server-side
+cursor on PostgreSQL - and written out one at a time as CSV or JSON Lines,
+so memory stays flat however many receipts match. Used by the
+``/announcements/receipts/export/`` view and the ``export_read_receipts``
+management command.
+
+The ``department`` column lists every department the reader belongs to (FK,
+member or manager - the same notion as the department filter), resolved per
+chunk of rows with ``rollups.departments_by_user``.
+"""
+import csv
+import datetime
+import json
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from departments.models import Department
+
+from . import rollups
+from .models import Announcement, AnnouncementRead
+
+CHUNK_SIZE = 2000
+FORMATS = ("csv", "jsonl")
+
+COLUMNS = (
+    ("announcement", "announcement__slug"),
+    ("announcement_title", "announcement__title"),
+    ("username", "user__username"),
+    ("first_name", "user__first_name"),
+    ("last_name", "user__last_name"),
+    # Replaced by the reader's department names in _rows()
+    ("department", "user_id"),
+    ("read_at", "read_at"),
+)
+
+
+class ExportFilterError(ValueError):
+    pass
+
+
+def _day_start(value, name):
+    day = parse_date(value) if value else None
+    if value and day is None:
+        raise ExportFilterError(f"Invalid {name} date {value!r}; use YYYY-MM-DD.")
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min)) if day else None
+
+
+def receipts_queryset(announcement=None, department=None, since=None, until=None):
+    """
+    Receipts matching the filters, as value tuples in ``COLUMNS`` order.
+    ``announcement`` is a slug, ``department`` an ID or name, ``since`` /
+    ``until`` inclusive ``YYYY-MM-DD`` dates.
+    """
+    qs = AnnouncementRead.objects.all()
+    if announcement:
+        if not Announcement.objects.filter(slug=announcement).exists():
+            raise ExportFilterError(f"Unknown announcement {announcement!r}.")
+        qs = qs.filter(announcement__slug=announcement)
+    if department:
+        lookup = Q(pk=department) if str(department).isdigit() else Q(name=department)
+        dept = Department.objects.filter(lookup).first()
+        if dept is None:
+            raise ExportFilterError(f"Unknown department {department!r}.")
+        # Same membership notion as visibility: FK, member or manager
+        members = get_user_model().objects.filter(
+            Q(department=dept) | Q(member_departments=dept) | Q(managed_departments=dept)
+        )
+        qs = qs.filter(user__in=members.values("pk"))
+    start, end = _day_start(since, "since"), _day_start(until, "until")
+    if start:
+        qs = qs.filter(read_at__gte=start)
+    if end:
+        # Range on the raw column, not a __date lookup, so announcement_read_at_idx applies
+        qs = qs.filter(read_at__lt=end + datetime.timedelta(days=1))
+    return qs.order_by("id").values_list(*[field for _, field in COLUMNS])
+
+
+DEPARTMENT_INDEX = [name for name, _ in COLUMNS].index("department")
+
+
+def _rows(queryset):
+    names = dict(Department.objects.values_list("id", "name"))
+    rows = queryset.iterator(chunk_size=CHUNK_SIZE)
+    while chunk := list(islice(rows, CHUNK_SIZE)):
+        departments = rollups.departments_by_user({row[DEPARTMENT_INDEX] for row in chunk})
+        for row in chunk:
+            row = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in row]
+            member_of = sorted(names[pk] for pk in departments.get(row[DEPARTMENT_INDEX], ()) if pk in names)
+            row[DEPARTMENT_INDEX] = "; ".join(member_of) or None
+            yield row
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in COLUMNS])
+    for row in _rows(queryset):
+        yield writer.writerow(["" if value is None else value for value in row])
+
+
+def iter_jsonl(queryset):
+    names = [name for name, _ in COLUMNS]
+    for row in _rows(queryset):
+        yield json.dumps(dict(zip(names, row))) + "\n"
+
+
+def iter_export(queryset, fmt):
+    return iter_csv(queryset) if fmt == "csv" else iter_jsonl(queryset)
@@ -1,7 +1,6 @@
 from django import forms
-from django.utils.text import slugify
-
 from .models import Announcement, AnnouncementStatus
+from .slugs import RESERVED_SLUGS, allocate_slug
 from core.models import Role
 from departments.models import Department
 
@@ -37,29 +36,36 @@ class AnnouncementForm(forms.ModelForm):
     def clean(self):
         cleaned = super().clean()
         title = cleaned.get("title")
-        if not title:
-            return cleaned
         # Pre-generate a unique slug based on title if slug not provided via admin (our form hides slug)
-        base = slugify(title)
-        if not base:
-            return cleaned
-        slug = base
-        qs = Announcement.objects.all()
-        if self.instance.pk:
-            qs = qs.exclude(pk=self.instance.pk)
-        i = 2
-        while qs.filter(slug=slug).exists():
-            slug = f"{base}-{i}"
-            i += 1
-        self._generated_slug = slug
+        if title and not self.instance.slug:
+            self._generated_slug = allocate_slug(title, exclude_pk=self.instance.pk)
         return cleaned
 
     def save(self, commit=True):
         obj = super().save(commit=False)
         # Only set slug if empty (admin prepopulates otherwise)
         if not obj.slug:
-            obj.slug = getattr(self, "_generated_slug", slugify(obj.title or ""))
+            obj.slug = getattr(self, "_generated_slug", "") or allocate_slug(obj.title)
         if commit:
             obj.save()
             self.save_m2m()
         return obj
+
+
+class AnnouncementAdminForm(forms.ModelForm):
+    """Admin form: a prepopulated slug that is already taken moves to the next free suffix."""
+
+    class Meta:
+        model = Announcement
+        fields = "__all__"
+
+    def clean_slug(self):
+        slug = self.cleaned_data.get("slug")
+        if not slug:
+            return slug
+        taken = Announcement.objects.filter(slug=slug)
+        if self.instance.pk:
+            taken = taken.exclude(pk=self.instance.pk)
+        if slug in RESERVED_SLUGS or taken.exists():
+            return allocate_slug(slug, exclude_pk=self.instance.pk)
+        return slug
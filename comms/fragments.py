@@ -0,0 +1,159 @@
+"""
+Rendered-fragment cache for announcement list items.
+
+The static part of an item (title, badges, targeted departments, excerpt)
+only changes when the announcement is edited or re-targeted, so it is
+rendered once and cached under ``(id, updated_at, department-set version)``:
+
+- edits bump ``updated_at`` (``auto_now``), so the key moves on save;
+- department changes (re-targeting, renames, deletes) rotate the
+  per-announcement department-set version from comms.signals.
+
+Per-user parts such as the read button stay outside the cached block.
+Hit/miss counts and the render time spent on misses are kept in the cache
+so ``stats()`` can estimate the render time saved.
+
+A list page goes through one ``FragmentBatch``: the versions and fragments
+of all its items are fetched with ``get_many``, rendered misses are stored
+with one ``set_many`` and the counters are bumped once per page, instead of
+a version get, a fragment get and a counter incr per item.
+"""
+import uuid
+
+from django.core.cache import cache
+
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+HITS_KEY = "comms:fragments:hits"
+MISSES_KEY = "comms:fragments:misses"
+RENDER_US_KEY = "comms:fragments:render_us"
+
+
+def _version_key(announcement_id):
+    return f"comms:fragments:departments:{announcement_id}"
+
+
+def departments_version(announcement_id) -> str:
+    """Opaque token that changes whenever the announcement's department set (or a department name) changes."""
+    key = _version_key(announcement_id)
+    version = cache.get(key)
+    if version is None:
+        # Fresh random token: fragments cached under an evicted version stay unreachable
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(announcement_ids):
+    """Rotate the department-set version of the given announcements."""
+    cache.set_many({_version_key(pk): uuid.uuid4().hex for pk in announcement_ids}, None)
+
+
+def departments_versions(announcement_ids) -> dict:
+    """``{announcement_id: departments_version}`` in one ``get_many`` (plus one ``set_many`` for missing ones)."""
+    keys = {pk: _version_key(pk) for pk in announcement_ids}
+    versions = cache.get_many(list(keys.values()))
+    missing = {key: uuid.uuid4().hex for key in keys.values() if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return {pk: versions[key] for pk, key in keys.items()}
+
+
+def fragment_key(variant, announcement, version=None) -> str:
+    updated = announcement.updated_at.timestamp() if announcement.updated_at else 0
+    if version is None:
+        version = departments_version(announcement.pk)
+    return f"comms:fragment:{variant}:{announcement.pk}:{updated}:{version}"
+
+
+class FragmentBatch:
+    """
+    Cached fragments of a page of announcements. The first lookup of a
+    variant fetches it for every item; ``finish()`` stores what was rendered
+    and records the page's hits and misses.
+    """
+
+    def __init__(self, announcements):
+        self.announcements = {announcement.pk: announcement for announcement in announcements}
+        self.versions = {}
+        self.keys = {}
+        self.found = {}
+        self.rendered = {}
+        self.hits = self.misses = 0
+        self.render_seconds = 0.0
+
+    def key(self, variant, announcement):
+        if (variant, announcement.pk) not in self.keys:
+            self._fetch(variant, announcement)
+        return self.keys[(variant, announcement.pk)]
+
+    def _fetch(self, variant, announcement):
+        self.announcements.setdefault(announcement.pk, announcement)
+        unversioned = [pk for pk in self.announcements if pk not in self.versions]
+        if unversioned:
+            self.versions.update(departments_versions(unversioned))
+        keys = {
+            (variant, pk): fragment_key(variant, item, self.versions[pk])
+            for pk, item in self.announcements.items()
+            if (variant, pk) not in self.keys
+        }
+        self.keys.update(keys)
+        self.found.update(cache.get_many(list(keys.values())))
+
+    def get(self, variant, announcement):
+        """Cached HTML, or None on a miss."""
+        html = self.found.get(self.key(variant, announcement))
+        if html is not None:
+            self.hits += 1
+        return html
+
+    def add(self, variant, announcement, html, render_seconds):
+        key = self.key(variant, announcement)
+        self.found[key] = self.rendered[key] = html
+        self.misses += 1
+        self.render_seconds += render_seconds
+
+    def finish(self):
+        if self.rendered:
+            cache.set_many(self.rendered, FRAGMENT_TIMEOUT)
+            self.rendered = {}
+        record(self.hits, self.misses, self.render_seconds)
+        self.hits = self.misses = 0
+        self.render_seconds = 0.0
+
+
+def _incr(key, delta=1):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+def record(hits=0, misses=0, render_seconds=0.0):
+    """Add to the hit/miss counters (one ``incr`` per non-zero counter)."""
+    if hits:
+        _incr(HITS_KEY, hits)
+    if misses:
+        _incr(MISSES_KEY, misses)
+        _incr(RENDER_US_KEY, int(render_seconds * 1_000_000))
+
+
+def stats() -> dict:
+    values = cache.get_many([HITS_KEY, MISSES_KEY, RENDER_US_KEY])
+    hits, misses = values.get(HITS_KEY, 0), values.get(MISSES_KEY, 0)
+    render_ms = values.get(RENDER_US_KEY, 0) / 1000
+    avg_render_ms = render_ms / misses if misses else 0.0
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "avg_render_ms": round(avg_render_ms, 3),
+        # Each hit skipped one render of roughly the average miss cost
+        "render_ms_saved": round(hits * avg_render_ms, 3),
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY, RENDER_US_KEY])
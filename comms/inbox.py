@@ -0,0 +1,184 @@
+"""
+Per-user announcement inbox (fan-out on publish).
+
+"What can user X see" is materialized into ``AnnouncementInbox`` rows so the
+list/detail/read views answer it with one indexed lookup on ``user_id``
+instead of the ``for_departments()`` OR + M2M join + DISTINCT.
+
+Rows are written when an announcement is published, re-targeted, archived
+or expires, and when a user's department membership changes (see
+comms.signals). ``rebuild_announcement_inbox`` and ``check_announcement_inbox``
+management commands cover backfills and drift.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import membership, unread
+from .models import Announcement, AnnouncementInbox, AnnouncementStatus
+
+
+def audience_user_ids(announcement):
+    """IDs of active users targeted by the announcement (global => everyone)."""
+    User = get_user_model()
+    users = User.objects.filter(is_active=True)
+    dept_ids = list(announcement.departments.values_list("id", flat=True))
+    if dept_ids:
+        users = users.filter(
+            Q(department__in=dept_ids)
+            | Q(member_departments__in=dept_ids)
+            | Q(managed_departments__in=dept_ids)
+        ).distinct()
+    return set(users.values_list("id", flat=True))
+
+
+def _is_inbox_candidate(announcement, now=None):
+    """Published and not yet expired (future publish_at is filtered at read time)."""
+    if announcement.status != AnnouncementStatus.PUBLISHED:
+        return False
+    now = now or timezone.now()
+    return not (announcement.expire_at and announcement.expire_at <= now)
+
+
+@transaction.atomic
+def sync_announcement(announcement):
+    """
+    Bring the inbox rows of one announcement in line with its status,
+    schedule and targeting. Returns ``(added_user_ids, removed_user_ids)``.
+    """
+    entries = AnnouncementInbox.objects.filter(announcement=announcement)
+    existing = set(entries.values_list("user_id", flat=True))
+    if not _is_inbox_candidate(announcement):
+        entries.delete()
+        unread.invalidate(existing)
+        return set(), existing
+
+    wanted = audience_user_ids(announcement)
+    removed = existing - wanted
+    added = wanted - existing
+    if removed:
+        entries.filter(user_id__in=removed).delete()
+    # Keep the copied schedule window in step with the announcement
+    entries.exclude(publish_at=announcement.publish_at, expire_at=announcement.expire_at).update(
+        publish_at=announcement.publish_at, expire_at=announcement.expire_at
+    )
+    AnnouncementInbox.objects.bulk_create(
+        [
+            AnnouncementInbox(
+                user_id=uid,
+                announcement=announcement,
+                publish_at=announcement.publish_at,
+                expire_at=announcement.expire_at,
+            )
+            for uid in added
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    unread.fanned_out(announcement, added, removed)
+    return added, removed
+
+
+def sync_announcements(announcement_ids):
+    """Re-sync several announcements (used after bulk ``update()`` calls)."""
+    for announcement in Announcement.objects.filter(pk__in=list(announcement_ids)):
+        sync_announcement(announcement)
+
+
+def _visible_announcements(user, now=None):
+    """Map of announcement id -> (publish_at, expire_at) the user should see."""
+    now = now or timezone.now()
+    qs = (
+        Announcement.objects.published()
+        .filter(Q(expire_at__isnull=True) | Q(expire_at__gt=now))
+        .for_departments(membership.department_ids(user, refresh=True))
+        .order_by()
+    )
+    return {pk: (publish_at, expire_at) for pk, publish_at, expire_at in qs.values_list("id", "publish_at", "expire_at")}
+
+
+@transaction.atomic
+def sync_user(user):
+    """
+    Rebuild one user's inbox after a membership change.
+    Returns ``(added_announcement_ids, removed_announcement_ids)``.
+    """
+    entries = AnnouncementInbox.objects.filter(user=user)
+    existing = set(entries.values_list("announcement_id", flat=True))
+    wanted = _visible_announcements(user) if user.is_active else {}
+
+    removed = existing - set(wanted)
+    added = set(wanted) - existing
+    if removed:
+        entries.filter(announcement_id__in=removed).delete()
+    AnnouncementInbox.objects.bulk_create(
+        [
+            AnnouncementInbox(user=user, announcement_id=pk, publish_at=wanted[pk][0], expire_at=wanted[pk][1])
+            for pk in added
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    if added or removed:
+        unread.invalidate([user.pk])
+    return added, removed
+
+
+def sync_users(user_ids):
+    """Rebuild the inbox of several users."""
+    User = get_user_model()
+    for user in User.objects.filter(pk__in=list(user_ids)):
+        sync_user(user)
+
+
+def prune_expired(now=None):
+    """Drop inbox rows whose announcement has expired. Returns rows deleted."""
+    now = now or timezone.now()
+    deleted, _ = AnnouncementInbox.objects.filter(expire_at__lte=now).delete()
+    return deleted
+
+
+def rebuild_all():
+    """Rebuild the whole inbox from announcements. Returns number of announcements synced."""
+    now = timezone.now()
+    candidates = Announcement.objects.published().filter(Q(expire_at__isnull=True) | Q(expire_at__gt=now))
+    synced = 0
+    for announcement in candidates.iterator():
+        sync_announcement(announcement)
+        synced += 1
+    # Anything else (drafts, archived, expired) must not have rows
+    AnnouncementInbox.objects.exclude(announcement__in=candidates).delete()
+    return synced
+
+
+def check_consistency(fix=False):
+    """
+    Compare the inbox against the visibility rules.
+
+    Returns a list of ``(announcement_id, missing_user_ids, stale_user_ids)``
+    for every announcement whose rows are wrong. With ``fix=True`` each
+    offending announcement is re-synced.
+    """
+    now = timezone.now()
+    problems = []
+    candidates = Announcement.objects.published().filter(Q(expire_at__isnull=True) | Q(expire_at__gt=now))
+    for announcement in candidates.iterator():
+        wanted = audience_user_ids(announcement)
+        existing = set(AnnouncementInbox.objects.filter(announcement=announcement).values_list("user_id", flat=True))
+        if wanted != existing:
+            problems.append((announcement.pk, wanted - existing, existing - wanted))
+            if fix:
+                sync_announcement(announcement)
+
+    orphaned = (
+        AnnouncementInbox.objects.exclude(announcement__in=candidates)
+        .values_list("announcement_id", flat=True)
+        .distinct()
+    )
+    for announcement_id in list(orphaned):
+        stale = set(AnnouncementInbox.objects.filter(announcement_id=announcement_id).values_list("user_id", flat=True))
+        problems.append((announcement_id, set(), stale))
+        if fix:
+            AnnouncementInbox.objects.filter(announcement_id=announcement_id).delete()
+    return problems
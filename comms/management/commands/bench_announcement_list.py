@@ -0,0 +1,88 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from comms.models import Announcement, AnnouncementStatus
+from comms.pagination import keyset_page
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the first page of the active announcement list while expired history grows. "
+        "Runs inside a transaction that is rolled back; nothing is kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--steps", default="0,1000,10000,50000", help="Comma-separated expired-history sizes")
+        parser.add_argument("--live", type=int, default=50, help="Live announcements to keep in the list")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per step")
+
+    def handle(self, *args, **options):
+        steps = sorted(int(x) for x in options["steps"].split(","))
+        try:
+            with transaction.atomic():
+                self._run(steps, options["live"], options["repeat"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, steps, live_count, repeat):
+        now = timezone.now()
+        author = get_user_model().objects.filter(is_active=True).first()
+        Announcement.objects.bulk_create(
+            [
+                Announcement(
+                    title=f"bench live {i}", slug=f"bench-live-{i}", content="x", author=author,
+                    status=AnnouncementStatus.PUBLISHED, publish_at=now - timedelta(minutes=i), live=True,
+                )
+                for i in range(live_count)
+            ]
+        )
+        self.stdout.write(f"{'expired rows':>12}  {'live flag (ms)':>14}  {'time window (ms)':>16}")
+        created = 0
+        for target in steps:
+            self._add_expired(created, target, now, author)
+            created = target
+            stored = self._time(lambda: keyset_page(Announcement.objects.active(), None), repeat)
+            legacy = self._time(lambda: keyset_page(self._time_window(now), None), repeat)
+            self.stdout.write(f"{target:>12}  {stored:>14.2f}  {legacy:>16.2f}")
+
+    def _add_expired(self, start, stop, now, author):
+        batch = []
+        for i in range(start, stop):
+            publish_at = now - timedelta(days=30, minutes=i)
+            batch.append(Announcement(
+                title=f"bench expired {i}", slug=f"bench-expired-{i}", content="x", author=author,
+                status=AnnouncementStatus.PUBLISHED, publish_at=publish_at,
+                expire_at=publish_at + timedelta(days=1), live=False,
+            ))
+            if len(batch) == 5000:
+                Announcement.objects.bulk_create(batch)
+                batch = []
+        Announcement.objects.bulk_create(batch)
+
+    @staticmethod
+    def _time_window(now):
+        """The pre-scheduler definition of active(), for comparison."""
+        return (
+            Announcement.objects.published()
+            .filter(Q(publish_at__isnull=True) | Q(publish_at__lte=now))
+            .filter(Q(expire_at__isnull=True) | Q(expire_at__gt=now))
+        )
+
+    @staticmethod
+    def _time(fn, repeat):
+        fn()  # warm-up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) * 1000 / repeat
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from comms import inbox
+
+
+class Command(BaseCommand):
+    help = "Check the announcement inbox against the visibility rules (optionally fix drift)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Re-sync announcements with drifted rows")
+
+    def handle(self, *args, **options):
+        problems = inbox.check_consistency(fix=options["fix"])
+        for announcement_id, missing, stale in problems:
+            self.stdout.write(
+                f"announcement {announcement_id}: {len(missing)} missing, {len(stale)} stale"
+            )
+        if not problems:
+            self.stdout.write(self.style.SUCCESS("Inbox is consistent."))
+        elif options["fix"]:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(problems)} announcements."))
+        else:
+            raise CommandError(f"{len(problems)} announcements out of sync; re-run with --fix.")
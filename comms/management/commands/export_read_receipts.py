@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from comms import exports
+
+
+class Command(BaseCommand):
+    help = "Stream read receipts (joined with user and department) as CSV or JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--announcement", help="Announcement slug")
+        parser.add_argument("--department", help="Department ID or name (members, managers and FK)")
+        parser.add_argument("--since", help="First day to include (YYYY-MM-DD)")
+        parser.add_argument("--until", help="Last day to include (YYYY-MM-DD)")
+        parser.add_argument("--format", choices=exports.FORMATS, default="csv")
+        parser.add_argument("--output", help="Write to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        try:
+            queryset = exports.receipts_queryset(
+                announcement=options["announcement"],
+                department=options["department"],
+                since=options["since"],
+                until=options["until"],
+            )
+        except exports.ExportFilterError as e:
+            raise CommandError(str(e))
+
+        chunks = exports.iter_export(queryset, options["format"])
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        written = 0
+        with open(options["output"], "w", newline="", encoding="utf-8") as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+                written += 1
+        rows = written - 1 if options["format"] == "csv" else written
+        self.stdout.write(self.style.SUCCESS(f"Exported {rows} receipts to {options['output']}."))
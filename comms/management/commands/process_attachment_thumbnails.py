@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from comms import attachments
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnails and previews for newly uploaded image attachments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Process the pending queue and exit (for cron)")
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--sleep", type=float, default=5.0, help="Pause when the queue is empty, in seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            done, failed = attachments.process_pending(options["batch_size"])
+            if done or failed:
+                self.stdout.write(f"{timezone.now():%Y-%m-%d %H:%M:%S} previews +{done} / failed {failed}")
+                continue
+            if options["once"]:
+                return
+            time.sleep(options["sleep"])
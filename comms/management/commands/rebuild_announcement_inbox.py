@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from comms import inbox
+from comms.models import Announcement
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed announcement inbox (all, or for given announcements/users)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--announcement", action="append", default=[], help="Announcement slug (repeatable)")
+        parser.add_argument("--user", action="append", default=[], help="Username (repeatable)")
+        parser.add_argument("--expired-only", action="store_true", help="Only drop rows of expired announcements")
+
+    def handle(self, *args, **options):
+        if options["expired_only"]:
+            deleted = inbox.prune_expired()
+            self.stdout.write(self.style.SUCCESS(f"Removed {deleted} expired inbox rows."))
+            return
+
+        slugs, usernames = options["announcement"], options["user"]
+        if not slugs and not usernames:
+            synced = inbox.rebuild_all()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt inbox for {synced} announcements."))
+            return
+
+        for announcement in Announcement.objects.filter(slug__in=slugs):
+            added, removed = inbox.sync_announcement(announcement)
+            self.stdout.write(f"{announcement.slug}: +{len(added)} / -{len(removed)}")
+        for user in get_user_model().objects.filter(username__in=usernames):
+            added, removed = inbox.sync_user(user)
+            self.stdout.write(f"{user.username}: +{len(added)} / -{len(removed)}")
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from comms import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily read-receipt rollups (AnnouncementReadDaily) from the receipts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        written = rollups.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup rows."))
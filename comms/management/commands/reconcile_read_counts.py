@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from comms.models import Announcement, AnnouncementRead
+
+
+class Command(BaseCommand):
+    help = "Fix drift in Announcement.read_total against the actual read receipts, in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        actual = Subquery(
+            AnnouncementRead.objects.filter(announcement=OuterRef("pk"))
+            .order_by()
+            .values("announcement")
+            .annotate(n=Count("id"))
+            .values("n"),
+            output_field=IntegerField(),
+        )
+        last_pk, fixed, checked = 0, 0, 0
+        while True:
+            # Stored and actual counts come from one statement, so the delta is consistent
+            rows = list(
+                Announcement.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .annotate(actual=Coalesce(actual, Value(0)))
+                .values_list("pk", "read_total", "actual")[:batch_size]
+            )
+            if not rows:
+                break
+            for pk, stored, counted in rows:
+                if stored != counted:
+                    # Apply a delta rather than an absolute value so concurrent increments survive
+                    Announcement.objects.filter(pk=pk).update(read_total=F("read_total") + (counted - stored))
+                    fixed += 1
+            checked += len(rows)
+            last_pk = rows[-1][0]
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} announcements, fixed {fixed}."))
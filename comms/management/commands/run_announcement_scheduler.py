@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from comms import events, scheduler
+
+
+class Command(BaseCommand):
+    help = "Move announcements into and out of the live state at publish_at/expire_at."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Apply due transitions and exit (for cron)")
+        parser.add_argument("--max-sleep", type=float, default=60.0, help="Upper bound between checks, in seconds")
+
+    def handle(self, *args, **options):
+        if settings.COMMS_EVENTS_ENABLED and not events.get_broker().shared:
+            raise CommandError(
+                "COMMS_EVENTS_ENABLED needs a broker shared between processes for scheduler events: "
+                "set COMMS_EVENTS_BACKEND=comms.events.CacheBroker with a shared CACHE_URL."
+            )
+        while True:
+            close_old_connections()
+            went_live, went_dark = scheduler.apply_transitions()
+            if went_live or went_dark:
+                self.stdout.write(f"{timezone.now():%Y-%m-%d %H:%M:%S} live +{len(went_live)} / -{len(went_dark)}")
+            if options["once"]:
+                return
+            self._sleep_until(scheduler.next_transition_at(), options["max_sleep"])
+
+    def _sleep_until(self, due, max_sleep):
+        """Sleep until ``due`` (capped), waking early if an announcement's schedule changed."""
+        delay = max_sleep if due is None else (due - timezone.now()).total_seconds()
+        deadline = time.monotonic() + max(0.0, min(delay, max_sleep))
+        token = scheduler.wake_token()
+        while time.monotonic() < deadline:
+            time.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
+            if scheduler.wake_token() != token:
+                return
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from comms import digest
+
+
+class Command(BaseCommand):
+    help = "E-mail every active user a digest of their unread announcements (resumable per day)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--day", help="Digest day as YYYY-MM-DD (default: today); re-running a day resumes it")
+        parser.add_argument("--batch-size", type=int, default=digest.BATCH_SIZE, help="Recipients per send_messages() call")
+        parser.add_argument("--base-url", default=settings.COMMS_DIGEST_BASE_URL, help="Site URL used for links")
+        parser.add_argument("--restart", action="store_true", help="Start the day over, e-mailing everyone again")
+
+    def handle(self, *args, **options):
+        day = parse_date(options["day"]) if options["day"] else None
+        if options["day"] and day is None:
+            raise CommandError(f"Invalid --day {options['day']!r}; use YYYY-MM-DD.")
+        progress = digest.send_digests(
+            day=day, batch_size=options["batch_size"], base_url=options["base_url"], restart=options["restart"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Digest {progress.day}: {progress.sent} e-mails sent"))
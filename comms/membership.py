@@ -0,0 +1,79 @@
+"""
+Memoized department-membership resolver.
+
+A user's department IDs (member, manager and the ``User.department`` FK)
+are cached twice:
+
+- per request, on the user object itself, so repeated calls are free;
+- across requests, in the shared cache under a per-user membership version.
+
+Membership signals (see comms.signals) call ``invalidate()``, which rotates
+the version so older cache entries simply stop being read.
+"""
+import uuid
+
+from django.core.cache import cache
+
+CACHE_TIMEOUT = 60 * 60 * 24
+_MEMO_ATTR = "_comms_department_ids"
+
+
+def _version_key(user_id):
+    return f"comms:membership:version:{user_id}"
+
+
+def _ids_key(user_id, version):
+    return f"comms:membership:ids:{user_id}:{version}"
+
+
+def membership_version(user_id) -> str:
+    """Opaque token that changes whenever the user's membership changes."""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Fresh random token: entries cached under an evicted version stay unreachable
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def _load_department_ids(user):
+    ids = set()
+    # From M2M relationships via Department.related_name
+    if hasattr(user, "member_departments"):
+        ids.update(user.member_departments.values_list("id", flat=True))
+    if hasattr(user, "managed_departments"):
+        ids.update(user.managed_departments.values_list("id", flat=True))
+    # From User.department FK
+    if getattr(user, "department_id", None):
+        ids.add(user.department_id)
+    return sorted(ids)
+
+
+def department_ids(user, refresh=False):
+    """
+    Collect all department IDs relevant to the user (member, manager, and FK).
+    ``refresh=True`` skips both caches and stores the freshly loaded value.
+    """
+    if not getattr(user, "pk", None):
+        return []
+    if not refresh:
+        memo = getattr(user, _MEMO_ATTR, None)
+        if memo is not None:
+            return memo
+
+    key = _ids_key(user.pk, membership_version(user.pk))
+    ids = None if refresh else cache.get(key)
+    if ids is None:
+        ids = _load_department_ids(user)
+        cache.set(key, ids, CACHE_TIMEOUT)
+    setattr(user, _MEMO_ATTR, ids)
+    return ids
+
+
+def invalidate(user_ids, instance=None):
+    """Rotate the membership version of the given users (and clear ``instance``'s memo)."""
+    for user_id in user_ids:
+        cache.set(_version_key(user_id), uuid.uuid4().hex, None)
+    if instance is not None and hasattr(instance, _MEMO_ATTR):
+        delattr(instance, _MEMO_ATTR)
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+from django.utils import timezone
+
+
+def populate_inbox(apps, schema_editor):
+    """Fan out existing published announcements into the new inbox."""
+    Announcement = apps.get_model('comms', 'Announcement')
+    AnnouncementInbox = apps.get_model('comms', 'AnnouncementInbox')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    now = timezone.now()
+    live = Announcement.objects.filter(status='PUBLISHED').filter(Q(expire_at__isnull=True) | Q(expire_at__gt=now))
+    for ann in live.iterator():
+        users = User.objects.filter(is_active=True)
+        dept_ids = list(ann.departments.values_list('id', flat=True))
+        if dept_ids:
+            users = users.filter(
+                Q(department__in=dept_ids) | Q(member_departments__in=dept_ids) | Q(managed_departments__in=dept_ids)
+            ).distinct()
+        AnnouncementInbox.objects.bulk_create(
+            [
+                AnnouncementInbox(user_id=uid, announcement_id=ann.pk, publish_at=ann.publish_at, expire_at=ann.expire_at)
+                for uid in users.values_list('id', flat=True)
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comms', '0002_announcementread'),
+        ('departments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementInbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('publish_at', models.DateTimeField(blank=True, null=True)),
+                ('expire_at', models.DateTimeField(blank=True, null=True)),
+                ('announcement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to='comms.announcement')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='announcement_inbox', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'publish_at'], name='inbox_user_publish_idx'), models.Index(fields=['expire_at'], name='inbox_expire_idx')],
+                'unique_together': {('user', 'announcement')},
+            },
+        ),
+        migrations.RunPython(populate_inbox, migrations.RunPython.noop),
+    ]
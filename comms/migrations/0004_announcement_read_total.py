@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:58
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_read_total(apps, schema_editor):
+    Announcement = apps.get_model('comms', 'Announcement')
+    AnnouncementRead = apps.get_model('comms', 'AnnouncementRead')
+    counted = Subquery(
+        AnnouncementRead.objects.filter(announcement=OuterRef('pk'))
+        .order_by()
+        .values('announcement')
+        .annotate(n=Count('id'))
+        .values('n'),
+        output_field=IntegerField(),
+    )
+    Announcement.objects.update(read_total=Coalesce(counted, Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comms', '0003_announcementinbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='read_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_read_total, migrations.RunPython.noop),
+    ]
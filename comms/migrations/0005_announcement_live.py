@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+def backfill_live(apps, schema_editor):
+    Announcement = apps.get_model('comms', 'Announcement')
+    now = timezone.now()
+    Announcement.objects.filter(status='PUBLISHED', publish_at__isnull=True).update(publish_at=F('created_at'))
+    (
+        Announcement.objects.filter(status='PUBLISHED', publish_at__lte=now)
+        .filter(Q(expire_at__isnull=True) | Q(expire_at__gt=now))
+        .update(live=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comms', '0004_announcement_read_total'),
+        ('departments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='announcementinbox',
+            name='inbox_user_publish_idx',
+        ),
+        migrations.AddField(
+            model_name='announcement',
+            name='live',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(backfill_live, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(condition=models.Q(('live', True)), fields=['-pinned', '-publish_at', '-created_at', 'id'], include=('title', 'slug', 'author'), name='announcement_live_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(condition=models.Q(('live', False), ('status', 'PUBLISHED')), fields=['publish_at'], name='announcement_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(condition=models.Q(('live', True)), fields=['expire_at'], name='announcement_live_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcementinbox',
+            index=models.Index(fields=['user', 'publish_at'], include=('announcement', 'expire_at'), name='inbox_user_covering_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+from django.db import migrations
+
+PG_FORWARD = [
+    """
+    ALTER TABLE comms_announcement ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX announcement_search_idx ON comms_announcement USING GIN (search_vector)",
+]
+PG_REVERSE = [
+    "DROP INDEX IF EXISTS announcement_search_idx",
+    "ALTER TABLE comms_announcement DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE comms_announcement_fts USING fts5(
+        title, content, content='comms_announcement', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER comms_announcement_fts_ai AFTER INSERT ON comms_announcement BEGIN
+        INSERT INTO comms_announcement_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER comms_announcement_fts_ad AFTER DELETE ON comms_announcement BEGIN
+        INSERT INTO comms_announcement_fts(comms_announcement_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER comms_announcement_fts_au AFTER UPDATE OF title, content ON comms_announcement BEGIN
+        INSERT INTO comms_announcement_fts(comms_announcement_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO comms_announcement_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    "INSERT INTO comms_announcement_fts(comms_announcement_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS comms_announcement_fts_ai",
+    "DROP TRIGGER IF EXISTS comms_announcement_fts_ad",
+    "DROP TRIGGER IF EXISTS comms_announcement_fts_au",
+    "DROP TABLE IF EXISTS comms_announcement_fts",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+    """Database-maintained search index: tsvector + GIN on PostgreSQL, FTS5 on SQLite."""
+
+    dependencies = [
+        ('comms', '0005_announcement_live'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": PG_FORWARD, "sqlite": SQLITE_FORWARD}),
+            _run({"postgresql": PG_REVERSE, "sqlite": SQLITE_REVERSE}),
+        ),
+    ]
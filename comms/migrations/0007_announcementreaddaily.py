@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comms', '0006_announcement_search'),
+        ('departments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementReadDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('reads', models.PositiveIntegerField(default=0)),
+                ('announcement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_reads', to='comms.announcement')),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='announcement_daily_reads', to='departments.department')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['department', 'day'], name='read_daily_department_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('department__isnull', False)), fields=('day', 'announcement', 'department'), name='read_daily_department_uniq'), models.UniqueConstraint(condition=models.Q(('department__isnull', True)), fields=('day', 'announcement'), name='read_daily_total_uniq')],
+            },
+        ),
+    ]
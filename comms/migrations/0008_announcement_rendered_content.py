@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:15
+
+from django.db import migrations, models
+
+from comms.rendering import excerpt, render_markdown
+
+
+def backfill_rendered_content(apps, schema_editor):
+    Announcement = apps.get_model('comms', 'Announcement')
+    batch = []
+    for ann in Announcement.objects.only('id', 'content').iterator(chunk_size=500):
+        ann.content_html = render_markdown(ann.content)
+        ann.excerpt = excerpt(ann.content)
+        batch.append(ann)
+        if len(batch) >= 500:
+            Announcement.objects.bulk_update(batch, ['content_html', 'excerpt'])
+            batch = []
+    if batch:
+        Announcement.objects.bulk_update(batch, ['content_html', 'excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comms', '0007_announcementreaddaily'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='announcement',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='announcement',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(backfill_rendered_content, migrations.RunPython.noop),
+    ]
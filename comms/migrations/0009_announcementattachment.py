@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comms', '0008_announcement_rendered_content'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementAttachment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to='announcements/%Y/%m/')),
+                ('original_name', models.CharField(blank=True, max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('size', models.PositiveBigIntegerField(default=0, editable=False)),
+                ('sha256', models.CharField(blank=True, editable=False, max_length=64)),
+                ('thumbnail', models.ImageField(blank=True, editable=False, upload_to='announcements/thumbs/%Y/%m/')),
+                ('preview', models.ImageField(blank=True, editable=False, upload_to='announcements/previews/%Y/%m/')),
+                ('thumbnail_status', models.CharField(choices=[('NONE', 'Not an image'), ('PENDING', 'Pending'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='NONE', editable=False, max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('announcement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='comms.announcement')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='announcement_attachments', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['thumbnail_status', 'id'], name='attachment_thumb_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+import re
+
+from django.db import migrations
+
+# comms.slugs.RESERVED_SLUGS when this migration was written
+RESERVED_SLUGS = ('new', 'edit', 'search', 'reports', 'receipts', 'events', 'unread-count', 'fragment-stats', 'read-all')
+
+
+def rename_reserved_slugs(apps, schema_editor):
+    """Announcements whose slug shadows a fixed route could not be opened; move them to ``<slug>-<n>``."""
+    Announcement = apps.get_model('comms', 'Announcement')
+    for announcement in Announcement.objects.filter(slug__in=RESERVED_SLUGS):
+        base = announcement.slug
+        suffix = re.compile(rf'^{re.escape(base)}-(\d+)$')
+        highest = 1
+        for slug in Announcement.objects.filter(slug__startswith=f'{base}-').values_list('slug', flat=True):
+            match = suffix.match(slug)
+            if match:
+                highest = max(highest, int(match.group(1)))
+        Announcement.objects.filter(pk=announcement.pk).update(slug=f'{base}-{highest + 1}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comms', '0010_digestprogress'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_reserved_slugs, migrations.RunPython.noop),
+    ]
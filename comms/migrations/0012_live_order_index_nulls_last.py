@@ -0,0 +1,63 @@
+from django.db import migrations, models
+
+# Same key as comms.pagination.ORDERING. SQLite rejects NULLS LAST in an index,
+# but its DESC order already puts NULLs last, so the plain DESC index matches there.
+PG_FORWARD = [
+    "DROP INDEX IF EXISTS announcement_live_order_idx",
+    """
+    CREATE INDEX announcement_live_order_idx ON comms_announcement
+    (pinned DESC, publish_at DESC NULLS LAST, created_at DESC, id) WHERE live
+    """,
+]
+PG_REVERSE = [
+    "DROP INDEX IF EXISTS announcement_live_order_idx",
+    """
+    CREATE INDEX announcement_live_order_idx ON comms_announcement
+    (pinned DESC, publish_at DESC, created_at DESC, id) INCLUDE (title, slug, author_id) WHERE live
+    """,
+]
+
+SQLITE_FORWARD = [
+    "DROP INDEX IF EXISTS announcement_live_order_idx",
+    """
+    CREATE INDEX announcement_live_order_idx ON comms_announcement
+    (pinned DESC, publish_at DESC, created_at DESC, id) WHERE live
+    """,
+]
+SQLITE_REVERSE = SQLITE_FORWARD
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+    """Live-order index in the pagination order (publish_at DESC NULLS LAST), without the INCLUDE list."""
+
+    dependencies = [
+        ('comms', '0011_rename_reserved_slugs'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='announcement',
+                    name='announcement_live_order_idx',
+                ),
+                migrations.AddIndex(
+                    model_name='announcement',
+                    index=models.Index(models.OrderBy(models.F('pinned'), descending=True), models.OrderBy(models.F('publish_at'), descending=True, nulls_last=True), models.OrderBy(models.F('created_at'), descending=True), models.F('id'), condition=models.Q(('live', True)), name='announcement_live_order_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(
+                    _run({"postgresql": PG_FORWARD, "sqlite": SQLITE_FORWARD}),
+                    _run({"postgresql": PG_REVERSE, "sqlite": SQLITE_REVERSE}),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comms', '0012_live_order_index_nulls_last'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcementread',
+            index=models.Index(fields=['read_at'], name='announcement_read_at_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
 from django.utils import timezone
 from core.models import Role
@@ -15,12 +15,8 @@ class AnnouncementQuerySet(models.QuerySet):
 		return self.filter(status=AnnouncementStatus.PUBLISHED)
 
 	def active(self):
-		now = timezone.now()
-		return (
-			self.published()
-			.filter(models.Q(publish_at__isnull=True) | models.Q(publish_at__lte=now))
-			.filter(models.Q(expire_at__isnull=True) | models.Q(expire_at__gt=now))
-		)
+		"""Published and inside the schedule window, as materialized by comms.scheduler."""
+		return self.filter(live=True)
 
 	def for_departments(self, dept_ids):
 		"""
@@ -31,6 +27,19 @@ class AnnouncementQuerySet(models.QuerySet):
 			return self.filter(departments__isnull=True)
 		return self.filter(models.Q(departments__isnull=True) | models.Q(departments__in=dept_ids)).distinct()
 
+	def visible_to(self, user):
+		"""
+		Announcements currently visible to the user, answered from the
+		precomputed inbox (see comms.inbox) instead of the department join.
+		"""
+		now = timezone.now()
+		# Single filter() call so every condition hits the same inbox join
+		return self.filter(
+			models.Q(inbox_entries__publish_at__isnull=True) | models.Q(inbox_entries__publish_at__lte=now),
+			models.Q(inbox_entries__expire_at__isnull=True) | models.Q(inbox_entries__expire_at__gt=now),
+			inbox_entries__user=user,
+		)
+
 
 class Announcement(models.Model):
 	"""Company announcements with optional department targeting and scheduling."""
@@ -38,6 +47,9 @@ class Announcement(models.Model):
 	title = models.CharField(max_length=200)
 	slug = models.SlugField(max_length=220, unique=True)
 	content = models.TextField()
+	# Rendered from content on save (comms.rendering); lists read the excerpt and defer the bodies
+	content_html = models.TextField(blank=True, default="", editable=False)
+	excerpt = models.CharField(max_length=200, blank=True, default="", editable=False)
 
 	status = models.CharField(max_length=12, choices=AnnouncementStatus.choices, default=AnnouncementStatus.DRAFT)
 	pinned = models.BooleanField(default=False, help_text="Pin to top in lists")
@@ -50,6 +62,12 @@ class Announcement(models.Model):
 
 	author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='announcements')
 
+	# Stored "published and within schedule window"; flipped by comms.scheduler at publish_at/expire_at
+	live = models.BooleanField(default=False, editable=False)
+
+	# Denormalized number of read receipts (see comms.receipts / reconcile_read_counts)
+	read_total = models.PositiveIntegerField(default=0, editable=False)
+
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 
@@ -61,11 +79,65 @@ class Announcement(models.Model):
 			models.Index(fields=["status", "publish_at"]),
 			models.Index(fields=["pinned"]),
 			models.Index(fields=["slug"], name="announcement_slug_idx"),
+			# Live set in list order (comms.pagination.ORDERING, NULLS LAST included, so the
+			# ORDER BY and the keyset seek use it); expired history never enters this index.
+			# Created per vendor by migration 0012: SQLite rejects NULLS LAST in an index.
+			models.Index(
+				models.F("pinned").desc(),
+				models.F("publish_at").desc(nulls_last=True),
+				models.F("created_at").desc(),
+				models.F("id"),
+				condition=models.Q(live=True),
+				name="announcement_live_order_idx",
+			),
+			# Scheduler lookups: next to go live / next to expire
+			models.Index(
+				fields=["publish_at"],
+				condition=models.Q(status=AnnouncementStatus.PUBLISHED, live=False),
+				name="announcement_pending_idx",
+			),
+			models.Index(fields=["expire_at"], condition=models.Q(live=True), name="announcement_live_expiry_idx"),
 		]
 
 	def __str__(self):
 		return self.title
 
+	def save(self, *args, **kwargs):
+		from .slugs import RESERVED_SLUGS, SLUG_RETRIES, allocate_slug, strip_suffix
+
+		if not self.slug or self.slug in RESERVED_SLUGS:
+			self.slug = allocate_slug(self.slug or self.title, exclude_pk=self.pk)
+		# Published rows always carry a publish time so list ordering never sees NULLs
+		if self.status == AnnouncementStatus.PUBLISHED and self.publish_at is None:
+			self.publish_at = timezone.now()
+		self.live = self.is_live
+		update_fields = kwargs.get("update_fields")
+		if update_fields is None or "content" in update_fields:
+			self.render_content()
+		if update_fields is not None:
+			kwargs["update_fields"] = set(update_fields) | {"live", "publish_at"}
+			if "content" in update_fields:
+				kwargs["update_fields"] |= {"content_html", "excerpt"}
+		if not self._state.adding:
+			return super().save(*args, **kwargs)
+		# A concurrent create may take the same slug between allocation and INSERT;
+		# re-allocate from the same base and retry instead of failing the request.
+		base = strip_suffix(self.slug)
+		for attempt in range(SLUG_RETRIES):
+			try:
+				with transaction.atomic():
+					return super().save(*args, **kwargs)
+			except IntegrityError:
+				if attempt == SLUG_RETRIES - 1 or not Announcement.objects.filter(slug=self.slug).exists():
+					raise
+				self.slug = allocate_slug(base)
+
+	def render_content(self):
+		"""Refresh ``content_html`` and ``excerpt`` from ``content``."""
+		from .rendering import excerpt, render_markdown
+		self.content_html = render_markdown(self.content)
+		self.excerpt = excerpt(self.content)
+
 	# Business logic helpers
 	@property
 	def is_published(self) -> bool:
@@ -111,17 +183,20 @@ class Announcement(models.Model):
 		self.save(update_fields=["status", "updated_at"])
 
 	def mark_read(self, user):
-		"""Mark this announcement as read by the given user (idempotent)."""
-		obj, _ = AnnouncementRead.objects.get_or_create(announcement=self, user=user)
-		return obj
+		"""Mark this announcement as read by the given user (idempotent). True if it was unread; see comms.receipts."""
+		from .receipts import mark_read_bulk
+		return bool(mark_read_bulk(user, [self.pk]))
 
 	def is_read_by(self, user) -> bool:
-		"""Return True if the user has read this announcement."""
+		"""Return True if the user has read this announcement (including buffered receipts)."""
+		from .receipts import pending_read_ids
+		if self.pk in pending_read_ids(user):
+			return True
 		return AnnouncementRead.objects.filter(announcement=self, user=user).exists()
 
 	def read_count(self) -> int:
-		"""Number of read receipts for this announcement."""
-		return self.reads.count()
+		"""Number of read receipts for this announcement (denormalized counter)."""
+		return self.read_total
 
 	def clean(self):
 		super().clean()
@@ -145,10 +220,140 @@ class AnnouncementRead(models.Model):
 		ordering = ["-read_at"]
 		indexes = [
 			models.Index(fields=["announcement", "user"]),
+			# Date-range receipt exports (comms.exports)
+			models.Index(fields=["read_at"], name="announcement_read_at_idx"),
 		]
 
 	def __str__(self) -> str:
 		return f"{self.user} read {self.announcement} at {self.read_at:%Y-%m-%d %H:%M}"
- 
 
 
+class AnnouncementInbox(models.Model):
+	"""
+	Precomputed visibility: one row per (user, published announcement) the
+	user is allowed to see. Maintained by comms.inbox on publish, re-targeting,
+	archive, expiry and department membership changes.
+	"""
+
+	user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="announcement_inbox")
+	announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, related_name="inbox_entries")
+	# Copied from the announcement so the schedule window is checked on the inbox row itself
+	publish_at = models.DateTimeField(null=True, blank=True)
+	expire_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		unique_together = ("user", "announcement")
+		indexes = [
+			# Covering: visible_to() is answered from the index alone on PostgreSQL
+			# (replaced the plain (user, publish_at) index in migration 0005)
+			models.Index(fields=["user", "publish_at"], include=["announcement", "expire_at"], name="inbox_user_covering_idx"),
+			models.Index(fields=["expire_at"], name="inbox_expire_idx"),
+		]
+
+	def __str__(self) -> str:
+		return f"{self.announcement} -> {self.user}"
+
+
+class AnnouncementReadDaily(models.Model):
+	"""
+	Read-receipt rollup per (day, announcement, department), maintained by
+	comms.rollups as receipts are written. ``department`` NULL holds the
+	day's total for the announcement (each receipt counted once); department
+	rows count receipts of users belonging to that department.
+	"""
+
+	day = models.DateField()
+	announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, related_name="daily_reads")
+	department = models.ForeignKey("departments.Department", on_delete=models.CASCADE, null=True, blank=True, related_name="announcement_daily_reads")
+	reads = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		ordering = ["-day"]
+		constraints = [
+			# Two partial constraints: NULLs are distinct in a plain unique index
+			models.UniqueConstraint(
+				fields=["day", "announcement", "department"],
+				condition=models.Q(department__isnull=False),
+				name="read_daily_department_uniq",
+			),
+			models.UniqueConstraint(
+				fields=["day", "announcement"],
+				condition=models.Q(department__isnull=True),
+				name="read_daily_total_uniq",
+			),
+		]
+		indexes = [
+			models.Index(fields=["department", "day"], name="read_daily_department_idx"),
+		]
+
+	def __str__(self) -> str:
+		return f"{self.day} {self.announcement} {self.department or 'all'}: {self.reads}"
+
+
+class ThumbnailStatus(models.TextChoices):
+	NONE = "NONE", "Not an image"
+	PENDING = "PENDING", "Pending"
+	READY = "READY", "Ready"
+	FAILED = "FAILED", "Failed"
+
+
+class AnnouncementAttachment(models.Model):
+	"""
+	A file attached to an announcement. Size and SHA-256 are computed while the
+	upload streams to disk (comms.attachments); image thumbnails/previews are
+	generated once by the ``process_attachment_thumbnails`` worker.
+	"""
+
+	announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE, related_name="attachments")
+	file = models.FileField(upload_to="announcements/%Y/%m/")
+	original_name = models.CharField(max_length=255, blank=True)
+	content_type = models.CharField(max_length=100, blank=True)
+	size = models.PositiveBigIntegerField(default=0, editable=False)
+	sha256 = models.CharField(max_length=64, blank=True, editable=False)
+	thumbnail = models.ImageField(upload_to="announcements/thumbs/%Y/%m/", blank=True, editable=False)
+	preview = models.ImageField(upload_to="announcements/previews/%Y/%m/", blank=True, editable=False)
+	thumbnail_status = models.CharField(max_length=10, choices=ThumbnailStatus.choices, default=ThumbnailStatus.NONE, editable=False)
+	uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="announcement_attachments")
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		ordering = ["created_at", "id"]
+		indexes = [
+			models.Index(fields=["thumbnail_status", "id"], name="attachment_thumb_queue_idx"),
+		]
+
+	def __str__(self) -> str:
+		return self.original_name
+
+	@property
+	def is_image(self) -> bool:
+		return self.content_type.startswith("image/")
+
+	def save(self, *args, **kwargs):
+		# Files added outside the streaming upload path (e.g. the admin) get their metadata here
+		if self.file and not self.sha256:
+			from .attachments import fill_metadata
+			fill_metadata(self)
+		super().save(*args, **kwargs)
+
+
+class DigestProgress(models.Model):
+	"""
+	Progress of one day's digest run (comms.digest). Recipients are processed
+	in user-ID order and ``last_user_id`` is saved after every sent batch, so an
+	interrupted run resumes where it stopped instead of e-mailing everyone again.
+	"""
+
+	day = models.DateField(unique=True)
+	last_user_id = models.PositiveBigIntegerField(default=0)
+	sent = models.PositiveIntegerField(default=0)
+	started_at = models.DateTimeField(auto_now_add=True)
+	updated_at = models.DateTimeField(auto_now=True)
+	finished_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		ordering = ["-day"]
+		verbose_name_plural = "digest progress"
+
+	def __str__(self) -> str:
+		return f"Digest {self.day}"
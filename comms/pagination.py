@@ -0,0 +1,84 @@
+"""
+Keyset (cursor) pagination for announcement lists.
+
+Lists are ordered by ``(-pinned, -publish_at, -created_at, id)``; a cursor
+encodes those values for the last row of a page and the next page is the
+rows strictly after it. Unlike ``Paginator`` there is no ``COUNT(*)`` and no
+``OFFSET``, so page cost stays flat however much history accumulates.
+"""
+import base64
+import json
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+PAGE_SIZE = 10
+
+ORDERING = (
+    F("pinned").desc(),
+    # Drafts have no publish_at; keep them last on every database
+    F("publish_at").desc(nulls_last=True),
+    F("created_at").desc(),
+    "id",
+)
+
+
+def encode_cursor(obj) -> str:
+    payload = [
+        obj.pinned,
+        obj.publish_at.isoformat() if obj.publish_at else None,
+        obj.created_at.isoformat(),
+        obj.pk,
+    ]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Return ``(pinned, publish_at, created_at, pk)`` or None for a missing/invalid cursor."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        pinned, publish_at, created_at, pk = json.loads(raw)
+        publish_at = parse_datetime(publish_at) if publish_at else None
+        created_at = parse_datetime(created_at)
+        if created_at is None or not isinstance(pk, int):
+            return None
+        return bool(pinned), publish_at, created_at, pk
+    except (ValueError, TypeError):
+        return None
+
+
+def _after(cursor):
+    """Q matching rows that sort strictly after the cursor in ORDERING."""
+    pinned, publish_at, created_at, pk = cursor
+    same_publish = Q(created_at__lt=created_at) | Q(created_at=created_at, id__gt=pk)
+    if publish_at is None:
+        # NULL publish_at sorts last: only ties on created_at/id can follow
+        within_pinned = Q(publish_at__isnull=True) & same_publish
+    else:
+        within_pinned = (
+            Q(publish_at__lt=publish_at)
+            | Q(publish_at__isnull=True)
+            | (Q(publish_at=publish_at) & same_publish)
+        )
+    after = Q(pinned=pinned) & within_pinned
+    if pinned:
+        after |= Q(pinned=False)
+    return after
+
+
+def keyset_page(queryset, cursor_token, page_size=PAGE_SIZE):
+    """
+    Return ``(items, next_cursor)`` for the page after ``cursor_token``.
+    ``next_cursor`` is None on the last page.
+    """
+    qs = queryset.order_by(*ORDERING)
+    cursor = decode_cursor(cursor_token)
+    if cursor is not None:
+        qs = qs.filter(_after(cursor))
+    items = list(qs[: page_size + 1])
+    if len(items) > page_size:
+        items = items[:page_size]
+        return items, encode_cursor(items[-1])
+    return items, None
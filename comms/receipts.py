@@ -0,0 +1,179 @@
+"""
+Read-receipt writes.
+
+All receipt inserts go through here so the single and bulk paths share one
+set-based implementation and keep ``Announcement.read_total`` and the daily
+rollups (comms.rollups) in step. Writers lock the users' rows first, so the
+"which receipts are new" check cannot race, and the counters, rollups and
+unread badges move by the rows actually inserted.
+
+With ``COMMS_READ_WRITE_BEHIND`` enabled, single mark-read requests are
+acknowledged immediately and buffered per worker; the buffer is flushed in
+one batched insert once it holds ``COMMS_READ_BUFFER_SIZE`` receipts or
+``COMMS_READ_BUFFER_SECONDS`` have passed. Buffered receipts are also noted
+in the shared cache (a per-user counter plus one key per receipt, so
+concurrent requests never overwrite each other's markers) and every worker
+reports them as read before the flush.
+"""
+import atexit
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Case, F, Value, When
+
+from . import rollups, unread
+from .models import Announcement, AnnouncementRead
+
+PENDING_TIMEOUT = 60 * 5
+
+
+def write_behind_enabled() -> bool:
+    return getattr(settings, "COMMS_READ_WRITE_BEHIND", False)
+
+
+def _pending_key(user_id):
+    return f"comms:reads:pending:{user_id}"
+
+
+def pending_read_ids(user):
+    """Announcement IDs the user has read that may not be flushed yet."""
+    if not write_behind_enabled() or not getattr(user, "pk", None):
+        return set()
+    key = _pending_key(user.pk)
+    last = cache.get(key) or 0
+    if not last:
+        return set()
+    # Markers that already expired are skipped
+    return set(cache.get_many([f"{key}:{seq}" for seq in range(1, last + 1)]).values())
+
+
+def _note_pending(announcement_id, user_id):
+    key = _pending_key(user_id)
+    cache.add(key, 0, PENDING_TIMEOUT)
+    try:
+        seq = cache.incr(key)
+    except ValueError:
+        # The counter expired between add() and incr()
+        cache.add(key, 0, PENDING_TIMEOUT)
+        seq = cache.incr(key)
+    cache.set(f"{key}:{seq}", announcement_id, PENDING_TIMEOUT)
+    cache.touch(key, PENDING_TIMEOUT)
+
+
+def bump_read_counts(counts):
+    """Atomically add ``{announcement_id: delta}`` to the denormalized read counters."""
+    counts = {pk: n for pk, n in counts.items() if n}
+    if not counts:
+        return
+    if len(set(counts.values())) == 1:
+        delta = next(iter(counts.values()))
+        Announcement.objects.filter(pk__in=counts).update(read_total=F("read_total") + delta)
+        return
+    Announcement.objects.filter(pk__in=counts).update(
+        read_total=F("read_total") + Case(*[When(pk=pk, then=Value(n)) for pk, n in counts.items()], default=Value(0))
+    )
+
+
+@transaction.atomic
+def _insert(pairs):
+    """
+    Insert the ``(announcement_id, user_id)`` receipts that don't exist yet and
+    update the read counters and rollups for exactly those. Returns the pairs inserted.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return set()
+    user_ids = {user_id for _, user_id in pairs}
+    # Receipt writers for one user run one at a time (locks taken in id order),
+    # so a receipt found missing below is inserted by this transaction only
+    list(get_user_model().objects.filter(pk__in=user_ids).order_by("pk").select_for_update().values_list("pk", flat=True))
+    existing = set(
+        AnnouncementRead.objects.filter(announcement_id__in={ann_id for ann_id, _ in pairs}, user_id__in=user_ids)
+        .values_list("announcement_id", "user_id")
+    )
+    new_pairs = pairs - existing
+    created = AnnouncementRead.objects.bulk_create(
+        [AnnouncementRead(announcement_id=ann_id, user_id=user_id) for ann_id, user_id in new_pairs],
+        batch_size=1000,
+    )
+    rollups.record((r.announcement_id, r.user_id, r.read_at) for r in created)
+    counts = {}
+    for ann_id, _ in new_pairs:
+        counts[ann_id] = counts.get(ann_id, 0) + 1
+    bump_read_counts(counts)
+    return new_pairs
+
+
+def mark_read_bulk(user, announcement_ids):
+    """
+    Mark every given announcement as read by ``user`` with a single batch
+    insert. Returns the set of IDs that were unread.
+    """
+    new_ids = {ann_id for ann_id, _ in _insert((pk, user.pk) for pk in announcement_ids)}
+    if new_ids:
+        transaction.on_commit(lambda: unread.decrement(user.pk, len(new_ids)))
+    return new_ids
+
+
+class ReadBuffer:
+    """Per-worker queue of pending (announcement_id, user_id) receipts."""
+
+    def __init__(self, max_size, max_age):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._timer = None
+
+    def add(self, announcement_id, user_id):
+        _note_pending(announcement_id, user_id)
+        with self._lock:
+            self._pending.add((announcement_id, user_id))
+            full = len(self._pending) >= self.max_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.max_age, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered so far in one batch. Returns receipts flushed."""
+        with self._lock:
+            batch, self._pending = self._pending, set()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return 0
+        _insert(batch)
+        # The per-user cache markers are left to expire: other workers may still
+        # hold receipts for the same user, and merging already-written IDs is harmless.
+        return len(batch)
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # Timer threads get their own DB connection; don't leak it
+            connections.close_all()
+
+
+read_buffer = ReadBuffer(
+    max_size=getattr(settings, "COMMS_READ_BUFFER_SIZE", 500),
+    max_age=getattr(settings, "COMMS_READ_BUFFER_SECONDS", 2.0),
+)
+atexit.register(read_buffer.flush)
+
+
+def mark_read(user, announcement):
+    """Record that ``user`` read ``announcement`` (buffered when write-behind is on)."""
+    if write_behind_enabled():
+        read_buffer.add(announcement.pk, user.pk)
+        # Whether this receipt is new isn't known until the flush; recount lazily
+        unread.invalidate([user.pk])
+        return
+    mark_read_bulk(user, [announcement.pk])
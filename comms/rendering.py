@@ -0,0 +1,106 @@
+"""
+Announcement body rendering.
+
+``render_markdown`` turns the small Markdown subset used in plant notices
+into HTML: paragraphs, line breaks, ``#`` headings, ``-``/``*`` and ``1.``
+lists, ``**bold**``, ``*italic*``, ``code`` and ``[links](https://...)``.
+The text is HTML-escaped *before* any markup is added, so raw HTML in the
+body can never reach the page, and links only allow http(s) and mailto.
+
+``Announcement.save`` stores the result in ``content_html`` and a plain-text
+``excerpt`` so list pages never load or process the full body.
+"""
+import re
+
+from django.utils.html import escape
+from django.utils.text import Truncator
+
+EXCERPT_LENGTH = 160
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+_BULLET = re.compile(r"^[-*]\s+(.*)$")
+_NUMBERED = re.compile(r"^\d+[.)]\s+(.*)$")
+_CODE = re.compile(r"`([^`]+)`")
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_ITALIC = re.compile(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])")
+_LINK = re.compile(r"\[([^\]]+)\]\(((?:https?://|mailto:)[^)\s\x00]+)\)")
+_KEPT = re.compile(r"\x00(\d+)\x00")
+
+
+def _emphasis(text):
+    text = _BOLD.sub(r"<strong>\1</strong>", text)
+    return _ITALIC.sub(r"<em>\1</em>", text)
+
+
+def _inline(text):
+    """Inline markup on already-escaped text (without NUL characters)."""
+    kept = []
+
+    def keep(html):
+        kept.append(html)
+        return f"\x00{len(kept) - 1}\x00"
+
+    def restore(match):
+        # A link label may hold a code span
+        return _KEPT.sub(restore, kept[int(match.group(1))])
+
+    # Code spans and whole links are set aside, so no other markup applies inside them (or in an href)
+    text = _CODE.sub(lambda m: keep(f"<code>{m.group(1)}</code>"), text)
+    text = _LINK.sub(lambda m: keep(f'<a href="{m.group(2)}" rel="noopener noreferrer">{_emphasis(m.group(1))}</a>'), text)
+    return _KEPT.sub(restore, _emphasis(text))
+
+
+def render_markdown(source) -> str:
+    html, paragraph, list_tag, items = [], [], None, []
+
+    def flush_paragraph():
+        if paragraph:
+            html.append("<p>" + "<br>".join(_inline(line) for line in paragraph) + "</p>")
+            paragraph.clear()
+
+    def flush_list():
+        nonlocal list_tag
+        if list_tag:
+            html.append(f"<{list_tag}>" + "".join(f"<li>{_inline(item)}</li>" for item in items) + f"</{list_tag}>")
+            list_tag = None
+            items.clear()
+
+    # NUL marks set-aside spans in _inline; it has no business in a notice anyway
+    for raw in escape(source or "").replace("\x00", "").splitlines():
+        line = raw.strip()
+        heading, bullet, numbered = _HEADING.match(line), _BULLET.match(line), _NUMBERED.match(line)
+        if not line:
+            flush_paragraph()
+            flush_list()
+        elif heading:
+            flush_paragraph()
+            flush_list()
+            # h1/h2 are taken by the page itself
+            level = min(len(heading.group(1)) + 2, 6)
+            html.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+        elif bullet or numbered:
+            flush_paragraph()
+            tag = "ul" if bullet else "ol"
+            if list_tag != tag:
+                flush_list()
+                list_tag = tag
+            items.append((bullet or numbered).group(1))
+        else:
+            flush_list()
+            paragraph.append(line)
+    flush_paragraph()
+    flush_list()
+    return "\n".join(html)
+
+
+def plain_text(source) -> str:
+    """Body with Markdown markers removed and whitespace collapsed."""
+    text = _LINK.sub(r"\1", source or "")
+    text = re.sub(r"^\s*(#{1,6}|[-*]|\d+[.)])\s+", "", text, flags=re.MULTILINE)
+    text = re.sub(r"\*\*|`", "", text)
+    text = _ITALIC.sub(r"\1", text)
+    return " ".join(text.split())
+
+
+def excerpt(source, length=EXCERPT_LENGTH) -> str:
+    return Truncator(plain_text(source)).chars(length)
@@ -0,0 +1,103 @@
+"""
+Daily read-receipt rollups (``AnnouncementReadDaily``).
+
+Reports (reads per day, per department, per announcement) and the admin
+drill-down read these small tables instead of grouping millions of raw
+receipts. Every receipt insert path calls ``record()``; receipt deletes call
+it with ``delta=-1``. Receipts are attributed to the departments the reader
+belongs to when the receipt is written (FK, member or manager).
+
+``rebuild()`` (``rebuild_read_rollups`` command) recomputes the tables from
+the receipts, e.g. after deploying or to correct drift.
+"""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from departments.models import Department
+
+from .models import AnnouncementRead, AnnouncementReadDaily
+
+
+def departments_by_user(user_ids):
+    """``{user_id: {department_id, ...}}`` for the given users, in three queries."""
+    result = defaultdict(set)
+    user_ids = list(user_ids)
+    User = get_user_model()
+    for user_id, department_id in User.objects.filter(pk__in=user_ids, department__isnull=False).values_list(
+        "id", "department_id"
+    ):
+        result[user_id].add(department_id)
+    for through in (Department.members.through, Department.managers.through):
+        for user_id, department_id in through.objects.filter(user_id__in=user_ids).values_list("user_id", "department_id"):
+            result[user_id].add(department_id)
+    return result
+
+
+def _count(receipts, departments):
+    """``receipts``: iterable of ``(announcement_id, user_id, read_at)``."""
+    counts = defaultdict(int)
+    for announcement_id, user_id, read_at in receipts:
+        day = timezone.localdate(read_at)
+        counts[(day, announcement_id, None)] += 1
+        for department_id in departments.get(user_id, ()):
+            counts[(day, announcement_id, department_id)] += 1
+    return counts
+
+
+def _apply(counts, delta):
+    if delta > 0:
+        AnnouncementReadDaily.objects.bulk_create(
+            [
+                AnnouncementReadDaily(day=day, announcement_id=announcement_id, department_id=department_id)
+                for day, announcement_id, department_id in counts
+            ],
+            ignore_conflicts=True,
+        )
+    by_amount = defaultdict(list)
+    for key, n in counts.items():
+        by_amount[n * delta].append(key)
+    for amount, keys in by_amount.items():
+        # department_id=None compiles to IS NULL, matching the total rows
+        match = Q()
+        for day, announcement_id, department_id in keys:
+            match |= Q(day=day, announcement_id=announcement_id, department_id=department_id)
+        rows = AnnouncementReadDaily.objects.filter(match)
+        if amount > 0:
+            rows.update(reads=F("reads") + amount)
+            continue
+        rows.filter(reads__gte=-amount).update(reads=F("reads") + amount)
+        rows.filter(reads=0).delete()
+
+
+@transaction.atomic
+def record(receipts, delta=1):
+    """Add (or with ``delta=-1`` remove) receipts ``(announcement_id, user_id, read_at)`` to the rollups."""
+    receipts = list(receipts)
+    if not receipts:
+        return
+    departments = departments_by_user({user_id for _, user_id, _ in receipts})
+    _apply(_count(receipts, departments), delta)
+
+
+@transaction.atomic
+def rebuild(batch_size=5000):
+    """Recompute every rollup row from the receipts. Returns the number of rows written."""
+    AnnouncementReadDaily.objects.all().delete()
+    user_ids = AnnouncementRead.objects.order_by().values_list("user_id", flat=True).distinct()
+    departments = departments_by_user(user_ids)
+    counts = _count(
+        AnnouncementRead.objects.order_by().values_list("announcement_id", "user_id", "read_at").iterator(chunk_size=batch_size),
+        departments,
+    )
+    AnnouncementReadDaily.objects.bulk_create(
+        [
+            AnnouncementReadDaily(day=day, announcement_id=announcement_id, department_id=department_id, reads=n)
+            for (day, announcement_id, department_id), n in counts.items()
+        ],
+        batch_size=batch_size,
+    )
+    return len(counts)
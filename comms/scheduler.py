@@ -0,0 +1,71 @@
+"""
+Publish/expiry scheduler.
+
+``Announcement.live`` stores "published and inside the schedule window" so
+``active()`` is a plain indexed equality. ``Announcement.save`` sets it for
+edits; this module flips it for announcements whose ``publish_at`` or
+``expire_at`` passes while nobody touches them. The
+``run_announcement_scheduler`` command runs it as a worker that sleeps until
+the next transition is due.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from . import events, inbox, unread
+from .models import Announcement, AnnouncementStatus
+
+WAKE_KEY = "comms:scheduler:wake"
+
+
+def wake():
+    """Tell a sleeping worker that the schedule changed (e.g. a new publish_at)."""
+    cache.set(WAKE_KEY, timezone.now().timestamp(), None)
+
+
+def wake_token():
+    return cache.get(WAKE_KEY)
+
+
+@transaction.atomic
+def apply_transitions(now=None):
+    """
+    Flip ``live`` for every announcement whose window opened or closed.
+    Returns ``(went_live_ids, went_dark_ids)``.
+    """
+    now = now or timezone.now()
+    went_live = list(
+        Announcement.objects.filter(status=AnnouncementStatus.PUBLISHED, live=False, publish_at__lte=now)
+        .filter(Q(expire_at__isnull=True) | Q(expire_at__gt=now))
+        .values_list("id", flat=True)
+    )
+    went_dark = list(
+        Announcement.objects.filter(live=True)
+        .filter(Q(expire_at__lte=now) | Q(publish_at__gt=now) | ~Q(status=AnnouncementStatus.PUBLISHED))
+        .values_list("id", flat=True)
+    )
+    if went_live:
+        Announcement.objects.filter(pk__in=went_live).update(live=True, updated_at=now)
+        events.announcements_went_live(went_live)
+    if went_live or went_dark:
+        # Unread badges of everyone these announcements target are now off by one
+        unread.invalidate_audience(went_live + went_dark)
+    if went_dark:
+        Announcement.objects.filter(pk__in=went_dark).update(live=False, updated_at=now)
+        # Expired/unpublished announcements leave every inbox
+        inbox.sync_announcements(went_dark)
+        events.announcements_withdrawn(went_dark)
+    return went_live, went_dark
+
+
+def next_transition_at(now=None):
+    """Earliest future publish_at/expire_at that will flip ``live``, or None."""
+    now = now or timezone.now()
+    next_publish = (
+        Announcement.objects.filter(status=AnnouncementStatus.PUBLISHED, live=False, publish_at__gt=now)
+        .aggregate(at=Min("publish_at"))["at"]
+    )
+    next_expiry = Announcement.objects.filter(live=True, expire_at__gt=now).aggregate(at=Min("expire_at"))["at"]
+    candidates = [at for at in (next_publish, next_expiry) if at is not None]
+    return min(candidates) if candidates else None
@@ -0,0 +1,109 @@
+"""
+Full-text search over announcements.
+
+The search index is maintained by the database itself (see migration
+0006_announcement_search):
+
+- PostgreSQL: a stored generated ``search_vector`` tsvector column (title
+  weighted above content) with a GIN index;
+- SQLite (local development): an external-content FTS5 table kept in step
+  by triggers.
+
+Other backends fall back to ``icontains``. ``search()`` filters a queryset
+to matches and orders it by rank, so callers apply visibility first.
+
+SQLite rebuilds a table (dropping its triggers) whenever a migration alters
+it, so ``ensure_sqlite_triggers`` runs after every ``migrate`` and restores
+missing triggers, re-indexing if any were gone.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+TABLE = '"comms_announcement"'
+FTS_TABLE = "comms_announcement_fts"
+SEARCH_CONFIG = "english"
+
+SQLITE_TRIGGERS = {
+    "comms_announcement_fts_ai": f"""
+        CREATE TRIGGER comms_announcement_fts_ai AFTER INSERT ON comms_announcement BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    """,
+    "comms_announcement_fts_ad": f"""
+        CREATE TRIGGER comms_announcement_fts_ad AFTER DELETE ON comms_announcement BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        END
+    """,
+    "comms_announcement_fts_au": f"""
+        CREATE TRIGGER comms_announcement_fts_au AFTER UPDATE OF title, content ON comms_announcement BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+    """,
+}
+
+_fts_available = None
+
+
+def _sqlite_fts_available() -> bool:
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def ensure_sqlite_triggers(using="default") -> bool:
+    """Recreate missing FTS5 triggers (and re-index) on SQLite. Returns True if anything was repaired."""
+    conn = connections[using]
+    if conn.vendor != "sqlite" or FTS_TABLE not in conn.introspection.table_names():
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'comms_announcement'")
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(SQLITE_TRIGGERS[name])
+        if missing:
+            # Writes made while the triggers were gone never reached the index
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return bool(missing)
+
+
+def _fts5_query(query):
+    """Quote every word so user input can't trip FTS5 query syntax; words are AND-ed."""
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", query))
+
+
+def search(queryset, query):
+    """Filter ``queryset`` to announcements matching ``query``, best match first (``search_rank``)."""
+    query = (query or "").strip()
+    if not query:
+        return queryset.none()
+
+    if connection.vendor == "postgresql":
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        matches = RawSQL(f"{TABLE}.search_vector @@ {tsquery}", (query,), output_field=BooleanField())
+        rank = RawSQL(f"ts_rank_cd({TABLE}.search_vector, {tsquery})", (query,), output_field=FloatField())
+    elif connection.vendor == "sqlite" and _sqlite_fts_available():
+        fts_query = _fts5_query(query)
+        if not fts_query:
+            return queryset.none()
+        matches = RawSQL(
+            f"{TABLE}.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)",
+            (fts_query,),
+            output_field=BooleanField(),
+        )
+        # bm25() is "lower is better"; negate it so both engines sort by rank descending
+        rank = RawSQL(
+            f"(SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = {TABLE}.id)",
+            (fts_query,),
+            output_field=FloatField(),
+        )
+    else:
+        matches = Q(title__icontains=query) | Q(content__icontains=query)
+        rank = Value(0.0, output_field=FloatField())
+
+    return queryset.filter(matches).annotate(search_rank=rank).order_by("-search_rank", "-publish_at", "id")
@@ -0,0 +1,145 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from departments.models import Department
+
+from . import events, fragments, inbox, membership, rollups, scheduler, unread
+from .models import Announcement, AnnouncementAttachment, AnnouncementRead, AnnouncementStatus
+
+User = get_user_model()
+
+
+# --- Announcement side: publish / archive / schedule / re-targeting ---
+
+@receiver(post_save, sender=Announcement, dispatch_uid="comms_inbox_announcement_saved")
+def announcement_saved(sender, instance, **kwargs):
+    inbox.sync_announcement(instance)
+    events.announcement_changed(instance)
+    # A future publish_at/expire_at may be earlier than what the scheduler sleeps on
+    now = timezone.now()
+    if instance.status == AnnouncementStatus.PUBLISHED and any(
+        at and at > now for at in (instance.publish_at, instance.expire_at)
+    ):
+        scheduler.wake()
+
+
+@receiver(m2m_changed, sender=Announcement.departments.through, dispatch_uid="comms_inbox_announcement_targets")
+def announcement_targets_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        # department.announcements.add(...): pk_set holds announcement IDs
+        if action == "post_clear":
+            return
+        fragments.invalidate(pk_set or ())
+        inbox.sync_announcements(pk_set or ())
+        for announcement in Announcement.objects.filter(pk__in=pk_set or (), live=True):
+            events.announcement_changed(announcement, retargeted=True)
+    else:
+        fragments.invalidate([instance.pk])
+        inbox.sync_announcement(instance)
+        if instance.live:
+            events.announcement_changed(instance, retargeted=True)
+
+
+# --- User side: department membership changes ---
+
+def _membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # user.member_departments / user.managed_departments changed
+        if action in ("post_add", "post_remove", "post_clear"):
+            membership.invalidate([instance.pk], instance=instance)
+            inbox.sync_user(instance)
+        return
+    if action == "pre_clear":
+        instance._comms_cleared_user_ids = set(getattr(instance, kwargs["model_field"]).values_list("id", flat=True))
+        return
+    if action in ("post_add", "post_remove"):
+        user_ids = pk_set or ()
+    elif action == "post_clear":
+        user_ids = getattr(instance, "_comms_cleared_user_ids", ())
+    else:
+        return
+    membership.invalidate(user_ids)
+    inbox.sync_users(user_ids)
+
+
+@receiver(m2m_changed, sender=Department.members.through, dispatch_uid="comms_inbox_department_members")
+def department_members_changed(sender, **kwargs):
+    _membership_changed(sender, model_field="members", **kwargs)
+
+
+@receiver(m2m_changed, sender=Department.managers.through, dispatch_uid="comms_inbox_department_managers")
+def department_managers_changed(sender, **kwargs):
+    _membership_changed(sender, model_field="managers", **kwargs)
+
+
+@receiver(post_save, sender=User, dispatch_uid="comms_inbox_user_saved")
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Skip routine partial saves such as last_login updates
+    if not created and update_fields is not None and not ({"department", "is_active"} & set(update_fields)):
+        return
+    membership.invalidate([instance.pk], instance=instance)
+    inbox.sync_user(instance)
+
+
+@receiver(post_save, sender=Department, dispatch_uid="comms_fragments_department_saved")
+def department_saved(sender, instance, created, **kwargs):
+    # List items render department names; a rename must not serve stale fragments
+    if not created:
+        fragments.invalidate(instance.announcements.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Department, dispatch_uid="comms_inbox_department_deleting")
+def department_deleting(sender, instance, **kwargs):
+    # Cascades and SET_NULL on User.department bypass m2m/save signals
+    instance._comms_affected_user_ids = (
+        set(instance.members.values_list("id", flat=True))
+        | set(instance.managers.values_list("id", flat=True))
+        | set(instance.employees.values_list("id", flat=True))
+    )
+    instance._comms_affected_announcement_ids = set(instance.announcements.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Department, dispatch_uid="comms_inbox_department_deleted")
+def department_deleted(sender, instance, **kwargs):
+    user_ids = getattr(instance, "_comms_affected_user_ids", ())
+    announcement_ids = getattr(instance, "_comms_affected_announcement_ids", ())
+    membership.invalidate(user_ids)
+    fragments.invalidate(announcement_ids)
+    inbox.sync_announcements(announcement_ids)
+    inbox.sync_users(user_ids)
+
+
+# --- Read receipts: keep the denormalized counter and rollups in step on deletes ---
+
+@receiver(post_delete, sender=AnnouncementRead, dispatch_uid="comms_read_counter_deleted")
+def read_receipt_deleted(sender, instance, **kwargs):
+    Announcement.objects.filter(pk=instance.announcement_id, read_total__gt=0).update(read_total=F("read_total") - 1)
+    unread.invalidate([instance.user_id])
+    rollups.record([(instance.announcement_id, instance.user_id, instance.read_at)], delta=-1)
+
+
+# --- Attachments: the detail page's validators follow them; files go with the row ---
+
+@receiver(post_save, sender=AnnouncementAttachment, dispatch_uid="comms_attachment_saved")
+def attachment_saved(sender, instance, **kwargs):
+    # Adding a file or finishing its thumbnail changes the detail page (comms.conditional)
+    Announcement.objects.filter(pk=instance.announcement_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=AnnouncementAttachment, dispatch_uid="comms_attachment_deleted")
+def attachment_deleted(sender, instance, **kwargs):
+    Announcement.objects.filter(pk=instance.announcement_id).update(updated_at=timezone.now())
+    files = [field for field in (instance.file, instance.thumbnail, instance.preview) if field]
+
+    def remove_files():
+        for field in files:
+            field.storage.delete(field.name)
+
+    # Only once the delete is committed; a rollback keeps the row and its files
+    transaction.on_commit(remove_files)
@@ -0,0 +1,58 @@
+"""
+Slug allocation for announcements.
+
+``allocate_slug`` finds the next free ``<base>``, ``<base>-2``, ``<base>-3``…
+with a single indexed prefix scan instead of probing each suffix with its
+own query. ``Announcement.save`` retries with a fresh allocation when a
+concurrent insert grabbed the same slug first.
+
+Slugs equal to a fixed route under ``/announcements/`` (``RESERVED_SLUGS``)
+are never handed out: ``/announcements/search/`` would serve the search page
+instead of the announcement.
+"""
+import re
+
+from django.db.models import Q
+from django.utils.text import slugify
+
+SLUG_MAX_LENGTH = 220
+SLUG_RETRIES = 5
+FALLBACK_BASE = "announcement"
+# First path segments of the fixed routes in comms/urls.py
+RESERVED_SLUGS = frozenset({
+    "new", "edit", "search", "reports", "receipts", "events", "unread-count", "fragment-stats", "read-all",
+})
+
+
+def slug_base(value) -> str:
+    """Slugified base, trimmed so a ``-<n>`` suffix still fits the column."""
+    base = slugify(value or "") or FALLBACK_BASE
+    return base[: SLUG_MAX_LENGTH - 8].strip("-") or FALLBACK_BASE
+
+
+def strip_suffix(slug) -> str:
+    """``weekly-briefing-7`` -> ``weekly-briefing``."""
+    return re.sub(r"-\d+$", "", slug) or slug
+
+
+def allocate_slug(value, exclude_pk=None) -> str:
+    """Return ``<base>`` if free, otherwise ``<base>-<highest suffix + 1>``."""
+    from .models import Announcement
+
+    base = slug_base(value)
+    taken = Announcement.objects.filter(Q(slug=base) | Q(slug__startswith=f"{base}-"))
+    if exclude_pk is not None:
+        taken = taken.exclude(pk=exclude_pk)
+
+    suffix = re.compile(rf"^{re.escape(base)}-(\d+)$")
+    base_taken, highest = base in RESERVED_SLUGS, 1
+    for slug in taken.values_list("slug", flat=True):
+        if slug == base:
+            base_taken = True
+            continue
+        match = suffix.match(slug)
+        if match:
+            highest = max(highest, int(match.group(1)))
+    if not base_taken:
+        return base
+    return f"{base}-{highest + 1}"
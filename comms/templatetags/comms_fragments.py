@@ -0,0 +1,81 @@
+import time
+
+from django import template
+
+from comms import fragments
+
+register = template.Library()
+
+BATCH_CONTEXT_KEY = "_comms_fragment_batch"
+
+
+class AnnouncementFragmentsNode(template.Node):
+    def __init__(self, nodelist, announcements):
+        self.nodelist = nodelist
+        self.announcements = announcements
+
+    def render(self, context):
+        batch = fragments.FragmentBatch(self.announcements.resolve(context) or ())
+        with context.push(**{BATCH_CONTEXT_KEY: batch}):
+            html = self.nodelist.render(context)
+        batch.finish()
+        return html
+
+
+class AnnouncementFragmentNode(template.Node):
+    def __init__(self, nodelist, announcement, variant):
+        self.nodelist = nodelist
+        self.announcement = announcement
+        self.variant = variant
+
+    def render(self, context):
+        announcement = self.announcement.resolve(context)
+        variant = self.variant.resolve(context)
+        batch = context.get(BATCH_CONTEXT_KEY)
+        # Outside {% announcement_fragments %}: a batch of one
+        own_batch = batch is None
+        if own_batch:
+            batch = fragments.FragmentBatch([announcement])
+        html = batch.get(variant, announcement)
+        if html is None:
+            started = time.perf_counter()
+            html = self.nodelist.render(context)
+            batch.add(variant, announcement, html, time.perf_counter() - started)
+        if own_batch:
+            batch.finish()
+        return html
+
+
+@register.tag
+def announcement_fragments(parser, token):
+    """
+    Fetch the cached fragments of every announcement in a list at once::
+
+        {% announcement_fragments page.items %}
+            {% for a in page.items %} ... {% announcement_fragment a "item" %} ... {% endfor %}
+        {% endannouncement_fragments %}
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a list of announcements")
+    nodelist = parser.parse(("endannouncement_fragments",))
+    parser.delete_first_token()
+    return AnnouncementFragmentsNode(nodelist, parser.compile_filter(bits[1]))
+
+
+@register.tag
+def announcement_fragment(parser, token):
+    """
+    Cache the enclosed, user-independent markup of one announcement::
+
+        {% announcement_fragment a "item" %} ... {% endannouncement_fragment %}
+
+    Never put per-user state (read buttons, CSRF tokens) inside the block.
+    Inside ``{% announcement_fragments %}`` the lookups are batched.
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes an announcement and a variant name")
+    nodelist = parser.parse(("endannouncement_fragment",))
+    parser.delete_first_token()
+    return AnnouncementFragmentNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
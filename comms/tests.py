@@ -1,3 +1,665 @@
-from django.test import TestCase
+import hashlib
+import json
+import random
+import tempfile
+import threading
+from datetime import timedelta
+from html.parser import HTMLParser
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.messages import constants as message_constants
+from django.contrib.messages.storage.base import Message
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.db.models import Sum
+from django.http import HttpRequest
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from core.models import Role
+
+from departments.models import Department
+
+from . import attachments, exports, fragments, inbox, pagination, publishing, receipts, unread
+from .rendering import render_markdown
+from .models import (
+    Announcement,
+    AnnouncementAttachment,
+    AnnouncementInbox,
+    AnnouncementRead,
+    AnnouncementReadDaily,
+    AnnouncementStatus,
+)
+from .slugs import RESERVED_SLUGS
+
+
+class ReservedSlugTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = get_user_model().objects.create_user("gm", password="x", role=Role.GM)
+
+    def test_titles_matching_fixed_routes_get_a_suffix(self):
+        for title in ("Search", "Events", "Read all", "New"):
+            announcement = Announcement.objects.create(title=title, content="x", author=self.author)
+            self.assertNotIn(announcement.slug, RESERVED_SLUGS)
+
+    def test_explicit_reserved_slug_is_replaced(self):
+        announcement = Announcement.objects.create(title="Anything", slug="events", content="x", author=self.author)
+        self.assertEqual(announcement.slug, "events-2")
+
+    def test_detail_url_resolves_to_the_announcement(self):
+        announcement = Announcement.objects.create(
+            title="Search", content="x", author=self.author, status=AnnouncementStatus.PUBLISHED
+        )
+        self.client.force_login(self.author)
+        response = self.client.get(reverse("announcement_detail", args=[announcement.slug]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["announcement"], announcement)
+
+
+class ReceiptTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.author = User.objects.create_user("gm", password="x", role=Role.GM)
+        cls.reader = User.objects.create_user("e1", password="x")
+        cls.announcements = [
+            Announcement.objects.create(
+                title=f"Notice {i}", content="x", author=cls.author, status=AnnouncementStatus.PUBLISHED
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_side_effects_follow_the_rows_inserted(self):
+        first, second, third = (a.pk for a in self.announcements)
+        self.assertEqual(receipts.mark_read_bulk(self.reader, [first, second]), {first, second})
+        self.assertEqual(receipts.mark_read_bulk(self.reader, [first, second, third]), {third})
+        self.assertEqual(receipts.mark_read_bulk(self.reader, [first, third]), set())
+        totals = dict(Announcement.objects.values_list("pk", "read_total"))
+        self.assertEqual([totals[first], totals[second], totals[third]], [1, 1, 1])
+        self.assertEqual(AnnouncementReadDaily.objects.aggregate(n=Sum("reads"))["n"], 3)
+
+    def test_unread_badge_counts_each_receipt_once(self):
+        before = unread.unread_count(self.reader)
+        pk = self.announcements[0].pk
+        with self.captureOnCommitCallbacks(execute=True):
+            receipts.mark_read_bulk(self.reader, [pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            receipts.mark_read_bulk(self.reader, [pk])
+        self.assertEqual(unread.unread_count(self.reader), before - 1)
+
+    def test_model_mark_read_goes_through_receipts(self):
+        announcement = self.announcements[0]
+        self.assertTrue(announcement.mark_read(self.reader))
+        self.assertFalse(announcement.mark_read(self.reader))
+        announcement.refresh_from_db()
+        self.assertEqual(announcement.read_total, 1)
+        self.assertEqual(AnnouncementRead.objects.filter(announcement=announcement).count(), 1)
+
+    @override_settings(COMMS_READ_WRITE_BEHIND=True)
+    def test_buffer_keeps_every_pending_marker_and_flushes_once(self):
+        buffer = receipts.ReadBuffer(max_size=100, max_age=60)
+        for announcement in self.announcements:
+            buffer.add(announcement.pk, self.reader.pk)
+        buffer.add(self.announcements[0].pk, self.reader.pk)
+        self.assertEqual(receipts.pending_read_ids(self.reader), {a.pk for a in self.announcements})
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(AnnouncementRead.objects.filter(user=self.reader).count(), 3)
+        self.assertEqual(sum(Announcement.objects.values_list("read_total", flat=True)), 3)
+
+
+class ReceiptExportTests(TestCase):
+    def test_department_column_matches_the_department_filter(self):
+        User = get_user_model()
+        author = User.objects.create_user("gm", password="x", role=Role.GM)
+        sales, ops = Department.objects.create(name="Sales"), Department.objects.create(name="Ops")
+        by_fk = User.objects.create_user("fk", password="x", department=sales)
+        member = User.objects.create_user("member", password="x")
+        sales.members.add(member)
+        ops.managers.add(member)
+        announcement = Announcement.objects.create(
+            title="Notice", content="x", author=author, status=AnnouncementStatus.PUBLISHED
+        )
+        receipts.mark_read_bulk(by_fk, [announcement.pk])
+        receipts.mark_read_bulk(member, [announcement.pk])
+        rows = [
+            json.loads(line)
+            for line in exports.iter_export(exports.receipts_queryset(department=str(sales.pk)), "jsonl")
+        ]
+        self.assertEqual({row["username"]: row["department"] for row in rows}, {"fk": "Sales", "member": "Ops; Sales"})
+
+
+class NonReadersReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.gm = User.objects.create_user("gm", password="x", role=Role.GM)
+        cls.manager = User.objects.create_user("mgr", password="x", role=Role.MANAGER)
+        cls.other = User.objects.create_user("mgr2", password="x", role=Role.MANAGER)
+
+    def _report(self, user, announcement):
+        self.client.force_login(user)
+        return self.client.get(reverse("announcement_non_readers", args=[announcement.slug]))
+
+    def test_managers_cannot_open_other_authors_drafts(self):
+        draft = Announcement.objects.create(title="Reorg plan", content="x", author=self.other)
+        response = self._report(self.manager, draft)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotContains(response, "Reorg plan", status_code=404)
+        self.assertEqual(self._report(self.other, draft).status_code, 200)
+        self.assertEqual(self._report(self.gm, draft).status_code, 200)
+
+    def test_managers_can_open_published_announcements_they_see(self):
+        published = Announcement.objects.create(
+            title="Holiday", content="x", author=self.gm, status=AnnouncementStatus.PUBLISHED
+        )
+        self.assertEqual(self._report(self.manager, published).status_code, 200)
+
+
+class BulkPublishTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.gm = User.objects.create_user("gm", password="x", role=Role.GM)
+        cls.manager = User.objects.create_user("mgr", password="x", role=Role.MANAGER)
+        cls.sales = Department.objects.create(name="Sales")
+        cls.sales.managers.add(cls.manager)
+
+    def test_authorless_rows_get_the_acting_user_only_when_published(self):
+        untargeted = Announcement.objects.create(title="Untargeted", content="x", author=None)
+        targeted = Announcement.objects.create(title="Targeted", content="x", author=None)
+        targeted.departments.add(self.sales)
+        published, skipped, failures = publishing.bulk_publish(
+            Announcement.objects.filter(pk__in=[untargeted.pk, targeted.pk]), acting_user=self.manager
+        )
+        self.assertEqual(published, [targeted.pk])
+        self.assertEqual([pk for pk, _, _ in failures], [untargeted.pk])
+        self.assertEqual(skipped, [])
+        untargeted.refresh_from_db()
+        targeted.refresh_from_db()
+        self.assertIsNone(untargeted.author_id)
+        self.assertEqual(untargeted.status, AnnouncementStatus.DRAFT)
+        self.assertEqual(targeted.author, self.manager)
+        self.assertEqual(targeted.status, AnnouncementStatus.PUBLISHED)
+
+    def test_already_published_rows_are_skipped_not_failed(self):
+        done = Announcement.objects.create(title="Done", content="x", author=self.gm, status=AnnouncementStatus.PUBLISHED)
+        draft = Announcement.objects.create(title="Draft", content="x", author=self.gm)
+        published, skipped, failures = publishing.bulk_publish(Announcement.objects.all(), acting_user=self.gm)
+        self.assertEqual(published, [draft.pk])
+        self.assertEqual([pk for pk, _, _ in skipped], [done.pk])
+        self.assertEqual(failures, [])
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.gm = User.objects.create_user("gm", password="x", role=Role.GM)
+        cls.reader = User.objects.create_user("e1", password="x", role=Role.EMPLOYEE)
+        cls.sales = Department.objects.create(name="Sales")
+        cls.announcement = Announcement.objects.create(
+            title="Notice", content="x", author=cls.gm, status=AnnouncementStatus.PUBLISHED,
+            expire_at=timezone.now() + timedelta(days=1),
+        )
+        cls.targeted = Announcement.objects.create(title="Sales only", content="x", author=cls.gm)
+        cls.targeted.departments.add(cls.sales)
+        cls.targeted.status = AnnouncementStatus.PUBLISHED
+        cls.targeted.save()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+        self.urls = [reverse("announcement_list"), reverse("announcement_detail", args=[self.announcement.slug])]
+        self.etags = {url: self.client.get(url)["ETag"] for url in self.urls}
+
+    def _status(self, url):
+        return self.client.get(url, headers={"If-None-Match": self.etags[url]}).status_code
+
+    def assertRevalidates(self, expected, urls=None):
+        for url in urls or self.urls:
+            self.assertEqual(self._status(url), expected, url)
+
+    def test_unchanged_pages_are_304(self):
+        self.assertRevalidates(304)
+
+    def test_edit(self):
+        self.announcement.title = "Notice (updated)"
+        self.announcement.save()
+        self.assertRevalidates(200)
+
+    def test_new_receipt(self):
+        receipts.mark_read_bulk(self.reader, [self.announcement.pk])
+        self.assertRevalidates(200)
+
+    def test_expiry_without_a_write(self):
+        list_url, detail_url = self.urls
+        later = timezone.now() + timedelta(days=2)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            self.assertRevalidates(200, urls=[list_url])
+        # Readers get a 404 once it has expired; GMs still open it, with the new state
+        self.client.force_login(self.gm)
+        etag = self.client.get(detail_url)["ETag"]
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            self.assertEqual(self.client.get(detail_url, headers={"If-None-Match": etag}).status_code, 200)
+
+    def test_membership_change(self):
+        list_url = reverse("announcement_list")
+        self.sales.members.add(self.reader)
+        self.assertRevalidates(200, urls=[list_url])
+        self.assertContains(self.client.get(list_url), "Sales only")
+
+    def test_flash_messages_bypass_304(self):
+        storage = CookieStorage(HttpRequest())
+        for url in self.urls:
+            self.client.cookies[storage.cookie_name] = storage._encode([Message(message_constants.INFO, "Saved.")])
+            response = self.client.get(url, headers={"If-None-Match": self.etags[url]})
+            self.assertEqual(response.status_code, 200, url)
+            self.assertContains(response, "Saved.")
+
+
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.gm = User.objects.create_user("gm", password="x", role=Role.GM)
+        cls.reader = User.objects.create_user("e1", password="x", role=Role.EMPLOYEE)
+        cls.sales = Department.objects.create(name="Sales")
+        cls.sales.members.add(cls.reader)
+        cls.announcements = [
+            Announcement.objects.create(
+                title=f"Notice {i}", content="x", author=cls.gm, status=AnnouncementStatus.PUBLISHED
+            )
+            for i in range(pagination.PAGE_SIZE + 2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def _list(self):
+        spy = mock.Mock(wraps=cache)
+        with mock.patch.object(fragments, "cache", spy):
+            response = self.client.get(reverse("announcement_list"))
+        self.assertEqual(response.status_code, 200)
+        return response, [name for name, _, _ in spy.method_calls]
+
+    def test_a_page_costs_a_few_round_trips_whatever_its_size(self):
+        _, cold = self._list()
+        self.assertEqual(fragments.stats()["misses"], pagination.PAGE_SIZE)
+        self._list()
+        _, warm = self._list()
+        self.assertEqual(fragments.stats()["hits"], 2 * pagination.PAGE_SIZE)
+        # Versions, fragments and stored misses in bulk; counters once per page
+        self.assertNotIn("get", cold + warm)
+        self.assertEqual(cold.count("set_many"), 2)
+        self.assertEqual(warm, ["get_many", "get_many", "incr"])
+
+    def test_edits_and_department_changes_are_not_served_stale(self):
+        self._list()
+        announcement = self.announcements[-1]
+        announcement.title = "Renamed notice"
+        announcement.save()
+        announcement.departments.add(self.sales)
+        response, _ = self._list()
+        self.assertContains(response, "Renamed notice")
+        self.sales.name = "Sales & Ops"
+        self.sales.save()
+        response, _ = self._list()
+        self.assertContains(response, "Sales &amp; Ops")
+
+
+class InboxTests(TestCase):
+    """The inbox rows must follow publishing, targeting, schedule and membership changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.gm = User.objects.create_user("gm", password="x", role=Role.GM)
+        cls.sales, cls.ops = Department.objects.create(name="Sales"), Department.objects.create(name="Ops")
+        cls.by_fk = User.objects.create_user("fk", password="x", department=cls.sales)
+        cls.member = User.objects.create_user("member", password="x", role=Role.EMPLOYEE)
+        cls.manager = User.objects.create_user("mgr", password="x", role=Role.MANAGER)
+        cls.outsider = User.objects.create_user("outsider", password="x")
+        User.objects.create_user("gone", password="x", is_active=False)
+        cls.sales.members.add(cls.member)
+        cls.ops.managers.add(cls.manager)
+
+    def _inbox(self, announcement):
+        return set(AnnouncementInbox.objects.filter(announcement=announcement).values_list("user_id", flat=True))
+
+    def _targeted(self, *departments, **fields):
+        announcement = Announcement.objects.create(title="Notice", content="x", author=self.gm, **fields)
+        announcement.departments.add(*departments)
+        return announcement
+
+    def _publish(self, announcement):
+        announcement.status = AnnouncementStatus.PUBLISHED
+        announcement.save()
+
+    def test_fan_out_on_publish(self):
+        draft = self._targeted(self.sales)
+        self.assertEqual(self._inbox(draft), set())
+        self._publish(draft)
+        self.assertEqual(self._inbox(draft), {self.by_fk.pk, self.member.pk})
+        everyone = Announcement.objects.create(
+            title="All hands", content="x", author=self.gm, status=AnnouncementStatus.PUBLISHED
+        )
+        active = set(get_user_model().objects.filter(is_active=True).values_list("pk", flat=True))
+        self.assertEqual(self._inbox(everyone), active)
+
+    def test_re_targeting(self):
+        announcement = self._targeted(self.sales, status=AnnouncementStatus.PUBLISHED)
+        announcement.departments.add(self.ops)
+        self.assertEqual(self._inbox(announcement), {self.by_fk.pk, self.member.pk, self.manager.pk})
+        announcement.departments.remove(self.sales)
+        self.assertEqual(self._inbox(announcement), {self.manager.pk})
+        # From the department side
+        self.sales.announcements.add(announcement)
+        self.assertEqual(self._inbox(announcement), {self.by_fk.pk, self.member.pk, self.manager.pk})
+
+    def test_archive_and_expiry(self):
+        announcement = self._targeted(self.sales, status=AnnouncementStatus.PUBLISHED)
+        announcement.status = AnnouncementStatus.ARCHIVED
+        announcement.save()
+        self.assertEqual(self._inbox(announcement), set())
+
+        now = timezone.now()
+        expiring = self._targeted(self.sales, status=AnnouncementStatus.PUBLISHED, expire_at=now + timedelta(hours=1))
+        self.assertEqual(self._inbox(expiring), {self.by_fk.pk, self.member.pk})
+        self.assertEqual(inbox.prune_expired(now=now), 0)
+        self.assertEqual(inbox.prune_expired(now=now + timedelta(hours=2)), 2)
+        self.assertEqual(self._inbox(expiring), set())
+        # Saving with a past expiry removes the rows as well
+        expired = self._targeted(self.sales, status=AnnouncementStatus.PUBLISHED)
+        expired.expire_at = now - timedelta(minutes=1)
+        expired.save()
+        self.assertEqual(self._inbox(expired), set())
+
+    def test_membership_add_and_remove(self):
+        announcement = self._targeted(self.ops, status=AnnouncementStatus.PUBLISHED)
+        self.ops.members.add(self.outsider)
+        self.assertIn(self.outsider.pk, self._inbox(announcement))
+        self.outsider.member_departments.remove(self.ops)
+        self.assertNotIn(self.outsider.pk, self._inbox(announcement))
+        self.outsider.department = self.ops
+        self.outsider.save()
+        self.assertIn(self.outsider.pk, self._inbox(announcement))
+        self.ops.managers.clear()
+        self.assertEqual(self._inbox(announcement), {self.outsider.pk})
+
+    def test_department_delete(self):
+        targeted = self._targeted(self.sales, self.ops, status=AnnouncementStatus.PUBLISHED)
+        everyone = Announcement.objects.create(
+            title="All hands", content="x", author=self.gm, status=AnnouncementStatus.PUBLISHED
+        )
+        self.sales.delete()
+        self.assertEqual(self._inbox(targeted), {self.manager.pk})
+        self.assertIn(self.by_fk.pk, self._inbox(everyone))
+        self.by_fk.refresh_from_db()
+        self.assertIsNone(self.by_fk.department_id)
+
+    def test_check_consistency_finds_and_fixes_drift(self):
+        announcement = self._targeted(self.sales, status=AnnouncementStatus.PUBLISHED)
+        draft = self._targeted(self.sales)
+        self.assertEqual(inbox.check_consistency(), [])
+        # Writes that bypass the signals
+        AnnouncementInbox.objects.filter(announcement=announcement, user=self.member).delete()
+        AnnouncementInbox.objects.bulk_create(
+            [
+                AnnouncementInbox(user=self.outsider, announcement=announcement),
+                AnnouncementInbox(user=self.by_fk, announcement=draft),
+            ]
+        )
+        problems = inbox.check_consistency(fix=True)
+        self.assertEqual(
+            sorted(problems), [(announcement.pk, {self.member.pk}, {self.outsider.pk}), (draft.pk, set(), {self.by_fk.pk})]
+        )
+        self.assertEqual(inbox.check_consistency(), [])
+        self.assertEqual(self._inbox(announcement), {self.by_fk.pk, self.member.pk})
+        self.assertEqual(self._inbox(draft), set())
+
+
+class _Tags(HTMLParser):
+    def __init__(self, html):
+        super().__init__()
+        self.tags = []
+        self.feed(html)
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.append((tag, dict(attrs)))
+
+
+class RenderMarkdownTests(SimpleTestCase):
+    """Bodies are rendered with |safe: only the markup render_markdown adds may reach the page."""
+
+    ALLOWED = {"p", "br", "h3", "h4", "h5", "h6", "ul", "ol", "li", "strong", "em", "code", "a"}
+
+    def assertSafe(self, html):
+        for tag, attrs in _Tags(html).tags:
+            self.assertIn(tag, self.ALLOWED, html)
+            if tag == "a":
+                self.assertEqual(set(attrs), {"href", "rel"}, html)
+                self.assertRegex(attrs["href"], r"^(https?://|mailto:)", html)
+            else:
+                self.assertEqual(attrs, {}, html)
+
+    def test_raw_html_is_escaped(self):
+        for source in (
+            "<script>alert(1)</script>",
+            "<img src=x onerror=alert(1)>",
+            "# <iframe src=//evil>",
+            "**<b onclick=x>**",
+            "`<script>`",
+        ):
+            html = render_markdown(source)
+            self.assertSafe(html)
+            self.assertIn("&lt;", html)
+
+    def test_quotes_cannot_leave_the_href(self):
+        html = render_markdown('[x](https://example.com/"onmouseover="alert(1))')
+        self.assertSafe(html)
+        self.assertEqual(_Tags(html).tags[1][1]["href"], 'https://example.com/"onmouseover="alert(1')
+        html = render_markdown("[x](https://example.com/'><script>alert(1)</script>)")
+        self.assertSafe(html)
+        self.assertNotIn("<script", html)
+
+    def test_only_http_and_mailto_links(self):
+        for source in (
+            "[x](javascript:alert(1))",
+            "[x](JavaScript:alert(1))",
+            "[x](data:text/html;base64,PHNjcmlwdD4=)",
+            "[x]( javascript:alert(1))",
+            "[x](//evil.example)",
+        ):
+            html = render_markdown(source)
+            self.assertSafe(html)
+            self.assertNotIn("<a", html)
+        self.assertIn('<a href="mailto:hr@example.com"', render_markdown("[HR](mailto:hr@example.com)"))
+
+    def test_nesting(self):
+        self.assertEqual(
+            render_markdown("**[Shift plan](https://example.com/a*b*c)** and `**raw**`"),
+            '<p><strong><a href="https://example.com/a*b*c" rel="noopener noreferrer">Shift plan</a></strong>'
+            " and <code>**raw**</code></p>",
+        )
+        self.assertEqual(
+            render_markdown("[**Plan** `v2`](https://example.com)"),
+            '<p><a href="https://example.com" rel="noopener noreferrer"><strong>Plan</strong> <code>v2</code></a></p>',
+        )
+        # NUL is the placeholder marker; in the source it is dropped, not resolved
+        self.assertEqual(render_markdown("\x000\x00 `c`"), "<p>0 <code>c</code></p>")
+
+    def test_lists_and_headings(self):
+        html = render_markdown("# Safety\n- Helmets\n* <b>Boots</b>\n1. Sign in\n2) Sign out\n\nDone\nThanks")
+        self.assertEqual(
+            html,
+            "<h3>Safety</h3>\n<ul><li>Helmets</li><li>&lt;b&gt;Boots&lt;/b&gt;</li></ul>\n"
+            "<ol><li>Sign in</li><li>Sign out</li></ol>\n<p>Done<br>Thanks</p>",
+        )
+        self.assertSafe(html)
+
+
+class KeysetPaginationTests(TestCase):
+    def test_walking_every_page_matches_one_ordered_query(self):
+        author = get_user_model().objects.create_user("gm", password="x", role=Role.GM)
+        rng = random.Random(6)
+        base = timezone.now().replace(microsecond=0)
+        # Few distinct values, so ties on every key column; drafts keep publish_at NULL
+        for i in range(60):
+            announcement = Announcement.objects.create(title=f"Notice {i}", content="x", author=author)
+            published = rng.random() < 0.7
+            Announcement.objects.filter(pk=announcement.pk).update(
+                pinned=rng.random() < 0.3,
+                status=AnnouncementStatus.PUBLISHED if published else AnnouncementStatus.DRAFT,
+                publish_at=base - timedelta(hours=rng.randrange(4)) if published else None,
+                created_at=base - timedelta(hours=rng.randrange(4)),
+            )
+        queryset = Announcement.objects.all()
+        expected = list(queryset.order_by(*pagination.ORDERING).values_list("pk", flat=True))
+        self.assertTrue(any(pinned for pinned in queryset.values_list("pinned", flat=True)))
+        for page_size in (1, 3, 7, 60):
+            walked, cursor = [], None
+            while True:
+                items, cursor = pagination.keyset_page(queryset, cursor, page_size=page_size)
+                walked += [item.pk for item in items]
+                if cursor is None:
+                    break
+            self.assertEqual(walked, expected, page_size)
+
+    def test_invalid_cursor_starts_over(self):
+        self.assertIsNone(pagination.decode_cursor("not-a-cursor"))
+
+
+class AttachmentTests(TestCase):
+    BODY = bytes(range(256)) * 4
+    CSRF_TOKEN = "a" * 32
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gm = get_user_model().objects.create_user("gm", password="x", role=Role.GM)
+        cls.announcement = Announcement.objects.create(
+            title="Notice", content="x", author=cls.gm, status=AnnouncementStatus.PUBLISHED
+        )
+
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(self.gm)
+        self.client.cookies["csrftoken"] = self.CSRF_TOKEN
+
+    def _upload(self, body, token=CSRF_TOKEN):
+        data = {"file": SimpleUploadedFile("data.bin", body)}
+        if token:
+            data["csrfmiddlewaretoken"] = token
+        return self.client.post(reverse("announcement_attachment_upload", args=[self.announcement.slug]), data)
+
+    def _stored(self):
+        self.assertEqual(self._upload(self.BODY).status_code, 302)
+        return self.announcement.attachments.get()
+
+    def _get(self, attachment, **headers):
+        return self.client.get(
+            reverse("announcement_attachment", args=[self.announcement.slug, attachment.pk]), headers=headers
+        )
+
+    def test_upload_streams_the_hash_and_checks_csrf(self):
+        attachment = self._stored()
+        self.assertEqual((attachment.size, attachment.sha256), (len(self.BODY), hashlib.sha256(self.BODY).hexdigest()))
+        self.assertEqual(self._upload(b"x", token="").status_code, 403)
+
+    def test_oversized_uploads_get_413_with_the_csrf_token_checked_or_not(self):
+        with mock.patch.object(attachments, "MAX_SIZE", 1024):
+            # Refused from Content-Length before the body is read, and while streaming
+            for size in (200 * 1024, 5 * 1024, 1025):
+                self.assertEqual(self._upload(b"x" * size).status_code, 413, size)
+            self.assertEqual(self._upload(b"x" * 1024).status_code, 302)
+        self.assertEqual(self.announcement.attachments.count(), 1)
+
+    def test_parse_range(self):
+        size = 1000
+        for header in (None, "", "bytes=", "bytes=-", "items=0-1", "bytes=0-1,5-6", "bytes=a-b"):
+            self.assertIsNone(attachments.parse_range(header, size), header)
+        self.assertEqual(attachments.parse_range("bytes=0-99", size), (0, 99))
+        self.assertEqual(attachments.parse_range("bytes=990-", size), (990, 999))
+        self.assertEqual(attachments.parse_range("bytes=990-5000", size), (990, 999))
+        self.assertEqual(attachments.parse_range("bytes=-10", size), (990, 999))
+        self.assertEqual(attachments.parse_range("bytes=-5000", size), (0, 999))
+        for header in ("bytes=1000-", "bytes=20-10", "bytes=-0"):
+            with self.assertRaises(ValueError, msg=header):
+                attachments.parse_range(header, size)
+        with self.assertRaises(ValueError):
+            attachments.parse_range("bytes=-10", 0)
+
+    def test_range_requests(self):
+        attachment = self._stored()
+        response = self._get(attachment, Range="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(self.BODY)}")
+        self.assertEqual(b"".join(response.streaming_content), self.BODY[10:20])
+        response = self._get(attachment, Range="bytes=-16")
+        self.assertEqual(b"".join(response.streaming_content), self.BODY[-16:])
+        response = self._get(attachment, Range=f"bytes={len(self.BODY)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.BODY)}")
+        response = self._get(attachment)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(b"".join(response.streaming_content), self.BODY)
+
+    def test_if_range_needs_a_strong_match(self):
+        attachment = self._stored()
+        etag = self._get(attachment)["ETag"]
+        last_modified = http_date(attachment.created_at.timestamp())
+        self.assertEqual(self._get(attachment, Range="bytes=0-9", If_Range=etag).status_code, 206)
+        self.assertEqual(self._get(attachment, Range="bytes=0-9", If_Range=last_modified).status_code, 206)
+        # Weak or stale validators: the whole (current) file instead of a range of it
+        for stale in (f"W/{etag}", '"other"', http_date(attachment.created_at.timestamp() - 60)):
+            response = self._get(attachment, Range="bytes=0-9", If_Range=stale)
+            self.assertEqual(response.status_code, 200, stale)
+            self.assertEqual(b"".join(response.streaming_content), self.BODY)
+
+    def test_conditional_requests_get_304(self):
+        attachment = self._stored()
+        response = self._get(attachment)
+        self.assertEqual(self._get(attachment, If_None_Match=response["ETag"]).status_code, 304)
+        self.assertEqual(self._get(attachment, If_Modified_Since=response["Last-Modified"]).status_code, 304)
+        self.assertEqual(self._get(attachment, If_None_Match='"other"').status_code, 200)
+
+
+@skipUnless(connection.vendor == "postgresql", "Row locks are only exercised on PostgreSQL")
+class ConcurrentReceiptTests(TransactionTestCase):
+    def test_concurrent_marks_count_once(self):
+        User = get_user_model()
+        author = User.objects.create_user("gm", password="x", role=Role.GM)
+        reader = User.objects.create_user("e1", password="x")
+        announcement = Announcement.objects.create(
+            title="Notice", content="x", author=author, status=AnnouncementStatus.PUBLISHED
+        )
+        barrier = threading.Barrier(8)
+        results = []
+
+        def worker():
+            try:
+                barrier.wait()
+                results.append(receipts.mark_read_bulk(reader, [announcement.pk]))
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        announcement.refresh_from_db()
+        self.assertEqual(announcement.read_total, 1)
+        self.assertEqual(sum(len(ids) for ids in results), 1)
+        self.assertEqual(AnnouncementReadDaily.objects.aggregate(n=Sum("reads"))["n"], 1)
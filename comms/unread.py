@@ -0,0 +1,92 @@
+"""
+Per-user unread-announcement counter for navigation badges.
+
+The count lives in the shared cache so the badge endpoint is a single cache
+read. It is kept in step incrementally:
+
+- fan-out (``inbox.sync_announcement``) increments it for users who just got
+  a live announcement they have not read, and drops it for users who lost
+  one (recomputed on the next read);
+- mark-read decrements it by the number of receipts actually inserted;
+- anything harder to account for (scheduler transitions, membership changes,
+  receipt deletes, write-behind reads) drops the counter.
+
+A missing counter is recomputed lazily from the inbox with one count query.
+"""
+from django.core.cache import cache
+
+from .models import Announcement, AnnouncementInbox, AnnouncementRead
+
+CACHE_TIMEOUT = 60 * 10
+
+
+def _key(user_id):
+    return f"comms:unread:{user_id}"
+
+
+def compute(user):
+    """Unread, currently visible announcements for ``user`` (uncached)."""
+    from . import receipts
+
+    qs = Announcement.objects.published().visible_to(user).exclude(reads__user=user)
+    pending = receipts.pending_read_ids(user)
+    if pending:
+        qs = qs.exclude(pk__in=pending)
+    return qs.order_by().count()
+
+
+def unread_count(user):
+    if not getattr(user, "pk", None):
+        return 0
+    count = cache.get(_key(user.pk))
+    if count is None:
+        count = compute(user)
+        cache.set(_key(user.pk), count, CACHE_TIMEOUT)
+    return count
+
+
+def increment(user_ids):
+    for user_id in user_ids:
+        try:
+            cache.incr(_key(user_id))
+        except ValueError:
+            # Not cached: the next read recomputes it anyway
+            pass
+
+
+def decrement(user_id, delta=1):
+    if not delta:
+        return
+    try:
+        if cache.decr(_key(user_id), delta) < 0:
+            cache.delete(_key(user_id))
+    except ValueError:
+        pass
+
+
+def invalidate(user_ids):
+    cache.delete_many([_key(user_id) for user_id in user_ids])
+
+
+def fanned_out(announcement, added_user_ids, removed_user_ids):
+    """Adjust counters after ``inbox.sync_announcement`` changed an announcement's audience."""
+    invalidate(removed_user_ids)
+    if not added_user_ids:
+        return
+    if not announcement.is_live:
+        # Scheduled for later: the scheduler invalidates the audience when it goes live
+        return
+    # Re-targeting can bring an announcement back to someone who already read it
+    already_read = set(
+        AnnouncementRead.objects.filter(announcement=announcement, user_id__in=added_user_ids)
+        .values_list("user_id", flat=True)
+    )
+    increment(set(added_user_ids) - already_read)
+
+
+def invalidate_audience(announcement_ids):
+    """Drop the counters of everyone whose inbox holds any of the given announcements."""
+    user_ids = set(
+        AnnouncementInbox.objects.filter(announcement_id__in=list(announcement_ids)).values_list("user_id", flat=True)
+    )
+    invalidate(user_ids)
@@ -5,7 +5,17 @@ urlpatterns = [
     path("", views.announcement_list, name="announcement_list"),
     path("new/", views.announcement_create, name="announcement_create"),
     path("edit/<slug:slug>/", views.announcement_edit, name="announcement_edit"),
+    path("search/", views.announcement_search, name="announcement_search"),
+    path("reports/read-rates/", views.announcement_read_rates, name="announcement_read_rates"),
+    path("receipts/export/", views.announcement_receipts_export, name="announcement_receipts_export"),
+    path("events/", views.announcement_events, name="announcement_events"),
+    path("unread-count/", views.announcement_unread_count, name="announcement_unread_count"),
+    path("fragment-stats/", views.announcement_fragment_stats, name="announcement_fragment_stats"),
+    path("read-all/", views.announcement_mark_all_read, name="announcement_mark_all_read"),
     path("<slug:slug>/", views.announcement_detail, name="announcement_detail"),
+    path("<slug:slug>/non-readers/", views.announcement_non_readers, name="announcement_non_readers"),
+    path("<slug:slug>/attachments/", views.announcement_attachment_upload, name="announcement_attachment_upload"),
+    path("<slug:slug>/attachments/<int:pk>/", views.announcement_attachment, name="announcement_attachment"),
     path("<slug:slug>/read/", views.announcement_mark_read, name="announcement_mark_read"),
     path("<slug:slug>/archive/", views.announcement_archive, name="announcement_archive"),
     path("<slug:slug>/publish/", views.announcement_publish, name="announcement_publish"),
@@ -1,144 +1,186 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse, HttpResponseForbidden
-from django.core.paginator import Paginator
-from django.views.decorators.http import require_POST
-from django.db.models import Prefetch, Q
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_GET, require_POST
+from django.db.models import Count, Prefetch, Q, Sum
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
-from .models import Announcement, AnnouncementRead, AnnouncementStatus
+from .models import Announcement, AnnouncementAttachment, AnnouncementInbox, AnnouncementRead, AnnouncementReadDaily, AnnouncementStatus
 from .forms import AnnouncementForm
+from . import attachments, events, exports, fragments, membership, receipts, reports, search, unread
+from .conditional import conditional_page, detail_stamps, list_stamps
+from .pagination import PAGE_SIZE, keyset_page
 from core.models import Role
+from departments.models import Department
 
 
-def _user_department_ids(user):
-    """Collect all department IDs relevant to the user (member, manager, and FK)."""
-    ids = set()
-    # From M2M relationships via Department.related_name
-    if hasattr(user, "member_departments"):
-        ids.update(user.member_departments.values_list("id", flat=True))
-    if hasattr(user, "managed_departments"):
-        ids.update(user.managed_departments.values_list("id", flat=True))
-    # From User.department FK
-    if getattr(user, "department_id", None):
-        ids.add(user.department_id)
-    return list(ids)
-
-
-# Create your views here.
-@login_required
-def announcement_list(request):
-    dept_ids = _user_department_ids(request.user)
-    # Manager-specific split view: "My Announcements" (no read button) and "GM Announcements" (with read button)
-    if getattr(request.user, "role", None) == Role.MANAGER:
-        # Filter selector for "My Announcements": ALL (default), DRAFTS, ARCHIVED
-        filter_opt = (request.GET.get("f") or "ALL").upper()
-        if filter_opt not in ("ALL", "DRAFTS", "ARCHIVED"):
-            filter_opt = "ALL"
-
-        base_my = Announcement.objects.filter(author=request.user).select_related("author").prefetch_related("departments")
-        if filter_opt == "DRAFTS":
-            my_qs = base_my.filter(status=AnnouncementStatus.DRAFT)
-        elif filter_opt == "ARCHIVED":
-            my_qs = base_my.filter(status=AnnouncementStatus.ARCHIVED)
-        else:  # ALL => exclude archived
-            my_qs = base_my.exclude(status=AnnouncementStatus.ARCHIVED)
-
-        my_qs = my_qs.order_by("-pinned", "-publish_at", "-created_at")
-        gm_qs = (
-            Announcement.objects.active()
-            .for_departments(dept_ids)
-            .filter(author__role=Role.GM)
-            .select_related("author")
-            .prefetch_related("departments")
-        )
+# HTMX event the navigation badge listens for (see dashboard_base.html)
+UNREAD_CHANGED_EVENT = "comms:unread-changed"
+# List pages show the stored excerpt; never fetch the bodies
+LIST_DEFERRED = ("content", "content_html")
+# Idle SSE connections get a comment this often so proxies keep them open
+SSE_HEARTBEAT_SECONDS = 15
 
-        read_ids = set(
-            AnnouncementRead.objects.filter(user=request.user, announcement__in=gm_qs)
-            .values_list("announcement_id", flat=True)
-        )
 
-        context = {
-            "active": "comms",
-            "is_manager": True,
-            "my_announcements": my_qs,
-            "gm_announcements": gm_qs,
-            "read_ids": read_ids,
-            "current_filter": filter_opt,
-        }
-        return render(request, "comms/announcement_list.html", context)
-
-    # GM-specific: show "My Announcements" and "All Announcements" (excluding own), with read button only on the latter
-    if getattr(request.user, "role", None) == Role.GM:
-        # GM: filter selector for "My Announcements": ALL (default), DRAFTS, ARCHIVED
-        filter_opt = (request.GET.get("f") or "ALL").upper()
-        if filter_opt not in ("ALL", "DRAFTS", "ARCHIVED"):
-            filter_opt = "ALL"
-
-        base_my = Announcement.objects.filter(author=request.user).select_related("author").prefetch_related("departments")
-        if filter_opt == "DRAFTS":
-            my_qs = base_my.filter(status=AnnouncementStatus.DRAFT)
-        elif filter_opt == "ARCHIVED":
-            my_qs = base_my.filter(status=AnnouncementStatus.ARCHIVED)
-        else:  # ALL => exclude archived
-            my_qs = base_my.exclude(status=AnnouncementStatus.ARCHIVED)
-
-        my_qs = my_qs.order_by("-pinned", "-publish_at", "-created_at")
-        all_qs = (
-            Announcement.objects.active()
-            .exclude(author=request.user)
-            .select_related("author")
-            .prefetch_related("departments")
-        )
-
-        read_ids = set(
-            AnnouncementRead.objects.filter(user=request.user, announcement__in=all_qs)
-            .values_list("announcement_id", flat=True)
-        )
-
-        context = {
-            "active": "comms",
-            "is_gm": True,
-            "my_announcements": my_qs,
-            "all_announcements": all_qs,
-            "read_ids": read_ids,
-            "current_filter": filter_opt,
-        }
-        return render(request, "comms/announcement_list.html", context)
-
-    # Default behavior for GM and EMPLOYEE: single list with read button
-    qs = (
-        Announcement.objects.published()
-        .active()
-        .for_departments(dept_ids)
+def _my_announcements(user, filter_opt):
+    """Author's own announcements for the "My Announcements" filter: ALL (non-archived), DRAFTS, ARCHIVED."""
+    base_my = (
+        Announcement.objects.filter(author=user)
+        .defer(*LIST_DEFERRED)
         .select_related("author")
         .prefetch_related("departments")
     )
+    if filter_opt == "DRAFTS":
+        return base_my.filter(status=AnnouncementStatus.DRAFT)
+    if filter_opt == "ARCHIVED":
+        return base_my.filter(status=AnnouncementStatus.ARCHIVED)
+    return base_my.exclude(status=AnnouncementStatus.ARCHIVED)
 
-    page_number = request.GET.get("page", 1)
-    paginator = Paginator(qs, 10)
-    page_obj = paginator.get_page(page_number)
 
+def _section_page(request, section, qs):
+    """One keyset page of a list section; the cursor comes from ``?<section>_cursor=``."""
+    items, next_cursor = keyset_page(qs, request.GET.get(f"{section}_cursor"))
+    return {"section": section, "items": items, "next_cursor": next_cursor}
+
+
+def _read_ids(user, *pages):
+    """IDs of the announcements on the given pages that the user has read."""
+    ids = [a.id for page in pages for a in page["items"]]
     read_ids = set(
-        AnnouncementRead.objects.filter(user=request.user, announcement__in=page_obj.object_list)
+        AnnouncementRead.objects.filter(user=user, announcement_id__in=ids)
         .values_list("announcement_id", flat=True)
     )
+    return read_ids | receipts.pending_read_ids(user)
+
 
+# Create your views here.
+@login_required
+@conditional_page(list_stamps)
+def announcement_list(request):
+    role = getattr(request.user, "role", None)
+    # Filter selector for "My Announcements": ALL (default), DRAFTS, ARCHIVED
+    filter_opt = (request.GET.get("f") or "ALL").upper()
+    if filter_opt not in ("ALL", "DRAFTS", "ARCHIVED"):
+        filter_opt = "ALL"
+
+    if role == Role.MANAGER:
+        # Manager-specific split view: "My Announcements" (no read button) and "GM Announcements"
+        sections = {
+            "my": _my_announcements(request.user, filter_opt),
+            "gm": (
+                Announcement.objects.published()
+                .visible_to(request.user)
+                .filter(author__role=Role.GM)
+                .defer(*LIST_DEFERRED)
+                .select_related("author")
+                .prefetch_related("departments")
+            ),
+        }
+    elif role == Role.GM:
+        # GM-specific: show "My Announcements" and "All Announcements" (excluding own)
+        sections = {
+            "my": _my_announcements(request.user, filter_opt),
+            "all": (
+                Announcement.objects.active()
+                .exclude(author=request.user)
+                .defer(*LIST_DEFERRED)
+                .select_related("author")
+                .prefetch_related("departments")
+            ),
+        }
+    else:
+        # Default behavior for EMPLOYEE: single list with read button
+        sections = {
+            "feed": (
+                Announcement.objects.published()
+                .visible_to(request.user)
+                .defer(*LIST_DEFERRED)
+                .select_related("author")
+                .prefetch_related("departments")
+            ),
+        }
+
+    # HTMX "load more": render only the next page of the requested section
+    section = request.GET.get("section")
+    if request.headers.get("HX-Request") == "true" and section in sections:
+        page = _section_page(request, section, sections[section])
+        return render(request, "comms/_announcement_page.html", {
+            "page": page,
+            "read_ids": _read_ids(request.user, page),
+            "current_filter": filter_opt,
+        })
+
+    pages = {name: _section_page(request, name, qs) for name, qs in sections.items()}
     context = {
         "active": "comms",
-        "page_obj": page_obj,
-        "read_ids": read_ids,
+        "is_manager": role == Role.MANAGER,
+        "is_gm": role == Role.GM,
+        "read_ids": _read_ids(request.user, *pages.values()),
+        "current_filter": filter_opt,
+        "events_enabled": settings.COMMS_EVENTS_ENABLED,
     }
+    context.update({f"{name}_page": page for name, page in pages.items()})
     return render(request, "comms/announcement_list.html", context)
 
 
+def _searchable_announcements(user):
+    """What a user may find through search: GM everything, managers visible + own, employees visible."""
+    role = getattr(user, "role", None)
+    if role == Role.GM:
+        return Announcement.objects.all()
+    visible = Announcement.objects.published().visible_to(user)
+    if role == Role.MANAGER:
+        return Announcement.objects.filter(Q(pk__in=visible.values("pk")) | Q(author=user))
+    return visible
+
+
+@login_required
+def announcement_search(request):
+    query = (request.GET.get("q") or "").strip()
+    try:
+        page_number = max(int(request.GET.get("page") or 1), 1)
+    except ValueError:
+        page_number = 1
+
+    results, has_next = [], False
+    if query:
+        qs = (
+            search.search(_searchable_announcements(request.user), query)
+            .defer(*LIST_DEFERRED)
+            .select_related("author")
+            .prefetch_related("departments")
+        )
+        # Ranked results can't be keyset-paginated cheaply; fetch one extra row instead of COUNT(*)
+        offset = (page_number - 1) * PAGE_SIZE
+        results = list(qs[offset: offset + PAGE_SIZE + 1])
+        has_next = len(results) > PAGE_SIZE
+        results = results[:PAGE_SIZE]
+
+    return render(request, "comms/announcement_search.html", {
+        "active": "comms",
+        "query": query,
+        "results": results,
+        "page_number": page_number,
+        "has_next": has_next,
+    })
+
+
 @login_required
+@conditional_page(detail_stamps)
 def announcement_detail(request, slug: str):
     user = request.user
-    dept_ids = _user_department_ids(user)
 
-    base = Announcement.objects.select_related("author").prefetch_related("departments")
-    active_qs = base.active().for_departments(dept_ids)
+    # The page shows the pre-rendered body; the Markdown source isn't needed
+    base = Announcement.objects.defer("content").select_related("author").prefetch_related("departments", "attachments")
+    active_qs = base.published().visible_to(user)
 
     # First, try to fetch as an active, visible announcement
     try:
@@ -167,6 +209,119 @@ def announcement_detail(request, slug: str):
     })
 
 
+def _can_view(user, ann):
+    """Same rules as the detail page: visible to the user, or GM / the authoring manager."""
+    role = getattr(user, "role", None)
+    if role == Role.GM or (role == Role.MANAGER and ann.author_id == user.id):
+        return True
+    return Announcement.objects.published().visible_to(user).filter(pk=ann.pk).exists()
+
+
+@csrf_exempt
+@login_required
+@require_POST
+def announcement_attachment_upload(request, slug: str):
+    """
+    Attach a file. The upload handler must be installed before the body is
+    read, so CSRF is checked afterwards by the inner view.
+    """
+    ann = get_object_or_404(Announcement, slug=slug)
+    if getattr(request.user, "role", None) == Role.MANAGER and ann.author_id != request.user.id:
+        return HttpResponseForbidden("You do not have permission to add attachments to this announcement.")
+    if getattr(request.user, "role", None) not in (Role.GM, Role.MANAGER):
+        return HttpResponseForbidden("You do not have permission to add attachments.")
+    if attachments.declared_too_large(request):
+        # Before anything reads the body: parsing it would only be thrown away, and
+        # the CSRF check cannot run without it (403 instead of 413)
+        return HttpResponse("File is too large.", status=413)
+    handler = attachments.HashingUploadHandler(request)
+    request.upload_handlers = [handler]
+    # Parse now: an upload stopped at the limit may have cut off fields after the file,
+    # the CSRF token among them, so the size is answered before the token is checked
+    upload = request.FILES.get("file")
+    if handler.too_large:
+        return HttpResponse("File is too large.", status=413)
+    return _store_attachment(request, ann, upload)
+
+
+@csrf_protect
+def _store_attachment(request, ann, upload):
+    if upload is None:
+        return HttpResponseBadRequest("No file was uploaded.")
+    attachments.create_from_upload(ann, upload, request.user)
+    if request.headers.get("HX-Request") == "true":
+        return render(request, "comms/_attachments.html", {"announcement": ann})
+    return redirect("announcement_detail", slug=ann.slug)
+
+
+@login_required
+@require_GET
+def announcement_attachment(request, slug: str, pk: int):
+    """Download an attachment, or its ``?variant=thumbnail|preview`` image."""
+    attachment = get_object_or_404(AnnouncementAttachment.objects.select_related("announcement"), pk=pk, announcement__slug=slug)
+    if not _can_view(request.user, attachment.announcement):
+        return HttpResponseForbidden("You do not have permission to view this attachment.")
+    variant = request.GET.get("variant") or "original"
+    if variant == "original":
+        field, content_type, name = attachment.file, attachment.content_type, attachment.original_name
+    elif variant in ("thumbnail", "preview") and getattr(attachment, variant):
+        field, content_type = getattr(attachment, variant), "image/jpeg"
+        name = f"{attachment.original_name.rsplit('.', 1)[0]}-{variant}.jpg"
+    else:
+        # Not an image, or the worker hasn't got to it yet
+        return HttpResponse(status=404)
+    return attachments.serve(
+        request,
+        field,
+        etag=f"{attachment.sha256}-{variant}",
+        last_modified=attachment.created_at,
+        content_type=content_type,
+        filename=name,
+    )
+
+
+@login_required
+def announcement_non_readers(request, slug: str):
+    """
+    Audience members who haven't read the announcement yet.
+    GM: whole audience. Manager: whole audience of their own announcements,
+    otherwise only the departments they manage, and only for announcements
+    they can see.
+    """
+    ann = get_object_or_404(Announcement, slug=slug)
+    role = getattr(request.user, "role", None)
+    if role not in (Role.GM, Role.MANAGER):
+        return HttpResponseForbidden("You do not have permission to view this report.")
+    # Drafts and announcements outside the manager's audience don't exist for them (as on the detail page)
+    if not _can_view(request.user, ann):
+        raise Http404("No announcement found.")
+
+    # Departments the report may cover (None: the whole audience)
+    allowed_ids = None
+    if role == Role.MANAGER and ann.author_id != request.user.id:
+        allowed_ids = set(request.user.managed_departments.values_list("id", flat=True))
+    choices = ann.departments.all() if ann.departments.exists() else Department.objects.all()
+    if allowed_ids is not None:
+        choices = choices.filter(pk__in=allowed_ids)
+
+    selected = request.GET.get("department") or ""
+    department_ids = allowed_ids
+    if selected.isdigit():
+        department_ids = {int(selected)} & allowed_ids if allowed_ids is not None else {int(selected)}
+
+    page = reports.non_readers_page(ann, department_ids, cursor=request.GET.get("cursor"))
+    context = {
+        "active": "comms",
+        "announcement": ann,
+        "page": page,
+        "departments": choices,
+        "selected_department": selected,
+    }
+    if request.headers.get("HX-Request") == "true":
+        return render(request, "comms/_non_readers_rows.html", context)
+    return render(request, "comms/non_readers.html", context)
+
+
 @login_required
 def announcement_edit(request, slug: str):
     # Permissions: GM can edit any; Manager can edit only own
@@ -239,15 +394,16 @@ def announcement_publish(request, slug: str):
 @login_required
 @require_POST
 def announcement_mark_read(request, slug: str):
-    dept_ids = _user_department_ids(request.user)
     announcement = get_object_or_404(
-        Announcement.objects.active().for_departments(dept_ids), slug=slug
+        Announcement.objects.published().visible_to(request.user), slug=slug
     )
-    announcement.mark_read(request.user)
+    receipts.mark_read(request.user, announcement)
 
-    # HTMX support: return just the button fragment
+    # HTMX support: return just the button fragment and let the unread badge refresh
     if request.headers.get("HX-Request") == "true":
-        return render(request, "comms/_read_button.html", {"announcement": announcement, "is_read": True})
+        response = render(request, "comms/_read_button.html", {"announcement": announcement, "is_read": True})
+        response["HX-Trigger"] = UNREAD_CHANGED_EVENT
+        return response
 
     # Fallback
     return render(request, "comms/announcement_detail.html", {
@@ -257,6 +413,28 @@ def announcement_mark_read(request, slug: str):
     })
 
 
+@login_required
+@require_POST
+def announcement_mark_all_read(request):
+    """Mark the user's visible unread announcements (or the posted slugs) as read in one batch."""
+    visible = Announcement.objects.published().visible_to(request.user)
+    slugs = request.POST.getlist("slug")
+    if slugs:
+        visible = visible.filter(slug__in=slugs)
+    else:
+        visible = visible.exclude(reads__user=request.user)
+    announcements = list(visible.only("id", "slug"))
+    receipts.mark_read_bulk(request.user, [a.id for a in announcements])
+
+    # HTMX support: out-of-band swap every read button on the page at once
+    if request.headers.get("HX-Request") == "true":
+        response = render(request, "comms/_mark_all_read.html", {"announcements": announcements})
+        response["HX-Trigger"] = UNREAD_CHANGED_EVENT
+        return response
+
+    return redirect("announcement_list")
+
+
 @login_required
 def announcement_create(request):
     # Permissions: only GM or MANAGER can create/publish (employees cannot)
@@ -268,6 +446,8 @@ def announcement_create(request):
         if form.is_valid():
             ann = form.save(commit=False)
             ann.author = request.user
+            # Save as draft first; publish() below fans out once departments are set
+            ann.status = AnnouncementStatus.DRAFT
             ann.save()
             form.save_m2m()
 
@@ -289,3 +469,136 @@ def announcement_create(request):
         form = AnnouncementForm(user=request.user)
 
     return render(request, "comms/announcement_form.html", {"form": form, "active": "comms", "is_create": True})
+
+
+@login_required
+def announcement_receipts_export(request):
+    """Stream read receipts as CSV or JSON Lines (GM/staff only); filters as in comms.exports."""
+    if getattr(request.user, "role", None) != Role.GM and not request.user.is_staff:
+        return HttpResponseForbidden("You do not have permission to export read receipts.")
+    fmt = request.GET.get("format") or "csv"
+    if fmt not in exports.FORMATS:
+        return HttpResponseBadRequest("Unsupported format; use csv or jsonl.")
+    try:
+        queryset = exports.receipts_queryset(
+            announcement=request.GET.get("announcement"),
+            department=request.GET.get("department"),
+            since=request.GET.get("since"),
+            until=request.GET.get("until"),
+        )
+    except exports.ExportFilterError as e:
+        return HttpResponseBadRequest(str(e))
+    content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    response = StreamingHttpResponse(exports.iter_export(queryset, fmt), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="read-receipts.{fmt}"'
+    return response
+
+
+@login_required
+def announcement_read_rates(request):
+    """Read-rate dashboard (GM/staff), served from the daily rollups rather than raw receipts."""
+    if getattr(request.user, "role", None) != Role.GM and not request.user.is_staff:
+        return HttpResponseForbidden("You do not have permission to view read reports.")
+    try:
+        days = min(max(int(request.GET.get("days") or 30), 1), 365)
+    except ValueError:
+        days = 30
+    since = timezone.localdate() - timezone.timedelta(days=days - 1)
+    window = AnnouncementReadDaily.objects.filter(day__gte=since).order_by()
+    totals = window.filter(department__isnull=True)
+
+    per_day = list(totals.values("day").annotate(reads=Sum("reads")).order_by("day"))
+    per_department = list(
+        window.filter(department__isnull=False)
+        .values("department__name")
+        .annotate(reads=Sum("reads"))
+        .order_by("-reads")
+    )
+    per_announcement = list(
+        totals.values("announcement_id", "announcement__title", "announcement__slug", "announcement__read_total")
+        .annotate(reads=Sum("reads"))
+        .order_by("-reads")[:25]
+    )
+    audience = dict(
+        AnnouncementInbox.objects.filter(announcement_id__in=[row["announcement_id"] for row in per_announcement])
+        .values("announcement_id")
+        .annotate(n=Count("id"))
+        .values_list("announcement_id", "n")
+    )
+    for row in per_announcement:
+        row["audience"] = audience.get(row["announcement_id"], 0)
+        row["read_rate"] = round(100 * row["announcement__read_total"] / row["audience"]) if row["audience"] else None
+
+    return render(request, "comms/read_rates.html", {
+        "active": "comms",
+        "days": days,
+        "since": since,
+        "total_reads": sum(row["reads"] for row in per_day),
+        "per_day": per_day,
+        "per_department": per_department,
+        "per_announcement": per_announcement,
+    })
+
+
+@login_required
+def announcement_unread_count(request):
+    """Navigation badge fragment; one cache read per request (see comms.unread)."""
+    return render(request, "comms/_unread_badge.html", {"count": unread.unread_count(request.user)})
+
+
+@login_required
+def announcement_fragment_stats(request):
+    """Staff-only JSON view of the list-item fragment cache counters."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden("You do not have permission to view cache statistics.")
+    return JsonResponse(fragments.stats())
+
+
+def _sse(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+@login_required
+async def announcement_events(request):
+    """
+    Server-Sent Events stream of announcements going live or being withdrawn
+    (see comms.events). Needs an ASGI server; each client only receives
+    announcements targeted at its departments (GMs receive everything).
+
+    Answers 204 (EventSource stops reconnecting) unless ``COMMS_EVENTS_ENABLED``
+    is set and the request came through ASGI: under WSGI the endless stream
+    would hold a worker thread for as long as the page stays open.
+    """
+    if not settings.COMMS_EVENTS_ENABLED or not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user = await request.auser()
+    sees_everything = getattr(user, "role", None) == Role.GM
+    department_ids = await sync_to_async(membership.department_ids)(user)
+    version = await sync_to_async(membership.membership_version)(user.pk)
+
+    async def stream():
+        nonlocal department_ids, version
+        async with events.get_broker().subscription() as queue:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Pick up department changes made while connected
+                    current = await sync_to_async(membership.membership_version)(user.pk)
+                    if current != version:
+                        version = current
+                        department_ids = await sync_to_async(membership.department_ids)(user, refresh=True)
+                    yield ": keepalive\n\n"
+                    continue
+                if event["type"] == events.PUBLISHED and not (sees_everything or events.is_visible(event, department_ids)):
+                    # Re-targeted away from this client: let it drop the item if shown
+                    if event.get("retargeted"):
+                        yield _sse(events.WITHDRAWN, {"id": event["id"]})
+                    continue
+                yield _sse(event["type"], {key: value for key, value in event.items() if key != "department_ids"})
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -100,6 +100,18 @@ DATABASES = {
 }
 
 
+# Cache
+# Use a shared backend (e.g. CACHE_URL=redis://127.0.0.1:6379/1) when running
+# several workers; the default local-memory cache is per process.
+CACHES = {
+    'default': env.cache("CACHE_URL", default="locmemcache://"),
+}
+
+
+# Covering indexes (INCLUDE) are PostgreSQL-only; SQLite just builds the key columns
+SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -137,6 +149,11 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
 
+# Uploaded files (announcement attachments). Not served as static media:
+# downloads go through comms views, which check visibility.
+MEDIA_URL = 'media/'
+MEDIA_ROOT = env("MEDIA_ROOT", default=str(BASE_DIR / "media"))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -148,6 +165,21 @@ LOGIN_URL = "core:login"              # was 'login' or missing
 LOGIN_REDIRECT_URL = "dashboard"      # adjust if you use a namespaced dashboard
 LOGOUT_REDIRECT_URL = "core:login"
 
+# Announcements
+# Buffer single "I read this" receipts per worker and flush them in batches
+COMMS_READ_WRITE_BEHIND = env.bool("COMMS_READ_WRITE_BEHIND", default=False)
+COMMS_READ_BUFFER_SIZE = 500
+COMMS_READ_BUFFER_SECONDS = 2.0
+# SSE announcement events; only enable when served by an ASGI server (runserver is WSGI)
+COMMS_EVENTS_ENABLED = env.bool("COMMS_EVENTS_ENABLED", default=False)
+# InProcessBroker (single worker) or CacheBroker (workers and the scheduler process sharing CACHE_URL)
+COMMS_EVENTS_BACKEND = env("COMMS_EVENTS_BACKEND", default="comms.events.InProcessBroker")
+COMMS_EVENTS_POLL_SECONDS = 1.0
+# Attachment uploads stream to a temporary file; larger ones are rejected with 413
+COMMS_ATTACHMENT_MAX_SIZE = env.int("COMMS_ATTACHMENT_MAX_SIZE", default=25 * 1024 * 1024)
+# Absolute links in the unread digest e-mails (send_announcement_digest)
+COMMS_DIGEST_BASE_URL = env("COMMS_DIGEST_BASE_URL", default="http://localhost:8000")
+
 # Crispy
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"